@@ -0,0 +1,147 @@
+# audio_extract.py — pull 16 kHz mono PCM out of a container with ffmpeg
+#
+# ffmpeg demuxes only the audio stream (-vn), resamples it and writes raw
+# PCM to a pipe, so video frames are never decoded and nothing touches a
+# shared path on disk. Safe to run from many jobs at once.
+# extract_pcm_stream() feeds ffmpeg through stdin instead, from any
+# file-like (e.g. an upload that is still arriving, see services/uploads).
+import io
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from pathlib import Path
+from typing import Callable, Optional
+
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_CHANNELS = 1
+AUDIO_SAMPLE_WIDTH = 2        # s16le
+FFMPEG_TIMEOUT_SEC = 600
+FEED_BLOCK_BYTES = 256 * 1024
+
+
+def ffmpeg_exe() -> str:
+    """Prefer the ffmpeg bundled with imageio-ffmpeg, else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        exe = shutil.which("ffmpeg")
+        if not exe:
+            raise RuntimeError("ffmpeg not found — install imageio-ffmpeg or add ffmpeg to PATH.")
+        return exe
+
+
+def _ffmpeg_pcm_cmd(source: str) -> list:
+    return [
+        ffmpeg_exe(),
+        "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-vn", "-sn", "-dn",
+        "-ac", str(AUDIO_CHANNELS),
+        "-ar", str(AUDIO_SAMPLE_RATE),
+        "-f", "s16le",
+        "pipe:1",
+    ]
+
+
+def extract_pcm(video_path: str) -> bytes:
+    """Return raw 16 kHz mono s16le PCM for the clip's audio track."""
+    proc = subprocess.run(
+        _ffmpeg_pcm_cmd(str(video_path)),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=FFMPEG_TIMEOUT_SEC,
+        check=False,
+    )
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"ffmpeg audio extraction failed: {err or proc.returncode}")
+    return proc.stdout
+
+
+def feed_stdin(proc: subprocess.Popen, reader) -> Callable[..., None]:
+    """Copy reader into proc's stdin on a thread.
+
+    Returns a join() that waits for the copy and re-raises the reader's
+    error (an aborted or stalled upload), which ffmpeg only sees as EOF.
+    """
+    errors = []
+
+    def run():
+        try:
+            while True:
+                block = reader.read(FEED_BLOCK_BYTES)
+                if not block:
+                    break
+                proc.stdin.write(block)
+        except BrokenPipeError:
+            pass    # ffmpeg stopped reading (error, or it has what it needs)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=run, name="ffmpeg-feed", daemon=True)
+    thread.start()
+
+    def join(timeout: Optional[float] = None):
+        thread.join(timeout)
+        if errors:
+            raise errors[0]
+
+    return join
+
+
+def extract_pcm_stream(reader) -> bytes:
+    """extract_pcm for a file-like: demuxing starts on the first bytes read."""
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(
+            _ffmpeg_pcm_cmd("pipe:0"),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=err,
+        )
+        join_feed = feed_stdin(proc, reader)
+        pcm = proc.stdout.read()
+        proc.stdout.close()
+        proc.wait(timeout=FFMPEG_TIMEOUT_SEC)
+        if proc.returncode != 0:
+            # Surface an upload error if that's why; don't wait on a feeder parked on a stalled upload
+            join_feed(timeout=0)
+            err.seek(0)
+            message = err.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg audio extraction failed: {message or proc.returncode}")
+        join_feed()
+    return pcm
+
+
+def pcm_to_wav(pcm: bytes) -> bytes:
+    """Wrap raw PCM in a WAV header (in memory)."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(AUDIO_CHANNELS)
+        wav.setsampwidth(AUDIO_SAMPLE_WIDTH)
+        wav.setframerate(AUDIO_SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return buf.getvalue()
+
+
+def pcm_duration_sec(pcm: bytes) -> float:
+    return len(pcm) / float(AUDIO_SAMPLE_RATE * AUDIO_CHANNELS * AUDIO_SAMPLE_WIDTH)
+
+
+def extract_audio_wav(video_path: str) -> bytes:
+    """Extract the audio track as in-memory WAV bytes."""
+    return pcm_to_wav(extract_pcm(video_path))
+
+
+def extract_audio_to_file(video_path: str, out_dir: Optional[Path] = None) -> Path:
+    """Write the audio track to a private per-call temp WAV; caller deletes it."""
+    with tempfile.NamedTemporaryFile(dir=out_dir, prefix="audio_", suffix=".wav", delete=False) as f:
+        f.write(extract_audio_wav(video_path))
+    return Path(f.name)
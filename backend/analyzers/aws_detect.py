@@ -1,5 +1,5 @@
-import boto3
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,19 +7,29 @@ AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 REGION = os.getenv("AWS_REGION", "us-east-1")
 
-# === Initialize Rekognition client ===
-rekog = boto3.client(
-    "rekognition",
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY,
-    region_name=REGION
-)
+# === Rekognition client (created on first comparison, not at import) ===
+_rekog = None
+_rekog_lock = threading.Lock()
+
+
+def get_rekognition_client():
+    global _rekog
+    with _rekog_lock:
+        if _rekog is None:
+            import boto3
+            _rekog = boto3.client(
+                "rekognition",
+                aws_access_key_id=AWS_ACCESS_KEY,
+                aws_secret_access_key=AWS_SECRET_KEY,
+                region_name=REGION
+            )
+        return _rekog
 
 # === Use this function in place of ai_face_similarity ===
 def aws_face_similarity(img1_path, img2_path):
     """Compare two local images using AWS Rekognition."""
     with open(img1_path, "rb") as img1, open(img2_path, "rb") as img2:
-        response = rekog.compare_faces(
+        response = get_rekognition_client().compare_faces(
             SourceImage={"Bytes": img1.read()},
             TargetImage={"Bytes": img2.read()},
             SimilarityThreshold=0  # we’ll handle threshold manually
@@ -0,0 +1,353 @@
+# chunked_transcriber.py — split long audio on silence and transcribe chunks in parallel
+#
+# Audio is 16 kHz mono s16le PCM (see audio_extract). Chunks overlap by a
+# small margin so words cut at a boundary are heard whole by one side; the
+# overlap is also where speaker labels from neighbouring chunks are matched
+# up, because diarization labels are only consistent within one request.
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .audio_extract import AUDIO_SAMPLE_RATE, pcm_to_wav
+
+CHUNK_TARGET_SEC = 40         # aim for chunks about this long...
+CHUNK_SEARCH_SEC = 10         # ...cutting at the quietest point within ± this
+CHUNK_OVERLAP_SEC = 1.5       # each side of a cut is sent to both chunks
+ENERGY_FRAME_SEC = 0.03
+TRANSCRIBE_MAX_WORKERS = int(os.getenv("TRANSCRIBE_MAX_WORKERS", "4"))
+SPEECH_BACKEND = os.getenv("SPEECH_BACKEND", "google")    # google | local
+WORD_MATCH_TOLERANCE_SEC = 0.35
+
+
+class Chunk(NamedTuple):
+    index: int
+    start: float      # seconds, including leading overlap
+    end: float        # seconds, including trailing overlap
+    keep_from: float  # words starting before this belong to the previous chunk
+    keep_until: float # words starting at/after this belong to the next chunk
+
+
+# ============================================================
+# Splitting
+# ============================================================
+def _frame_energy(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    n = len(samples) // frame_len
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[: n * frame_len].astype(np.float32).reshape(n, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def split_on_silence(
+    pcm: bytes,
+    target_sec: float = CHUNK_TARGET_SEC,
+    search_sec: float = CHUNK_SEARCH_SEC,
+    overlap_sec: float = CHUNK_OVERLAP_SEC,
+) -> List[Chunk]:
+    """Cut near every target_sec at the quietest frame, with overlapping edges."""
+    samples = np.frombuffer(pcm, dtype="<i2")
+    duration = len(samples) / float(AUDIO_SAMPLE_RATE)
+    if duration <= target_sec + search_sec:
+        return [Chunk(0, 0.0, duration, 0.0, duration)]
+
+    frame_len = int(AUDIO_SAMPLE_RATE * ENERGY_FRAME_SEC)
+    energy = _frame_energy(samples, frame_len)
+    cuts: List[float] = []
+    pos = 0.0
+    while duration - pos > target_sec + search_sec:
+        lo = int((pos + target_sec - search_sec) / ENERGY_FRAME_SEC)
+        hi = int((pos + target_sec + search_sec) / ENERGY_FRAME_SEC)
+        window = energy[lo:hi]
+        if len(window) == 0:
+            break
+        # Among the quietest frames, cut at the one nearest the target length
+        quiet = np.flatnonzero(window <= window.min() * 1.5 + 1.0)
+        best = quiet[np.argmin(np.abs(quiet - len(window) // 2))]
+        cut = (lo + int(best) + 0.5) * ENERGY_FRAME_SEC
+        cuts.append(cut)
+        pos = cut
+
+    bounds = [0.0] + cuts + [duration]
+    chunks = []
+    for i in range(len(bounds) - 1):
+        keep_from, keep_until = bounds[i], bounds[i + 1]
+        chunks.append(Chunk(
+            i,
+            max(0.0, keep_from - overlap_sec),
+            min(duration, keep_until + overlap_sec),
+            keep_from,
+            keep_until,
+        ))
+    return chunks
+
+
+def slice_pcm(pcm: bytes, start: float, end: float) -> bytes:
+    a = int(start * AUDIO_SAMPLE_RATE) * 2
+    b = int(end * AUDIO_SAMPLE_RATE) * 2
+    return pcm[a:min(b, len(pcm))]
+
+
+# ============================================================
+# Backends — transcribe(pcm) -> [{"word", "start", "end", "speaker"}]
+# times are relative to the start of the pcm passed in
+# ============================================================
+class GoogleChirpBackend:
+    """Google Cloud Speech v2 (Chirp 3) with diarization, one sync request per chunk."""
+    name = "google"
+
+    def __init__(self, project_id: str, region: str):
+        self.project_id = project_id
+        self.region = region
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        # One shared gRPC client for all chunk threads
+        with self._lock:
+            if self._client is None:
+                from google.cloud.speech_v2 import SpeechClient
+                from google.api_core.client_options import ClientOptions
+                self._client = SpeechClient(
+                    client_options=ClientOptions(api_endpoint=f"{self.region}-speech.googleapis.com")
+                )
+            return self._client
+
+    def transcribe(self, pcm: bytes) -> List[Dict]:
+        from google.cloud.speech_v2.types import cloud_speech
+
+        config = cloud_speech.RecognitionConfig(
+            auto_decoding_config=cloud_speech.AutoDetectDecodingConfig(),
+            language_codes=["en-US"],
+            model="chirp_3",
+            features=cloud_speech.RecognitionFeatures(
+                diarization_config=cloud_speech.SpeakerDiarizationConfig()
+            ),
+        )
+        request = cloud_speech.RecognizeRequest(
+            recognizer=f"projects/{self.project_id}/locations/{self.region}/recognizers/_",
+            config=config,
+            content=pcm_to_wav(pcm),
+        )
+        response = self._get_client().recognize(request=request)
+        return words_from_response(response)
+
+
+class LocalStubBackend:
+    """Offline stand-in: one pseudo-word per voiced stretch, speakers alternate.
+
+    Deterministic for a given input, so the whole pipeline (splitting,
+    stitching, speaker reconciliation) can be exercised and benchmarked
+    without network access. latency_sec simulates a remote round trip.
+    """
+    name = "local"
+
+    def __init__(self, latency_sec: float = float(os.getenv("SPEECH_STUB_LATENCY_SEC", "0"))):
+        self.latency_sec = latency_sec
+
+    def transcribe(self, pcm: bytes) -> List[Dict]:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        samples = np.frombuffer(pcm, dtype="<i2")
+        frame_len = int(AUDIO_SAMPLE_RATE * ENERGY_FRAME_SEC)
+        energy = _frame_energy(samples, frame_len)
+        if len(energy) == 0:
+            return []
+        threshold = max(float(np.percentile(energy, 60)), 1.0)
+        voiced = energy >= threshold
+        words = []
+        turn = 0
+        silent_run = 0
+        i = 0
+        while i < len(voiced):
+            if not voiced[i]:
+                silent_run += 1
+                i += 1
+                continue
+            if silent_run >= int(0.6 / ENERGY_FRAME_SEC) and words:
+                turn += 1  # long pause → the other person talks
+            silent_run = 0
+            j = i
+            while j < len(voiced) and voiced[j]:
+                j += 1
+            start, end = i * ENERGY_FRAME_SEC, j * ENERGY_FRAME_SEC
+            # Word text comes from the audio itself, so overlapping chunks mostly agree
+            level = int(np.mean(energy[i:j])) // 50
+            words.append({
+                "word": f"w{level}",
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "speaker": str(turn % 2 + 1),
+            })
+            i = j
+        return words
+
+
+def get_speech_backend(name: str = SPEECH_BACKEND, project_id: str = "", region: str = "us"):
+    name = (name or "google").lower()
+    if name == "google":
+        return GoogleChirpBackend(project_id, region)
+    if name == "local":
+        return LocalStubBackend()
+    raise ValueError(f"Unknown speech backend: {name}")
+
+
+def words_from_response(response) -> List[Dict]:
+    """Flatten a RecognizeResponse into word dicts."""
+    words = []
+    for result in response.results:
+        if not result.alternatives:
+            continue
+        alt = result.alternatives[0]
+        for w in alt.words:
+            speaker = w.speaker_label if hasattr(w, "speaker_label") else 0
+            words.append({
+                "speaker": speaker,
+                "word": w.word,
+                "start": w.start_offset.total_seconds(),
+                "end": w.end_offset.total_seconds() if w.end_offset else w.start_offset.total_seconds(),
+            })
+    return words
+
+
+# ============================================================
+# Stitching + speaker reconciliation
+# ============================================================
+def _norm_word(word: str) -> str:
+    return re.sub(r"\W+", "", str(word).lower())
+
+
+def _vote_speaker_map(prev_words: Sequence[Dict], next_words: Sequence[Dict]) -> Dict:
+    """Match words both chunks heard in their overlap; vote local → global labels."""
+    votes: Dict[object, Counter] = {}
+    for nw in next_words:
+        key = _norm_word(nw["word"])
+        if not key:
+            continue
+        for pw in prev_words:
+            if _norm_word(pw["word"]) == key and abs(pw["start"] - nw["start"]) <= WORD_MATCH_TOLERANCE_SEC:
+                votes.setdefault(nw["speaker"], Counter())[pw["speaker"]] += 1
+                break
+    mapping = {}
+    taken = set()
+    # Most-confident labels claim their global speaker first
+    for local, counter in sorted(votes.items(), key=lambda kv: -sum(kv[1].values())):
+        for global_label, _ in counter.most_common():
+            if global_label not in taken:
+                mapping[local] = global_label
+                taken.add(global_label)
+                break
+    return mapping
+
+
+def stitch_chunks(chunks: Sequence[Chunk], results: Sequence[List[Dict]]) -> List[Dict]:
+    """Shift words to absolute time, drop overlap duplicates, unify speakers."""
+    stitched: List[Dict] = []
+    known_speakers: List[object] = []
+    prev_abs: List[Dict] = []
+    prev_chunk: Optional[Chunk] = None
+
+    for chunk, words in zip(chunks, results):
+        absolute = [dict(w, start=w["start"] + chunk.start, end=w.get("end", w["start"]) + chunk.start) for w in words]
+
+        if prev_chunk is None:
+            mapping = {}
+            for w in absolute:
+                if w["speaker"] not in mapping:
+                    mapping[w["speaker"]] = w["speaker"]
+        else:
+            lo, hi = chunk.start, prev_chunk.end
+            prev_overlap = [w for w in prev_abs if lo <= w["start"] <= hi]
+            next_overlap = [w for w in absolute if lo <= w["start"] <= hi]
+            mapping = _vote_speaker_map(prev_overlap, next_overlap)
+            # Labels nobody voted on: reuse a free known speaker, else a new one
+            for w in absolute:
+                local = w["speaker"]
+                if local in mapping:
+                    continue
+                used = set(mapping.values())
+                free = [s for s in known_speakers if s not in used]
+                mapping[local] = free[0] if free else f"s{len(known_speakers)}"
+
+        for w in absolute:
+            w["speaker"] = mapping.get(w["speaker"], w["speaker"])
+            if w["speaker"] not in known_speakers:
+                known_speakers.append(w["speaker"])
+
+        stitched.extend(w for w in absolute if chunk.keep_from <= w["start"] < chunk.keep_until)
+        prev_abs, prev_chunk = absolute, chunk
+
+    stitched.sort(key=lambda w: w["start"])
+    return stitched
+
+
+# ============================================================
+# Entry point
+# ============================================================
+def transcribe_pcm(
+    pcm: bytes,
+    backend=None,
+    max_workers: int = TRANSCRIBE_MAX_WORKERS,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict]:
+    """Transcribe PCM chunk-by-chunk in a thread pool; returns absolute-time words."""
+    backend = backend or get_speech_backend("local")
+    chunks = split_on_silence(pcm)
+    total = len(chunks)
+    done = [0]
+    done_lock = threading.Lock()
+
+    def run(chunk: Chunk):
+        words = backend.transcribe(slice_pcm(pcm, chunk.start, chunk.end))
+        if on_progress:
+            with done_lock:
+                done[0] += 1
+                on_progress(done[0], total)
+        return words
+
+    if total == 1:
+        results = [run(chunks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as pool:
+            results = list(pool.map(run, chunks))
+
+    print(f"🗣️ Transcribed {total} chunk(s) with {backend.name} backend.")
+    return stitch_chunks(chunks, results)
+
+
+def next_chunk_start(chunks: Sequence[Chunk]) -> float:
+    """Where the audio for the next live chunk should begin (with overlap)."""
+    return max(0.0, chunks[-1].end - CHUNK_OVERLAP_SEC) if chunks else 0.0
+
+
+def transcribe_appended(
+    chunks: List[Chunk],
+    results: List[List[Dict]],
+    pcm: bytes,
+    pcm_start: float,
+    backend=None,
+) -> List[Dict]:
+    """Live transcription: add one chunk for audio that just arrived.
+
+    pcm runs from pcm_start (next_chunk_start(chunks)) to the end of the
+    audio so far. The cut between the previous chunk and the new one is
+    placed in the middle of their overlap, as split_on_silence would.
+    chunks and results are extended in place; returns every word so far.
+    """
+    backend = backend or get_speech_backend("local")
+    end = pcm_start + len(pcm) / (2.0 * AUDIO_SAMPLE_RATE)
+    if chunks:
+        prev = chunks[-1]
+        boundary = max(pcm_start, (pcm_start + prev.end) / 2)
+        chunks[-1] = prev._replace(keep_until=boundary)
+        chunk = Chunk(len(chunks), pcm_start, end, boundary, end)
+    else:
+        chunk = Chunk(0, pcm_start, end, pcm_start, end)
+    results.append(backend.transcribe(pcm))
+    chunks.append(chunk)
+    return stitch_chunks(chunks, results)
@@ -0,0 +1,187 @@
+# embedding_store.py — append-only binary store for face embeddings
+#
+#   faces_db/embeddings.npy    float32 matrix, one L2-normalised row per enrollment
+#   faces_db/embeddings.jsonl  sidecar log: {"row", "name", "image_path"} / {"rename"}
+#
+# The .npy header is written with a fixed width so appending rows only
+# rewrites the header's shape field in place; existing rows are never moved.
+# Readers map the matrix with np.load(mmap_mode="r") — zero-copy.
+import ast
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_LEN = 128          # total header bytes incl. magic, multiple of 64
+
+
+def npy_header(rows: int, dim: int) -> bytes:
+    body = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, dim)
+    pad = NPY_HEADER_LEN - len(NPY_MAGIC) - 2 - len(body) - 1
+    if pad < 0:
+        raise ValueError("Embedding matrix too large for fixed .npy header.")
+    body = body + " " * pad + "\n"
+    return NPY_MAGIC + len(body).to_bytes(2, "little") + body.encode("latin1")
+
+
+def read_npy_shape(path: Path) -> Tuple[int, int]:
+    with open(path, "rb") as f:
+        head = f.read(NPY_HEADER_LEN)
+    if not head.startswith(NPY_MAGIC):
+        raise ValueError(f"{path} is not a version 1.0 .npy file")
+    header_len = int.from_bytes(head[8:10], "little")
+    meta = ast.literal_eval(head[10:10 + header_len].decode("latin1"))
+    return tuple(meta["shape"])
+
+
+def create_npy(path: Path, dim: int) -> None:
+    if not path.exists():
+        with open(path, "wb") as f:
+            f.write(npy_header(0, dim))
+
+
+def append_npy_rows(path: Path, rows: np.ndarray) -> int:
+    """Append float32 rows to a fixed-header .npy; returns the first new row.
+
+    Callers serialise appends to the same file (EmbeddingStore holds a
+    flock on its directory, as other processes append too).
+    """
+    rows = np.ascontiguousarray(rows, dtype="<f4")
+    count, dim = read_npy_shape(path)
+    if rows.ndim != 2 or rows.shape[1] != dim:
+        raise ValueError(f"Expected rows of width {dim}, got {rows.shape}")
+    with open(path, "r+b") as f:
+        f.seek(NPY_HEADER_LEN + count * dim * 4)
+        f.write(rows.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        # Shape is committed only once the row bytes are on disk
+        f.seek(0)
+        f.write(npy_header(count + len(rows), dim))
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+
+class EmbeddingStore:
+    """Memory-mapped embedding matrix plus a name/offset sidecar log."""
+
+    def __init__(self, root: Path, dim: int):
+        self.root = Path(root)
+        self.dim = dim
+        self.matrix_path = self.root / "embeddings.npy"
+        self.sidecar_path = self.root / "embeddings.jsonl"
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        create_npy(self.matrix_path, dim)
+        self.sidecar_path.touch(exist_ok=True)
+
+    # === Reading ===
+    def __len__(self) -> int:
+        return read_npy_shape(self.matrix_path)[0]
+
+    def load_matrix(self) -> np.ndarray:
+        """Map the matrix read-only; no rows are copied into memory."""
+        rows, _ = read_npy_shape(self.matrix_path)
+        if rows == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.load(self.matrix_path, mmap_mode="r")
+
+    def _replay(self) -> Tuple[Dict[int, str], Dict[str, dict]]:
+        """Replay the sidecar log → ({row: name}, {name: latest record})."""
+        row_names: Dict[int, str] = {}
+        people: Dict[str, dict] = {}
+        with open(self.sidecar_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn trailing write
+                if "rename" in rec:
+                    old, new = rec["rename"], rec["to"]
+                    if old not in people:
+                        continue
+                    if new in people:
+                        row_names.pop(people.pop(new)["row"], None)
+                    info = people.pop(old)
+                    info.update(name=new, image_path=rec.get("image_path", info.get("image_path")))
+                    people[new] = info
+                    row_names[info["row"]] = new
+                elif "remove" in rec:
+                    info = people.pop(rec["remove"], None)
+                    if info:
+                        row_names.pop(info["row"], None)
+                else:
+                    name = rec["name"]
+                    if name in people:
+                        row_names.pop(people[name]["row"], None)
+                    people[name] = rec
+                    row_names[rec["row"]] = name
+        return row_names, people
+
+    def stamp(self) -> Tuple[int, int]:
+        """Changes whenever a row or sidecar record is written (by any process)."""
+        try:
+            return self.matrix_path.stat().st_size, self.sidecar_path.stat().st_size
+        except OSError:
+            return 0, 0
+
+    def people(self) -> Dict[str, dict]:
+        return self._replay()[1]
+
+    def row_names(self) -> List[Optional[str]]:
+        """Name for every matrix row; superseded rows are None."""
+        row_names, _ = self._replay()
+        return [row_names.get(i) for i in range(len(self))]
+
+    # === Writing ===
+    @contextmanager
+    def _locked(self):
+        """Serialise writers across threads and preforked server processes."""
+        with self._lock:
+            fd = os.open(self.root, os.O_RDONLY)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _log(self, record: dict) -> None:
+        with open(self.sidecar_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, name: str, vector: np.ndarray, image_path: str = "") -> int:
+        """Append one embedding row and its sidecar record; returns the row."""
+        row = np.asarray(vector, dtype="<f4").reshape(1, self.dim)
+        with self._locked():
+            rows = append_npy_rows(self.matrix_path, row)
+            self._log({"row": rows, "name": name, "image_path": str(image_path)})
+        return rows
+
+    def rename(self, old_name: str, new_name: str, image_path: Optional[str] = None) -> bool:
+        with self._locked():
+            if old_name not in self.people():
+                return False
+            rec = {"rename": old_name, "to": new_name}
+            if image_path is not None:
+                rec["image_path"] = str(image_path)
+            self._log(rec)
+        return True
+
+    def remove(self, name: str) -> bool:
+        with self._locked():
+            if name not in self.people():
+                return False
+            self._log({"remove": name})
+        return True
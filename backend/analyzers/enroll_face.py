@@ -1,23 +1,17 @@
 # enroll_face.py  — simplified “flat” version
-import cv2, face_recognition, numpy as np, json
+import cv2, numpy as np
 from pathlib import Path
+from .embedding_store import EmbeddingStore
+from .face_index import EMBEDDING_DIM, l2_normalize
 
 # === CONFIG ===
-DB_ROOT = Path("faces_db")
+DB_ROOT = Path(__file__).resolve().parents[1] / "faces_db"
 FACE_DIR = DB_ROOT / "faces"
-EMBED_PATH = DB_ROOT / "embeddings.json"
 
 FACE_DIR.mkdir(parents=True, exist_ok=True)
-if not EMBED_PATH.exists():
-    EMBED_PATH.write_text("{}", encoding="utf-8")
 
-
-# === Utility functions ===
-def load_db():
-    return json.loads(EMBED_PATH.read_text(encoding="utf-8"))
-
-def save_db(db):
-    EMBED_PATH.write_text(json.dumps(db, indent=2), encoding="utf-8")
+# faces_db/embeddings.npy + faces_db/embeddings.jsonl
+embedding_store = EmbeddingStore(DB_ROOT, EMBEDDING_DIM)
 
 
 # === Core enrollment ===
@@ -26,8 +20,11 @@ def enroll(image_path: str, name: str):
     Register a new face embedding and image.
     Saves:
       faces_db/faces/{name}.jpg
-      faces_db/embeddings.json  → { name: {embedding, image_path} }
+      faces_db/embeddings.npy    → appended embedding row
+      faces_db/embeddings.jsonl  → { row, name, image_path }
     """
+    import face_recognition  # dlib: imported on first enrollment, not at startup
+
     if not Path(image_path).exists():
         raise FileNotFoundError(f"Image not found: {image_path}")
 
@@ -42,19 +39,17 @@ def enroll(image_path: str, name: str):
         raise ValueError("No face detected in the image.")
 
     # Use the first face
-    enc = face_recognition.face_encodings(rgb, locs)[0]
+    enc = l2_normalize(face_recognition.face_encodings(rgb, locs)[0])
     # Save cropped face
     safe_name = name.lower().replace(" ", "_")
     save_path = FACE_DIR / f"{safe_name}.jpg"
     cv2.imwrite(str(save_path), bgr)
 
-    # Update embeddings database
-    db = load_db()
-    db[name] = str(save_path)
-    save_db(db)
+    # Append the embedding (keyed by file stem, like the face index)
+    row = embedding_store.append(safe_name, enc, str(save_path))
 
-    print(f"✅ Enrolled {name} → {save_path}")
-    return {"name": name, "image_path": str(save_path)}
+    print(f"✅ Enrolled {name} → {save_path} (embedding row {row})")
+    return {"name": name, "image_path": str(save_path), "row": row}
 
 
 # === Optional test entry point ===
@@ -1,15 +1,16 @@
+import os
 import time
 import cv2, json, uuid
 from pathlib import Path
 import numpy as np
-import face_recognition
-from insightface.app import FaceAnalysis
+from services.cpu_pool import cpu_pool_size, submit_cpu
+from services.model_registry import model_registry
 from .aws_detect import aws_face_similarity
-
-# === Load InsightFace model ===
-print("🔍 Loading InsightFace model (buffalo_l)...")
-face_app = FaceAnalysis(name="buffalo_l")
-face_app.prepare(ctx_id=0, det_size=(640,640))  # higher res for better detection
+from .face_index import FaceIndex, backfill_store_from_images, embed_face_image, embed_face_rgb
+from .enroll_face import embedding_store
+from .frame_sampler import new_sampler_stats, sample_frames, stream_frames
+from .face_detector import DETECTOR_BACKEND, DETECTION_BATCH_SIZE, detect_faces, get_detector
+from .temp_crops import release_crop
 
 # === CONFIG ===
 DB_ROOT = Path(__file__).resolve().parents[1] / "faces_db"
@@ -19,11 +20,108 @@ TEMP_DIR = DB_ROOT / "temp_crops"
 FACE_MATCH_THRESHOLD = 0.25   # higher = more lenient
 FRAME_INTERVAL_SEC = 2      # analyze every ~1.5 seconds
 MIN_VALID_FRAMES = 2          # minimum clear frames to proceed
+FRAME_SAMPLING_MODE = "uniform"  # "uniform" or "scene" (see frame_sampler)
+LIVE_FRAME_INTERVAL_SEC = 0.5    # live sessions sample densely — they stop at the first match
+
+# Early exit: embed faces while scanning, stop once K samples in a row agree on a known person
+FACE_EARLY_EXIT = os.getenv("FACE_EARLY_EXIT", "1") == "1"
+EARLY_EXIT_AGREE_K = int(os.getenv("FACE_EARLY_EXIT_K", "3"))
+EARLY_EXIT_MAX_PROBES = int(os.getenv("FACE_EARLY_EXIT_MAX_PROBES", "8"))   # then assume a new person
+IDENTIFY_BATCH_SIZE = 1       # detect one frame at a time so decoding stops right at the decision
+
+# Cosine similarity on normalised face_recognition encodings
+INDEX_ACCEPT_SCORE = 0.93     # ≈ euclidean 0.37 — confident match, no AWS call
+INDEX_REJECT_SCORE = 0.82     # ≈ euclidean 0.60 — below this nobody matches
+INDEX_TOP_K = 5
+VERIFY_TOP_K = 3              # borderline → verify this many with Rekognition
+AWS_MATCH_THRESHOLD = 80      # AWS similarity is 0–100 scale
 
 # === Setup folders ===
 FACES_DIR.mkdir(parents=True, exist_ok=True)
 TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
+# === Models (loaded on first use or by the boot warm-up, see model_registry) ===
+def load_insightface():
+    from insightface.app import FaceAnalysis
+
+    print("🔍 Loading InsightFace model (buffalo_l)...")
+    face_app = FaceAnalysis(name="buffalo_l")
+    face_app.prepare(ctx_id=0, det_size=(640,640))  # higher res for better detection
+    return face_app
+
+
+def _load_face_detector():
+    # Face detector backend (hog | cnn | insightface)
+    face_app = model_registry.get("insightface") if DETECTOR_BACKEND == "insightface" else None
+    detector = get_detector(DETECTOR_BACKEND, face_app=face_app)
+    print(f"🔍 Face detector backend: {detector.name}")
+    return detector
+
+
+def _load_face_index():
+    global _index_stamp
+    # Map stored embeddings into the face index
+    backfilled = backfill_store_from_images(embedding_store, FACES_DIR)
+    if backfilled:
+        print(f"🗂️ Stored embeddings for {backfilled} previously enrolled face(s).")
+    _index_stamp = embedding_store.stamp()
+    index = FaceIndex.from_store(embedding_store)
+    print(f"🗂️ Face index ready ({len(index)} people).")
+    return index
+
+
+# InsightFace is only needed by its own detector backend
+if DETECTOR_BACKEND == "insightface":
+    model_registry.register("insightface", load_insightface)
+model_registry.register("face_detector", _load_face_detector)
+model_registry.register("face_index", _load_face_index)
+
+
+# Store stamp the index was mapped at; another server process may enroll or rename
+_index_stamp = None
+
+
+def get_face_index() -> FaceIndex:
+    face_index = model_registry.get("face_index")
+    if embedding_store.stamp() != _index_stamp:
+        reload_face_index()
+    return face_index
+
+
+def reload_face_index():
+    """Re-map the embedding store after an enrollment (zero-copy)."""
+    global _index_stamp
+    face_index = model_registry.peek("face_index")
+    if face_index is None:
+        return None  # not loaded yet — the first load reads the store fresh
+    _index_stamp = embedding_store.stamp()
+    face_index.attach(embedding_store.row_names(), embedding_store.load_matrix())
+    return face_index
+
+
+# === Detection in the CPU pool (services/cpu_pool) ===
+def _detect_in_pool(images):
+    # Runs in a pool process: the detector was inherited at fork, or loads once there
+    return model_registry.get("face_detector").detect_batch(images)
+
+
+class _PooledDetector:
+    """The face detector with its batches sent to the CPU pool."""
+
+    def __init__(self, detector, max_inflight: int):
+        self.name = detector.name
+        self.wants_rgb = detector.wants_rgb
+        self.max_inflight = max_inflight
+
+    def submit_batch(self, images):
+        return submit_cpu(_detect_in_pool, images)
+
+
+def _video_detector():
+    detector = model_registry.get("face_detector")
+    workers = cpu_pool_size()
+    return _PooledDetector(detector, workers) if workers else detector
+
 # === Save cropped face with margin ===
 def save_temp_crop(frame, top, right, bottom, left, margin=0.5):
     """Crop a face with margin (to include some background)."""
@@ -45,95 +143,319 @@ def save_temp_crop(frame, top, right, bottom, left, margin=0.5):
     cv2.imwrite(str(path), crop)
     return str(path)
 
-# === Compare with all saved faces ===
-def compare_with_all_faces(new_face_path):
-    """Compare the new cropped face against all faces in faces_db/faces."""
+# === Compare against the face index ===
+def _verify_with_aws(new_face_path, candidates):
+    """Ask Rekognition about the top few index candidates only."""
     best_match = None
     best_score = -1.0
-
-    for face_file in FACES_DIR.glob("*.*"):
+    for name, _ in candidates[:VERIFY_TOP_K]:
+        face_file = FACES_DIR / f"{name}.jpg"
         if not face_file.is_file():
-            continue
+            matches = [f for f in FACES_DIR.glob(f"{name}.*") if f.is_file()]
+            if not matches:
+                continue
+            face_file = matches[0]
         try:
-            print(f"🧠 Comparing new: {new_face_path}  ↔️  existing: {face_file}")
+            print(f"🧠 Verifying new: {new_face_path}  ↔️  candidate: {face_file}")
             sim = aws_face_similarity(new_face_path, face_file)  # 🔹 using AWS
-            print(f"🔍 {face_file.stem}: similarity={sim:.3f}")
+            print(f"🔍 {name}: similarity={sim:.3f}")
             if sim > best_score:
                 best_score = sim
-                best_match = face_file.stem
+                best_match = name
         except Exception as e:
             print(f"⚠️ Skipping {face_file.name}: {e}")
+    return best_match, best_score
+
+
+def compare_with_all_faces(new_face_path, embedding=None):
+    """Match the new cropped face against the in-memory face index.
+
+    Clear wins and clear misses are decided by cosine similarity alone;
+    Rekognition is only called for borderline scores.
+    """
+    if embedding is None:
+        embedding = embed_face_image(new_face_path)
+    if embedding is None:
+        print("⚠️ Could not embed cropped face.")
+        return {"status": "new", "similarity": 0.0, "face_path": new_face_path}
+
+    candidates = get_face_index().search(embedding, k=INDEX_TOP_K)
+    if not candidates:
+        print("🆕 Face index is empty — nobody to match.")
+        return {"status": "new", "similarity": 0.0, "face_path": new_face_path}
+
+    top_name, top_score = candidates[0]
+    print(f"🗂️ Index top match: {top_name} (cosine={top_score:.3f})")
+
+    if top_score >= INDEX_ACCEPT_SCORE:
+        print(f"✅ Best match: {top_name} (cosine={top_score:.3f})")
+        return {"status": "old", "name": top_name, "similarity": round(top_score * 100, 2), "match_source": "index"}
+
+    if top_score < INDEX_REJECT_SCORE:
+        print("🆕 No matching face found.")
+        return {"status": "new", "similarity": round(top_score * 100, 2), "face_path": new_face_path}
 
-    if best_score >= 80:  # AWS similarity is 0–100 scale
+    borderline = [c for c in candidates if c[1] >= INDEX_REJECT_SCORE]
+    best_match, best_score = _verify_with_aws(new_face_path, borderline)
+    if best_match and best_score >= AWS_MATCH_THRESHOLD:
         print(f"✅ Best match: {best_match} (similarity={best_score:.2f}%)")
-        return {"status": "old", "name": best_match, "similarity": best_score}
+        return {"status": "old", "name": best_match, "similarity": best_score, "match_source": "rekognition"}
     else:
         print("🆕 No matching face found.")
-        return {"status": "new", "similarity": best_score, "face_path": new_face_path}
+        return {"status": "new", "similarity": max(best_score, 0.0), "face_path": new_face_path}
 
 
 # === Main video analyzer ===
-def analyze_video(video_path: str):
-    """Find the clearest and most centered face from the video."""
+def face_score(box, w, h):
+    """How good a face is to keep: big (close) and near the frame centre."""
+    top, right, bottom, left = box
+    # --- area score (bigger = closer) ---
+    area = (right - left) * (bottom - top)
+    area_score = area / (w * h)
+
+    # --- center score (face near center = better) ---
+    face_cx = (left + right) / 2
+    face_cy = (top + bottom) / 2
+    frame_cx = w / 2
+    frame_cy = h / 2
+    dist = np.sqrt((face_cx - frame_cx)**2 + (face_cy - frame_cy)**2)
+    max_dist = np.sqrt((w/2)**2 + (h/2)**2)
+    center_score = 1 - (dist / max_dist)
+
+    # --- total score (weighted) ---
+    return (area_score * 0.7) + (center_score * 0.3)
+
+
+class FaceScan:
+    """Running state of a scan over sampled frames.
+
+    Keeps the best (biggest, most centred) face for the crop and, while
+    identifying, embeds each sample's best face and searches the index.
+    The scan is decided once k samples in a row name the same person at
+    INDEX_ACCEPT_SCORE or better. After max_probes embeddings without
+    such a run the person is taken to be new, and the rest of the scan
+    only looks for the best crop (max_probes=None: never give up).
+    vote carries the run across calls (live sessions, one per segment).
+    index defaults to the shared face index.
+    """
+
+    def __init__(self, identify=FACE_EARLY_EXIT, k=EARLY_EXIT_AGREE_K, max_probes=EARLY_EXIT_MAX_PROBES,
+                 vote=None, index=None):
+        self.k = k
+        self.max_probes = max_probes
+        self.vote = dict(vote or {"name": None, "scores": [], "probes": 0})
+        self.index = index if index is not None else get_face_index()
+        self.identify = identify and len(self.index) > 0 and not self._gave_up()
+        self.best_frame = None
+        self.best_box = None
+        self.best_score = 0
+        self.valid_frames = 0
+        self.embedded = 0
+        self.match = None
+        self.started = time.perf_counter()
+        self.decision_ms = None
+
+    def _gave_up(self):
+        return self.max_probes is not None and self.vote["probes"] >= self.max_probes and not self.vote["scores"]
+
+    def add(self, frame, locs):
+        """Take one sample's detections; True once the person is identified."""
+        if not locs:
+            return False
+        self.valid_frames += 1
+        h, w, _ = frame.shape
+        score, box = max((face_score(b, w, h), b) for b in locs)
+        if score > self.best_score:
+            self.best_score = score
+            self.best_frame = frame
+            self.best_box = box
+        if self.identify:
+            self._vote(frame, box)
+        return self.match is not None
+
+    def _vote(self, frame, box):
+        vote = self.vote
+        embedding = embed_face_rgb(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), box)
+        self.embedded += 1
+        vote["probes"] += 1
+        top = self.index.search(embedding, k=1) if embedding is not None else []
+        if top and top[0][1] >= INDEX_ACCEPT_SCORE:
+            name, cosine = top[0]
+            if name != vote["name"]:
+                vote["name"], vote["scores"] = name, []
+            vote["scores"].append(float(cosine))
+        else:
+            vote["name"], vote["scores"] = None, []
+
+        if len(vote["scores"]) >= self.k:
+            self.decision_ms = round((time.perf_counter() - self.started) * 1000, 1)
+            self.match = {
+                "status": "old",
+                "name": vote["name"],
+                "similarity": round(min(vote["scores"]) * 100, 2),
+                "match_source": "index",
+            }
+        elif self._gave_up():
+            self.identify = False
+
+    def save_crop(self):
+        return save_temp_crop(self.best_frame, *self.best_box)
+
+    def report(self, sampler_stats):
+        """Per-scan counters: how much video was decoded/analyzed to decide."""
+        decision_ms = self.decision_ms
+        if decision_ms is None:
+            decision_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        return {
+            "decision": "early_exit" if self.match else "full_scan",
+            "frames_decoded": max(sampler_stats.get("grabbed", 0), sampler_stats.get("retrieved", 0)),
+            "frames_sampled": sampler_stats.get("sampled", 0),
+            "frames_analyzed": sampler_stats.get("frames_analyzed", 0),
+            "faces_embedded": self.embedded,
+            "time_to_decision_ms": decision_ms,
+        }
+
+
+def _crop_from_cache(cache_entry):
+    """Reuse a previous scan of the same upload; returns (status, crop path)."""
+    scan = cache_entry.get_json("face_scan")
+    if scan is None:
+        return None, None
+    if scan.get("status") != "ok":
+        return scan.get("status"), None
+    cached = cache_entry.get_path("face_crop")
+    if cached is None:
+        return None, None
+    # Work on a private copy — the crop may be enrolled or released later
+    path = TEMP_DIR / f"{uuid.uuid4().hex[:8]}.jpg"
+    path.write_bytes(cached.read_bytes())
+    return "ok", str(path)
+
+
+def _match_crop(crop_path):
+    result = compare_with_all_faces(crop_path)
+    if result.get("status") == "old":
+        # Known person — the crop is not needed for enrollment
+        release_crop(crop_path)
+    return result
+
+
+def analyze_video(video_path: str, cache_entry=None, stream=None):
+    """Find the clearest and most centered face from the video.
+
+    stream (a file-like, e.g. an upload still arriving) is decoded as it
+    is read instead of opening video_path.
+    """
     start_time = time.time()
     print(f"🎥 Analyzing faces in: {video_path}")
-    video = cv2.VideoCapture(video_path)
-    if not video.isOpened():
-        return {"status": "error", "message": "Cannot open video file."}
-
-    fps = int(video.get(cv2.CAP_PROP_FPS)) or 25
-    frame_step = max(int(fps * FRAME_INTERVAL_SEC), 1)
-    frame_count = 0
-    best_crop = None
-    best_score = 0
-    valid_frames = 0
-
-    while True:
-        ret, frame = video.read()
-        if not ret:
-            break
-        if frame_count % frame_step == 0:
-            h, w, _ = frame.shape
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locs = face_recognition.face_locations(rgb, model="hog")
-            if not locs:
-                frame_count += 1
-                continue
-
-            valid_frames += 1
-            for (top, right, bottom, left) in locs:
-                # --- area score (bigger = closer) ---
-                area = (right - left) * (bottom - top)
-                area_score = area / (w * h)
 
-                # --- center score (face near center = better) ---
-                face_cx = (left + right) / 2
-                face_cy = (top + bottom) / 2
-                frame_cx = w / 2
-                frame_cy = h / 2
-                dist = np.sqrt((face_cx - frame_cx)**2 + (face_cy - frame_cy)**2)
-                max_dist = np.sqrt((w/2)**2 + (h/2)**2)
-                center_score = 1 - (dist / max_dist)
+    if cache_entry is not None:
+        status, cached_crop = _crop_from_cache(cache_entry)
+        if status == "no_face":
+            print("⚡ Face scan served from cache (no face).")
+            return {"status": "no_face"}
+        if cached_crop:
+            print(f"⚡ Face scan served from cache: {cached_crop}")
+            return dict(_match_crop(cached_crop), scan={"decision": "cached"})
 
-                # --- total score (weighted) ---
-                score = (area_score * 0.7) + (center_score * 0.3)
+    video = None
+    if stream is None:
+        video = cv2.VideoCapture(video_path)
+        if not video.isOpened():
+            return {"status": "error", "message": "Cannot open video file."}
 
-                if score > best_score:
-                    best_score = score
-                    best_crop = save_temp_crop(frame, top, right, bottom, left)
+    # Only the winning frame + box are kept; the crop is encoded once at the end
+    scan = FaceScan()
+    sampler_stats = new_sampler_stats()
+    if stream is not None:
+        samples = stream_frames(stream, FRAME_INTERVAL_SEC, stats=sampler_stats)
+    else:
+        samples = sample_frames(video, FRAME_INTERVAL_SEC, mode=FRAME_SAMPLING_MODE, stats=sampler_stats)
 
-        frame_count += 1
+    # Asked per batch: once identification gives up (new person), full batches resume
+    batch_size = lambda: IDENTIFY_BATCH_SIZE if scan.identify else DETECTION_BATCH_SIZE
+    detections = detect_faces(samples, _video_detector(), batch_size=batch_size, stats=sampler_stats)
+    try:
+        for sample, locs in detections:
+            if scan.add(sample.image, locs):
+                break   # known person — the rest of the video is never decoded
+    finally:
+        detections.close()
+        samples.close()
+        if video is not None:
+            video.release()
 
-    video.release()
+    if scan.match:
+        # Cache the best crop so a retry skips the scan. The retry re-matches
+        # that (brightened) crop with compare_with_all_faces, not this vote
+        if cache_entry is not None:
+            crop = scan.save_crop()
+            cache_entry.put_file("face_crop", crop)
+            cache_entry.put_json("face_scan", {"status": "ok", "score": float(scan.best_score)})
+            release_crop(crop)
+        result = dict(scan.match, scan=scan.report(sampler_stats))
+        print(f"⚡ Early exit: {result['name']} after {sampler_stats['sampled']} sample(s), "
+              f"{result['scan']['time_to_decision_ms']:.0f} ms (similarity={result['similarity']}).")
+        return result
 
-    if valid_frames < MIN_VALID_FRAMES or not best_crop:
+    if scan.valid_frames < MIN_VALID_FRAMES or scan.best_frame is None:
         print("⚠️ Too few valid frames or unclear face.")
-        return {"status": "no_face"}
+        if cache_entry is not None:
+            cache_entry.put_json("face_scan", {"status": "no_face"})
+        return {"status": "no_face", "scan": scan.report(sampler_stats)}
+
+    best_crop = scan.save_crop()
+    scan.best_frame = None
+    if cache_entry is not None:
+        cache_entry.put_file("face_crop", best_crop)
+        cache_entry.put_json("face_scan", {"status": "ok", "score": float(scan.best_score)})
 
     elapsed = time.time() - start_time
-    print(f"✅ analyze_video completed in {elapsed:.2f} seconds.")
-    print(f"🧠 Best cropped face saved: {best_crop} (score={best_score:.3f})")
-    return compare_with_all_faces(best_crop)
+    print(f"✅ analyze_video completed in {elapsed:.2f} seconds "
+          f"({sampler_stats['sampled']} frames sampled, {sampler_stats['seeks']} seeks).")
+    print(f"🧠 Best cropped face saved: {best_crop} (score={scan.best_score:.3f})")
+    result = _match_crop(best_crop)
+    result["scan"] = scan.report(sampler_stats)
+    return result
+
+
+# === Live sessions: identify from each segment as it arrives ===
+def scan_segment(video_path: str, vote=None, interval_sec: float = LIVE_FRAME_INTERVAL_SEC):
+    """Early-exit scan of one short clip of a live conversation.
+
+    vote is the previous segment's result["vote"], so K samples in a row
+    may span segments. Live scans never give up identifying. Without a
+    decision the clip's best crop is returned, so the session can keep
+    the best one for its closing match.
+    """
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        return {"status": "no_video", "vote": vote}
+
+    scan = FaceScan(max_probes=None, vote=vote)
+    stats = new_sampler_stats()
+    samples = sample_frames(video, interval_sec, stats=stats)
+    detections = detect_faces(samples, _video_detector(), batch_size=IDENTIFY_BATCH_SIZE, stats=stats)
+    timestamp = None
+    try:
+        for sample, locs in detections:
+            if scan.add(sample.image, locs):
+                timestamp = sample.timestamp
+                break
+    finally:
+        detections.close()
+        samples.close()
+        video.release()
+
+    report = scan.report(stats)
+    if scan.match:
+        print(f"✅ Live match at {timestamp:.1f}s: {scan.match['name']} (similarity={scan.match['similarity']})")
+        return dict(scan.match, timestamp=timestamp, vote=scan.vote, scan=report)
+    if scan.best_frame is None:
+        return {"status": "no_face", "vote": scan.vote, "scan": report}
+    return {"status": "scanning", "crop": scan.save_crop(), "score": float(scan.best_score),
+            "vote": scan.vote, "scan": report}
+
 
 # === Example Run ===
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+# face_detector.py — batched face detection on downscaled frames
+import os
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+# (top, right, bottom, left) — the face_recognition box convention
+Box = Tuple[int, int, int, int]
+
+DETECTOR_BACKEND = os.getenv("FACE_DETECTOR", "hog")   # hog | cnn | insightface
+DETECTION_MAX_SIDE = int(os.getenv("FACE_DETECTION_MAX_SIDE", "640"))
+DETECTION_BATCH_SIZE = int(os.getenv("FACE_DETECTION_BATCH_SIZE", "8"))
+INSIGHTFACE_MIN_SCORE = 0.5
+
+
+# === Backends ===
+class HogDetector:
+    """dlib HOG via face_recognition — CPU friendly, one image at a time."""
+    name = "hog"
+    wants_rgb = True
+
+    def __init__(self):
+        import face_recognition  # dlib: imported when the detector is built
+        self._fr = face_recognition
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[Box]]:
+        return [self._fr.face_locations(img, model="hog") for img in images]
+
+
+class CnnDetector:
+    """dlib CNN via face_recognition — real batching, best on a GPU."""
+    name = "cnn"
+    wants_rgb = True
+
+    def __init__(self):
+        import face_recognition
+        self._fr = face_recognition
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[Box]]:
+        if not images:
+            return []
+        shapes = {img.shape for img in images}
+        if len(shapes) > 1:
+            # batch_face_locations needs equally sized images
+            return [self._fr.face_locations(img, model="cnn") for img in images]
+        return self._fr.batch_face_locations(
+            list(images), number_of_times_to_upsample=0, batch_size=len(images)
+        )
+
+
+class InsightFaceDetector:
+    """RetinaFace detector from the already-loaded InsightFace pack."""
+    name = "insightface"
+    wants_rgb = False
+
+    def __init__(self, face_app):
+        if face_app is None or getattr(face_app, "det_model", None) is None:
+            raise ValueError("InsightFace detector requires a prepared FaceAnalysis app.")
+        self.det_model = face_app.det_model
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[Box]]:
+        results: List[List[Box]] = []
+        for img in images:
+            bboxes, _ = self.det_model.detect(img, max_num=0, metric="default")
+            boxes: List[Box] = []
+            for x1, y1, x2, y2, score in bboxes:
+                if score < INSIGHTFACE_MIN_SCORE:
+                    continue
+                boxes.append((int(y1), int(x2), int(y2), int(x1)))
+            results.append(boxes)
+        return results
+
+
+def get_detector(name: str = DETECTOR_BACKEND, face_app=None):
+    name = (name or "hog").lower()
+    if name == "hog":
+        return HogDetector()
+    if name == "cnn":
+        return CnnDetector()
+    if name == "insightface":
+        return InsightFaceDetector(face_app)
+    raise ValueError(f"Unknown face detector backend: {name}")
+
+
+# === Detection stage ===
+def _downscale(frame: np.ndarray, max_side: int, to_rgb: bool) -> Tuple[np.ndarray, float]:
+    h, w = frame.shape[:2]
+    scale = min(1.0, max_side / float(max(h, w))) if max_side else 1.0
+    small = frame
+    if scale < 1.0:
+        small = cv2.resize(frame, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    if to_rgb:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    return small, scale
+
+
+def _to_full_res(box: Box, scale: float, h: int, w: int) -> Box:
+    top, right, bottom, left = (v / scale for v in box)
+    return (
+        max(0, int(round(top))),
+        min(w, int(round(right))),
+        min(h, int(round(bottom))),
+        max(0, int(round(left))),
+    )
+
+
+def detect_faces(
+    samples: Iterable,
+    detector,
+    max_side: int = DETECTION_MAX_SIDE,
+    batch_size: Union[int, Callable[[], int]] = DETECTION_BATCH_SIZE,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[Tuple[object, List[Box]]]:
+    """Yield (sample, boxes) with boxes in full-resolution frame coordinates.
+
+    samples are frame_sampler.SampledFrame; frames are downscaled so the
+    long side is at most max_side and sent to the detector batch_size at a time
+    (a callable batch_size is asked again for every batch).
+    A detector with submit_batch (returning a Future) keeps up to its
+    max_inflight batches detecting at once; results still come out in order.
+    """
+    submit = getattr(detector, "submit_batch", None)
+    max_inflight = max(1, getattr(detector, "max_inflight", 1)) if submit else 1
+    pending = deque()
+    batch, smalls, scales = [], [], []
+
+    def dispatch():
+        nonlocal batch, smalls, scales
+        found = submit(smalls) if submit else detector.detect_batch(smalls)
+        if stats is not None:
+            stats["detector_calls"] = stats.get("detector_calls", 0) + 1
+            stats["frames_analyzed"] = stats.get("frames_analyzed", 0) + len(smalls)
+        pending.append((batch, scales, found))
+        batch, smalls, scales = [], [], []
+
+    def drain(keep: int):
+        while len(pending) > keep:
+            done_batch, done_scales, found = pending.popleft()
+            if submit:
+                found = found.result()
+            for sample, scale, boxes in zip(done_batch, done_scales, found):
+                h, w = sample.image.shape[:2]
+                yield sample, [_to_full_res(b, scale, h, w) for b in boxes]
+
+    for sample in samples:
+        small, scale = _downscale(sample.image, max_side, detector.wants_rgb)
+        batch.append(sample)
+        smalls.append(small)
+        scales.append(scale)
+        if len(batch) >= (batch_size() if callable(batch_size) else batch_size):
+            dispatch()
+            yield from drain(max_inflight - 1)
+    if batch:
+        dispatch()
+    yield from drain(0)
@@ -0,0 +1,163 @@
+# face_index.py — in-memory cosine index over enrolled face embeddings
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+EMBEDDING_DIM = 128           # face_recognition / dlib encodings
+
+
+# === Embedding helpers ===
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)."""
+    arr = np.ascontiguousarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm > 0 else arr
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def embed_face_rgb(rgb: np.ndarray, location: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+    """Encode one face from an RGB image; detects the face if no box is given."""
+    import face_recognition  # dlib: imported on first encode, not at startup
+
+    if location is None:
+        locs = face_recognition.face_locations(rgb, model="hog")
+        if not locs:
+            # Crops are already tight around the face — use the whole image
+            h, w = rgb.shape[:2]
+            locs = [(0, w, h, 0)]
+        location = locs[0]
+    encodings = face_recognition.face_encodings(rgb, [location])
+    if not encodings:
+        return None
+    return l2_normalize(encodings[0])
+
+
+def embed_face_image(image_path) -> Optional[np.ndarray]:
+    """Read an image from disk and return its normalised face embedding."""
+    bgr = cv2.imread(str(image_path))
+    if bgr is None:
+        return None
+    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    return embed_face_rgb(rgb)
+
+
+# === Index ===
+class FaceIndex:
+    """Contiguous matrix of L2-normalised embeddings searched with one mat-vec.
+
+    Rows are append-only; a name that is re-enrolled points at its newest row
+    and older rows are masked out of search results.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._names: List[Optional[str]] = []
+        self._live = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return int(self._live.sum())
+
+    @property
+    def names(self) -> List[str]:
+        return [n for n in self._names if n is not None]
+
+    def set_all(self, names: Sequence[Optional[str]], vectors: np.ndarray) -> None:
+        """Replace the whole index in one go (startup build)."""
+        matrix = l2_normalize(vectors).reshape(-1, self.dim) if len(names) else np.empty((0, self.dim), dtype=np.float32)
+        with self._lock:
+            self._matrix = matrix
+            self._names = list(names)
+            self._live = np.array([n is not None for n in self._names], dtype=bool)
+
+    def attach(self, names: Sequence[Optional[str]], matrix: np.ndarray) -> None:
+        """Search an already-normalised float32 matrix in place (e.g. a memmap)."""
+        if matrix.dtype != np.float32 or not matrix.flags["C_CONTIGUOUS"]:
+            matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        with self._lock:
+            self._matrix = matrix.reshape(-1, self.dim)
+            self._names = list(names)
+            self._live = np.array([n is not None for n in self._names], dtype=bool)
+
+    def add(self, name: str, vector: np.ndarray) -> None:
+        """Add or replace a person's embedding."""
+        row = l2_normalize(vector).reshape(1, self.dim)
+        with self._lock:
+            self._drop(name)
+            self._matrix = np.ascontiguousarray(np.vstack([self._matrix, row]))
+            self._names.append(name)
+            self._live = np.append(self._live, True)
+
+    def _drop(self, name: str) -> bool:
+        changed = False
+        for i, n in enumerate(self._names):
+            if n == name:
+                self._names[i] = None
+                self._live[i] = False
+                changed = True
+        return changed
+
+    def rename(self, old_name: str, new_name: str) -> bool:
+        with self._lock:
+            changed = False
+            if old_name != new_name:
+                self._drop(new_name)
+            for i, n in enumerate(self._names):
+                if n == old_name:
+                    self._names[i] = new_name
+                    changed = True
+            return changed
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            return self._drop(name)
+
+    def search(self, query: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to k (name, cosine similarity) pairs, best first."""
+        with self._lock:
+            matrix, names, live = self._matrix, list(self._names), self._live.copy()
+        if not len(names):
+            return []
+        q = l2_normalize(query).reshape(self.dim)
+        scores = matrix @ q
+        scores[~live] = -np.inf
+        k = min(k, int(live.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(names[i], float(scores[i])) for i in top]
+
+    @classmethod
+    def from_store(cls, store) -> "FaceIndex":
+        """Map an EmbeddingStore zero-copy; rows are stored pre-normalised."""
+        index = cls(store.dim)
+        index.attach(store.row_names(), store.load_matrix())
+        return index
+
+
+def backfill_store_from_images(store, faces_dir: Path) -> int:
+    """Embed enrolled face images that have no stored vector yet."""
+    known = set(store.people())
+    added = 0
+    for face_file in sorted(faces_dir.glob("*.*")):
+        if not face_file.is_file() or face_file.stem in known:
+            continue
+        try:
+            vec = embed_face_image(face_file)
+        except Exception as e:
+            print(f"⚠️ Could not embed {face_file.name}: {e}")
+            continue
+        if vec is None:
+            print(f"⚠️ No face embedding for {face_file.name}, skipping.")
+            continue
+        store.append(face_file.stem, vec, str(face_file))
+        added += 1
+    return added
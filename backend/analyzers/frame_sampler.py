@@ -0,0 +1,188 @@
+# frame_sampler.py — pick frames out of a video without decoding the rest
+import subprocess
+import tempfile
+from typing import Dict, Iterator, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from .audio_extract import FFMPEG_TIMEOUT_SEC, feed_stdin, ffmpeg_exe
+
+SAMPLING_MODES = ("uniform", "scene")
+
+SEEK_MIN_GAP_SEC = 1.0        # farther than this → seek instead of grab()
+SCENE_PROBE_SEC = 0.5         # scene mode: how often to look for a cut
+SCENE_THUMB_SIZE = (64, 36)   # tiny grayscale thumbnail used for diffs
+SCENE_CHANGE_THRESHOLD = 18.0 # mean abs pixel diff (0–255) that counts as a cut
+SCENE_MAX_GAP_FACTOR = 3      # never go longer than interval * factor without a sample
+
+
+class SampledFrame(NamedTuple):
+    index: int
+    timestamp: float
+    image: np.ndarray
+
+
+def new_sampler_stats() -> Dict[str, int]:
+    return {"grabbed": 0, "retrieved": 0, "seeks": 0, "sampled": 0}
+
+
+def _video_fps(video) -> float:
+    fps = video.get(cv2.CAP_PROP_FPS)
+    return fps if fps and fps > 1 else 25.0
+
+
+def _seek(video, frame_index: int, fps: float) -> bool:
+    """Jump straight to a frame; the decoder restarts from the nearest keyframe."""
+    ok = video.set(cv2.CAP_PROP_POS_MSEC, frame_index * 1000.0 / fps)
+    return bool(ok)
+
+
+def _iter_uniform(video, fps: float, interval_sec: float, stats: dict) -> Iterator[SampledFrame]:
+    step = max(int(round(fps * interval_sec)), 1)
+    seek_gap = max(int(fps * SEEK_MIN_GAP_SEC), 2)
+    position = 0            # index of the next frame grab() would return
+    target = 0
+    can_seek = True
+
+    while True:
+        gap = target - position
+        if gap >= seek_gap and can_seek:
+            if _seek(video, target, fps):
+                stats["seeks"] += 1
+                actual = video.get(cv2.CAP_PROP_POS_FRAMES)
+                position = int(actual) if actual and actual > 0 else target
+                if position > target:
+                    # Backend landed past the target — accept the nearer frame
+                    target = position
+                gap = target - position
+            else:
+                can_seek = False
+
+        # Short gaps: grab() only demuxes/decodes, no BGR conversion or copy
+        for _ in range(max(gap, 0)):
+            if not video.grab():
+                return
+            stats["grabbed"] += 1
+            position += 1
+
+        if not video.grab():
+            return
+        stats["grabbed"] += 1
+        ok, frame = video.retrieve()
+        position += 1
+        if not ok or frame is None:
+            return
+        stats["retrieved"] += 1
+        yield SampledFrame(target, target / fps, frame)
+        target += step
+
+
+def _thumb(frame: np.ndarray) -> np.ndarray:
+    small = cv2.resize(frame, SCENE_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+def _iter_scene(video, fps: float, interval_sec: float, stats: dict) -> Iterator[SampledFrame]:
+    """Probe a few frames per second; emit one only on a cut or after max gap."""
+    probe_step = max(int(round(fps * SCENE_PROBE_SEC)), 1)
+    max_gap = max(int(round(fps * interval_sec * SCENE_MAX_GAP_FACTOR)), probe_step)
+    last_thumb = None
+    last_emitted = None
+
+    for probe in _iter_uniform(video, fps, probe_step / fps, stats):
+        thumb = _thumb(probe.image)
+        if last_thumb is None:
+            changed = True
+        else:
+            changed = float(np.mean(np.abs(thumb - last_thumb))) >= SCENE_CHANGE_THRESHOLD
+        overdue = last_emitted is not None and probe.index - last_emitted >= max_gap
+        if changed or overdue:
+            last_thumb = thumb
+            last_emitted = probe.index
+            yield probe
+
+
+def sample_frames(
+    video,
+    interval_sec: float,
+    mode: str = "uniform",
+    stats: Optional[dict] = None,
+) -> Iterator[SampledFrame]:
+    """Yield frames from an opened cv2.VideoCapture.
+
+    uniform — one frame every interval_sec, skipping the rest with seeks
+              (long gaps) or grab() (short gaps) so they are never converted.
+    scene   — cheap thumbnail probes; a frame is emitted on a scene change,
+              or when interval_sec * SCENE_MAX_GAP_FACTOR passes without one.
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode: {mode}")
+    stats = stats if stats is not None else new_sampler_stats()
+    fps = _video_fps(video)
+    iterator = _iter_scene if mode == "scene" else _iter_uniform
+    for sample in iterator(video, fps, interval_sec, stats):
+        stats["sampled"] += 1
+        yield sample
+
+
+# === Streaming input ===
+def _read_exact(pipe, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        block = pipe.read(n - len(buf))
+        if not block:
+            break
+        buf += block
+    return buf
+
+
+def stream_frames(reader, interval_sec: float, stats: Optional[dict] = None) -> Iterator[SampledFrame]:
+    """Yield one frame every interval_sec from a file-like, as it is read.
+
+    For input that is still arriving (see services/uploads), where
+    cv2.VideoCapture can't be used: ffmpeg demuxes from stdin, keeps one
+    frame per interval with its fps filter and writes each as an
+    uncompressed BMP to a pipe. Frames therefore come out while the
+    rest of the file is still on its way. Indexes count samples, not
+    source frames.
+    """
+    stats = stats if stats is not None else new_sampler_stats()
+    cmd = [
+        ffmpeg_exe(),
+        "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-an", "-sn", "-dn",
+        "-vf", f"fps=1/{interval_sec:g}",
+        "-f", "image2pipe", "-vcodec", "bmp",
+        "pipe:1",
+    ]
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=err)
+        join_feed = feed_stdin(proc, reader)
+        count = 0
+        try:
+            while True:
+                header = _read_exact(proc.stdout, 14)
+                if len(header) < 14:
+                    break
+                body = _read_exact(proc.stdout, int.from_bytes(header[2:6], "little") - 14)
+                frame = cv2.imdecode(np.frombuffer(header + body, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    break
+                stats["retrieved"] += 1
+                stats["sampled"] += 1
+                yield SampledFrame(count, count * interval_sec, frame)
+                count += 1
+        finally:
+            # The consumer may stop early: don't leave ffmpeg blocked on a full pipe
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait(timeout=FFMPEG_TIMEOUT_SEC)
+        if proc.returncode != 0 and count == 0:
+            join_feed(timeout=0)
+            err.seek(0)
+            message = err.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg frame extraction failed: {message or proc.returncode}")
+        join_feed(timeout=0)
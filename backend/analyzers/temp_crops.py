@@ -0,0 +1,92 @@
+# temp_crops.py — lifecycle for faces_db/temp_crops
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+TEMP_CROPS_MAX_BYTES = int(os.getenv("TEMP_CROPS_MAX_BYTES", str(200 * 1024 * 1024)))
+TEMP_CROPS_MAX_AGE_SEC = int(os.getenv("TEMP_CROPS_MAX_AGE_SEC", str(24 * 3600)))
+TEMP_CROPS_MIN_AGE_SEC = 15 * 60     # in-flight crops (waiting on a transcript) are safe
+JANITOR_INTERVAL_SEC = 10 * 60
+
+_janitor_started = False
+_janitor_lock = threading.Lock()
+
+
+def release_crop(path: Optional[str]) -> None:
+    """Delete a crop as soon as nothing needs it any more."""
+    if not path:
+        return
+    try:
+        Path(path).unlink(missing_ok=True)
+    except OSError as e:
+        print(f"⚠️ Could not remove temp crop {path}: {e}")
+
+
+def sweep(
+    temp_dir: Path,
+    max_bytes: int = TEMP_CROPS_MAX_BYTES,
+    max_age_sec: int = TEMP_CROPS_MAX_AGE_SEC,
+) -> Dict[str, int]:
+    """Drop crops older than max_age_sec, then the oldest until under max_bytes."""
+    now = time.time()
+    files = []
+    removed = freed = 0
+    for path in Path(temp_dir).glob("*"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        if not path.is_file():
+            continue
+        if now - st.st_mtime > max_age_sec:
+            release_crop(str(path))
+            removed += 1
+            freed += st.st_size
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    files.sort()
+    for mtime, size, path in files:
+        if total <= max_bytes:
+            break
+        if now - mtime < TEMP_CROPS_MIN_AGE_SEC:
+            break
+        release_crop(str(path))
+        removed += 1
+        freed += size
+        total -= size
+
+    if removed:
+        print(f"🧹 Temp crops: removed {removed} file(s), freed {freed / 1e6:.1f} MB, {total / 1e6:.1f} MB left.")
+    return {"removed": removed, "freed_bytes": freed, "remaining_bytes": total}
+
+
+def start_janitor(
+    temp_dir: Path,
+    interval_sec: int = JANITOR_INTERVAL_SEC,
+    sweeps: Sequence[Callable[[], Any]] = (),
+) -> None:
+    """Sweep once now, then every interval_sec on a daemon thread.
+
+    sweeps are further cleanups (finished live sessions) run on the same
+    schedule.
+    """
+    global _janitor_started
+    with _janitor_lock:
+        if _janitor_started:
+            return
+        _janitor_started = True
+
+    def loop():
+        while True:
+            for job in (lambda: sweep(temp_dir), *sweeps):
+                try:
+                    job()
+                except Exception as e:
+                    print(f"⚠️ Janitor sweep failed: {e}")
+            time.sleep(interval_sec)
+
+    threading.Thread(target=loop, name="temp-crop-janitor", daemon=True).start()
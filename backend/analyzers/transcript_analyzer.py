@@ -1,12 +1,16 @@
 import os
 import json
-import time
-from moviepy import VideoFileClip
-from google.cloud.speech_v2 import SpeechClient
-from google.cloud.speech_v2.types import cloud_speech
-from google.api_core.client_options import ClientOptions
 from dotenv import load_dotenv
-from google import genai
+from .audio_extract import AUDIO_SAMPLE_RATE, extract_pcm, extract_pcm_stream
+from .chunked_transcriber import (
+    SPEECH_BACKEND,
+    Chunk,
+    get_speech_backend,
+    next_chunk_start,
+    transcribe_appended,
+    transcribe_pcm,
+)
+from services import llm_gateway
 
 # ============================================================
 # GOOGLE + GEMINI SETUP
@@ -21,66 +25,23 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(
 PROJECT_ID = "red-atlas-478321-k3"
 REGION = "us"
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client_gem = genai.Client(api_key=GEMINI_API_KEY)
-
 VIDEO_PATH = "../../videos/parker.mp4"
 
-# ============================================================
-# 1. Extract Audio (MP4 → WAV)
-# ============================================================
-def extract_audio(video_path):
-    wav_path = "temp_audio.wav"
-    clip = VideoFileClip(video_path)
-    clip.audio.write_audiofile(wav_path, logger=None)
-    return wav_path
+# Chunked recognizer (SPEECH_BACKEND=local for an offline stand-in)
+speech_backend = get_speech_backend(SPEECH_BACKEND, project_id=PROJECT_ID, region=REGION)
 
 # ============================================================
-# 2. Google Cloud Chirp 3 Transcription + DIARIZATION
+# 1. Long recordings: split on silence, recognize chunks in parallel
 # ============================================================
-def transcribe_diarization(audio_path):
-    client = SpeechClient(
-        client_options=ClientOptions(
-            api_endpoint=f"{REGION}-speech.googleapis.com"
-        )
-    )
-
-    with open(audio_path, "rb") as f:
-        audio_content = f.read()
-
-    config = cloud_speech.RecognitionConfig(
-        auto_decoding_config=cloud_speech.AutoDetectDecodingConfig(),
-        language_codes=["en-US"],
-        model="chirp_3",
-        features=cloud_speech.RecognitionFeatures(
-            diarization_config=cloud_speech.SpeakerDiarizationConfig()
-        ),
-    )
-
-    request = cloud_speech.RecognizeRequest(
-        recognizer=f"projects/{PROJECT_ID}/locations/{REGION}/recognizers/_",
-        config=config,
-        content=audio_content,
-    )
-
-    return client.recognize(request=request)
+def transcribe_chunked(pcm, on_progress=None):
+    """Return stitched words with absolute offsets and reconciled speakers."""
+    return transcribe_pcm(pcm, backend=speech_backend, on_progress=on_progress)
 
 # ============================================================
-# 3. Convert diarization → clean transcript w/ Speaker 0 & 1
+# 2. Convert diarization → clean transcript w/ Speaker 0 & 1
 # ============================================================
-def build_transcript(response):
-    all_words = []
-
-    for result in response.results:
-        alt = result.alternatives[0]
-        for w in alt.words:
-            speaker = w.speaker_label if hasattr(w, "speaker_label") else 0
-            all_words.append({
-                "speaker": speaker,
-                "word": w.word,
-                "start": w.start_offset.total_seconds()
-            })
-
+def build_sentences(words):
+    all_words = [dict(w) for w in words]
     all_words.sort(key=lambda x: x["start"])
 
     # Normalize speaker labels to 0 and 1
@@ -117,7 +78,7 @@ def build_transcript(response):
     return sentences
 
 # ============================================================
-# 4. Send clean transcript to Gemini for Name + Keywords
+# 3. Send clean transcript to Gemini for Name + Keywords
 # ============================================================
 def ask_gemini(sentences):
     conv_text = "\n".join(
@@ -264,48 +225,70 @@ def ask_gemini(sentences):
     }}
     """
 
-    response = client_gem.models.generate_content(
-        model="gemini-2.0-flash-lite",
-        contents=prompt
-    )
-
-    raw_output = (response.text or "").strip()
-    print("Gemini Raw Output:")
-    print(raw_output)
-
-    text_output = raw_output
-    # Remove markdown code blocks if present
-    if text_output.startswith("```"):
-        lines = text_output.split("\n")
-        text_output = "\n".join(lines[1:-1])  # Remove first and last lines
-        if text_output.startswith("json"):
-            text_output = text_output[4:].strip()
-
-    # try:
-    parsed = json.loads(text_output)
-    # except Exception as e:
-    #     # print("⚠️ Failed to parse Gemini output:", e)
-    #     # print("Raw output was:\n", text_output)
-    #     raise
-
-    # print("Gemini Parsed JSON:")
-    # print(json.dumps(parsed, indent=2))
-    return parsed
+    # Shared client, deadline, retries and fence-stripping live in the gateway
+    return llm_gateway.generate_json(prompt, call_site="transcript.ask_gemini")
 
 # ============================================================
 # MAIN PIPELINE
 # ============================================================
-def analyze_video(video_path):
-    audio_path = extract_audio(video_path)
-    g_response = transcribe_diarization(audio_path)
-    sentences = build_transcript(g_response)
+def analyze_video(video_path, cache_entry=None, stream=None):
+    """cache_entry (services.result_cache.CacheEntry) short-circuits any
+    stage whose output is already stored for this exact upload. With
+    stream (a file-like, e.g. an upload still arriving) audio is
+    extracted as it is read instead of from video_path."""
+    if cache_entry is not None:
+        cached = cache_entry.get_json("gemini")
+        if cached is not None:
+            print("⚡ Transcript analysis served from cache.")
+            return cached
+
+    sentences = cache_entry.get_json("sentences") if cache_entry is not None else None
+    if sentences is None:
+        pcm = cache_entry.get_bytes("audio") if cache_entry is not None else None
+        if pcm is None:
+            pcm = extract_pcm_stream(stream) if stream is not None else extract_pcm(video_path)
+            if cache_entry is not None:
+                cache_entry.put_bytes("audio", pcm)
+        words = transcribe_chunked(pcm)
+        sentences = build_sentences(words)
+        if cache_entry is not None:
+            cache_entry.put_json("sentences", sentences)
+
     final_json = ask_gemini(sentences)
+    if cache_entry is not None:
+        cache_entry.put_json("gemini", final_json)
     return final_json
 
 # Alias for app.py compatibility
-def analyze_transcript(video_path):
+def analyze_transcript(video_path, cache_entry=None, stream=None):
     """Alias for analyze_video to match app.py import."""
-    return analyze_video(video_path)
+    return analyze_video(video_path, cache_entry=cache_entry, stream=stream)
+
+# ============================================================
+# 4. Live sessions: transcribe each segment as it arrives
+# ============================================================
+def transcribe_live_segment(live, audio_path, pcm):
+    """Add one segment's audio to a live transcript; returns all words so far.
+
+    live is the session's JSON-able transcript state ({"chunks",
+    "results", "audio_bytes"}) and is updated in place. The session's
+    audio accumulates in audio_path; only the new audio plus the overlap
+    with the previous segment is sent to the speech backend.
+    """
+    chunks = [Chunk(*c) for c in live.get("chunks", [])]
+    results = live.get("results", [])
+    audio_bytes = live.get("audio_bytes", 0)
+    with open(audio_path, "ab") as f:
+        # Drop audio a failed attempt appended after the last saved state
+        f.truncate(audio_bytes)
+        f.write(pcm)
+    start_byte = int(next_chunk_start(chunks) * AUDIO_SAMPLE_RATE) * 2
+    with open(audio_path, "rb") as f:
+        f.seek(start_byte)
+        audio = f.read()
+    words = transcribe_appended(chunks, results, audio, start_byte / (2.0 * AUDIO_SAMPLE_RATE), backend=speech_backend)
+    live.update(chunks=[list(c) for c in chunks], results=results, audio_bytes=audio_bytes + len(pcm))
+    return words
 
 # ============================================================
 # RUN
@@ -1,36 +1,65 @@
 # app.py
+import time
+_BOOT_T0 = time.perf_counter()
+
 import os
 import json
 import threading
-import time
 import re
-import difflib
+import uuid
 from dotenv import load_dotenv
 from pathlib import Path
-from analyzers.face_analyzer import analyze_video
-from analyzers.transcript_analyzer import analyze_transcript
+from analyzers.face_analyzer import analyze_video, compare_with_all_faces, scan_segment
+from analyzers.transcript_analyzer import analyze_transcript, ask_gemini, build_sentences, transcribe_live_segment
+from analyzers.audio_extract import extract_pcm
 from analyzers.enroll_face import enroll
-# from analyzers.transcript_analyzer import whisper_model
-# from analyzers.face_analyzer import face_app
-# from analyzers.transcript_analyzer import whisper_model
-from analyzers.face_analyzer import face_app
+from analyzers.face_analyzer import reload_face_index
+from analyzers.enroll_face import embedding_store
+from analyzers.temp_crops import release_crop, start_janitor
 from services.linkedin_enricher import enrich_linkedin_profile
+from services.browser_pool import warm_in_background as warm_browser_pool
 from services.highlights import (
     detect_and_store_highlights,
-    get_upcoming_highlights,
+    MAX_RETURNED_HIGHLIGHTS,
+    VALID_HIGHLIGHT_STATUSES,
+    parse_time_bound,
+    query_highlights,
+    rename_person as rename_person_highlights,
     set_highlight_status,
+    start_compaction as start_highlight_compaction,
 )
-from google import genai
-
-print("✅ All AI models preloaded (Whisper + InsightFace). Ready to process requests.")
+from services.jobs import JobQueue
+from services.live_sessions import LiveSessions, SegmentTooLarge, SessionClosed
+from services.result_cache import ResultCache
+from services.uploads import (
+    UploadClosed,
+    UploadError,
+    UploadOffsetMismatch,
+    UploadStore,
+)
+from services.conversation_store import ConversationStore
+from services.conversation_index import ConversationIndex, tokenize_text
+from services.semantic_index import load_semantic_index
+from services.people_catalog import PeopleCatalog
+from services import llm_gateway
+from services.model_registry import MODEL_WARMUP, model_registry
+from services.cpu_pool import CPU_POOL_WORKERS, cpu_pool_stats, start_cpu_pool
+
+# Models are not loaded by these imports — see model_registry.start() below
+model_registry.record_timing("import_ms", (time.perf_counter() - _BOOT_T0) * 1000)
+print(f"✅ Modules imported in {(time.perf_counter() - _BOOT_T0) * 1000:.0f} ms.")
 
 # 🔹 NEW IMPORTS
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, jsonify, send_from_directory, request
 
 load_dotenv()
 BASE_URL = os.getenv("BASE_URL")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini_client = genai.Client(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None
+PORT = int(os.getenv("PORT", "3000"))
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "1") == "1"
+# Start a chunked upload's job once its prefix is decodable; stages read it as it arrives
+UPLOAD_EARLY_START = os.getenv("UPLOAD_EARLY_START", "1") == "1"
+# wsgi.py sets this: background threads then start per worker, after fork
+DEFER_BACKGROUND = os.getenv("RECALL_DEFER_BACKGROUND", "0") == "1"
 
 # === PATH SETUP ===
 BASE_DIR = Path(__file__).resolve().parent
@@ -38,62 +67,79 @@ MEMORY_DIR = BASE_DIR / "conversations"
 DB_ROOT = BASE_DIR / "faces_db"
 FACES_DIR = DB_ROOT / "faces"
 TEMP_DIR = DB_ROOT / "temp_crops"
+UPLOADS_DIR = BASE_DIR / "uploads"
 
 # ✅ Ensure all folders exist
-for d in [MEMORY_DIR, DB_ROOT, FACES_DIR, TEMP_DIR]:
+for d in [MEMORY_DIR, DB_ROOT, FACES_DIR, TEMP_DIR, UPLOADS_DIR]:
     d.mkdir(parents=True, exist_ok=True)
 
 # 🔹 Initialize Flask
 app = Flask(__name__)
 
+# Per-stage outputs keyed by the upload's content hash (retries are instant)
+result_cache = ResultCache()
+
+# Uploads land in uploads/<job_id>/<sha256><ext>, hashed while they stream in
+upload_store = UploadStore(UPLOADS_DIR)
+
+# Append-only conversation segments + SQLite metadata (legacy .json files migrate once)
+conversation_store = ConversationStore(MEMORY_DIR)
+_migration = conversation_store.migrate_legacy()
+if _migration["migrated"]:
+    print(f"📦 Migrated {_migration['migrated']} legacy conversation file(s).")
+_recovered = conversation_store.recover()
+if _recovered:
+    print(f"🩹 Conversation store: recovered {_recovered} segment(s).")
+
+# Inverted index behind the assistant search (updated on save / rename)
+conversation_index = ConversationIndex(conversation_store)
+_reindexed = conversation_index.sync(force=True)
+if _reindexed:
+    print(f"🗂️ Conversation index: refreshed {_reindexed} person(s).")
+
+# Optional embedding retrieval merged into the lexical ranking (SEMANTIC_SEARCH=1)
+semantic_index = load_semantic_index(store=conversation_store)
+
+# /api/people served from memory; invalidated on enroll / save / rename / LinkedIn
+people_catalog = PeopleCatalog(FACES_DIR, conversation_store, BASE_URL)
+
 # === API ROUTES ===
 # returns people name and image URLs
 """
-req: http://localhost:3000/api/people - GET
+req: http://localhost:3000/api/people?limit=20&offset=0 - GET
+     (limit/offset optional; send If-None-Match to get a 304 when unchanged)
 returns:
 [
     {
         "image_url": "http://localhost:3000/faces/tim.jpg",
-        "name": "tim"
-    },
-    {
-        "image_url": "http://localhost:3000/faces/parker.jpg",
-        "name": "parker"
+        "name": "tim",
+        "headline": "Met at the career fair",
+        "conversation_count": 3,
+        "last_seen": 1714000000
     },
-    {
-        "image_url": "http://localhost:3000/faces/nicko.jpg",
-        "name": "nicko"
-    }
+    ...
 ]
+headers: ETag, X-Total-Count
 """
 @app.route("/api/people", methods=["GET"])
 def get_people():
     """Return all recognized people and their images."""
-    people = []
-    for face_file in FACES_DIR.glob("*.*"):
-        if face_file.is_file():
-            name = face_file.stem
-            headline = ""
-            # Try to get the latest headline from conversation file
-            conv_path = MEMORY_DIR / f"{name}.json"
-            if conv_path.exists():
-                try:
-                    entries = json.loads(conv_path.read_text(encoding="utf-8"))
-                    if entries and isinstance(entries, list):
-                        # Get headline from most recent entry
-                        for entry in reversed(entries):
-                            if entry.get("headline"):
-                                headline = entry["headline"]
-                                break
-                except Exception:
-                    pass
-            
-            people.append({
-                "name": name,
-                "image_url": f"{BASE_URL}/faces/{face_file.name}",
-                "headline": headline
-            })
-    return jsonify(people)
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = request.args.get("limit")
+        limit = max(int(limit), 0) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    people, total, etag = people_catalog.page(offset, limit)
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(people)
+    response.set_etag(etag)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 # return face images
 """
@@ -125,8 +171,10 @@ def assistant_people():
         or ""
     ).strip()
     normalized_target = target_name.lower() if target_name else None
+    # "lexical" skips the embedding lookup even when semantic search is on
+    mode = (payload.get("mode") or ("hybrid" if semantic_index is not None else "lexical")).strip().lower()
 
-    matches = find_relevant_people(question, normalized_target)
+    matches = find_relevant_people(question, normalized_target, mode=mode)
     if normalized_target:
         matches = [
             match for match in matches if match.get("name", "").lower() == normalized_target
@@ -173,31 +221,157 @@ def assistant_people():
 # return conversation history for a person
 """
 req: http://localhost:3000/api/conversation/tim - GET
-returns: conversation JSON
+returns: conversation JSON (whole history)
+
+Paged / filtered (served from the store index; only returned entries are read):
+req: http://localhost:3000/api/conversation/tim?limit=10&cursor=<next_cursor>
+     &since=<unix ts>                 only entries saved at or after this time
+     &fields=headline,keywords        projection; omit "conversation" to skip turns
+     &before=<prev_cursor>            page backwards
+     &ts=<entry ts>&highlight=<turn>  jump to the page holding that entry
+returns:
+{
+    "name": "tim",
+    "conversation": [{"entry_index": 4, "timestamp": ..., "headline": ..., ...}],
+    "total": 37,
+    "next_cursor": "1714000000:4",
+    "prev_cursor": null,
+    "focus": {"entry_index": 4, "turn": 2}
+}
 """
+CONVERSATION_PAGE_SIZE = 20
+CONVERSATION_PAGE_MAX = 200
+CONVERSATION_FIELDS = {"timestamp", "conversation", "headline", "keywords", "linkedin", "bio", "n_turns"}
+_PAGED_ARGS = ("limit", "cursor", "before", "since", "fields", "ts", "highlight")
+
+def _int_arg(key):
+    value = request.args.get(key)
+    return int(value) if value not in (None, "") else None
+
+def _parse_cursor(value):
+    """ "<timestamp>:<entry_index>" -> (timestamp, entry_index) """
+    if not value:
+        return None
+    ts, idx = value.split(":", 1)
+    return int(ts), int(idx)
+
+def _cursor(row):
+    return f"{row['timestamp']}:{row['entry_idx']}"
+
 @app.route("/api/conversation/<name>", methods=["GET"])
 def get_conversation(name):
     """Return conversation history for a given person."""
-    conv_path = MEMORY_DIR / f"{name}.json"
-    if not conv_path.exists():
+    if not conversation_store.exists(name):
         return jsonify({
             "name": name,
             "conversation": [],
             "message": "No conversation found for this person."
         }), 404
+    if not any(key in request.args for key in _PAGED_ARGS):
+        try:
+            data = conversation_store.entries(name)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        return jsonify({"name": name, "conversation": data})
+
     try:
-        with open(conv_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        limit = _int_arg("limit")
+        since = _int_arg("since")
+        ts = _int_arg("ts")
+        highlight = _int_arg("highlight")
+        after = _parse_cursor(request.args.get("cursor"))
+        before = _parse_cursor(request.args.get("before"))
+    except ValueError:
+        return jsonify({"error": "limit, since, ts, highlight and cursors must be integers"}), 400
+    fields = None
+    if request.args.get("fields"):
+        fields = {f.strip() for f in request.args["fields"].split(",") if f.strip()}
+        unknown = fields - CONVERSATION_FIELDS
+        if unknown:
+            return jsonify({"error": f"Unknown field(s): {', '.join(sorted(unknown))}"}), 400
+    if limit is None and (ts is not None or after or before):
+        limit = CONVERSATION_PAGE_SIZE
+    if limit is not None:
+        limit = min(max(limit, 1), CONVERSATION_PAGE_MAX)
+
+    try:
+        focus = None
+        target = conversation_store.find_row(name, ts) if ts is not None and not (after or before) else None
+        if target is not None and (since is None or target["timestamp"] >= since):
+            # Jump: the aligned page that contains the deep-linked entry
+            position = conversation_store.count_rows(name, since, before=(target["timestamp"], target["entry_idx"]))
+            rows = conversation_store.entry_rows(name, since, limit=limit, offset=position - position % limit)
+            focus = {"entry_index": target["entry_idx"], "turn": highlight}
+        else:
+            rows = conversation_store.entry_rows(name, since, after=after, before=before, limit=limit)
+
+        with_turns = fields is None or "conversation" in fields
+        entries = conversation_store.load_rows(name, rows, body=with_turns)
+        total = conversation_store.count_rows(name, since)
+        has_next = bool(rows) and conversation_store.count_rows(
+            name, since, after=(rows[-1]["timestamp"], rows[-1]["entry_idx"])
+        ) > 0
+        has_prev = bool(rows) and conversation_store.count_rows(
+            name, since, before=(rows[0]["timestamp"], rows[0]["entry_idx"])
+        ) > 0
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    return jsonify({"name": name, "conversation": data})
+
+    for entry in entries:
+        if focus and highlight is not None and entry["entry_index"] == focus["entry_index"]:
+            turns = entry.get("conversation") or []
+            if 0 <= highlight < len(turns) and isinstance(turns[highlight], dict):
+                turns[highlight] = {**turns[highlight], "is_highlight": True}
+    if fields is not None:
+        keep = fields | {"entry_index", "timestamp"}
+        entries = [{k: v for k, v in entry.items() if k in keep} for entry in entries]
+
+    return jsonify({
+        "name": name,
+        "conversation": entries,
+        "total": total,
+        "next_cursor": _cursor(rows[-1]) if has_next else None,
+        "prev_cursor": _cursor(rows[0]) if has_prev else None,
+        "focus": focus,
+    })
 
 
+# upcoming highlights
+"""
+req: http://localhost:3000/api/highlights - GET
+     ?from=<unix ts | YYYY-MM-DD>   default now
+     &to=<unix ts | YYYY-MM-DD>     exclusive, default open-ended
+     &person=parker&category=meeting
+     &status=active|completed|dismissed|all   default active
+     &limit=50&cursor=<next_cursor>
+returns: {"highlights": [...soonest first, with days_until / hours_until], "next_cursor": ...}
+"""
 @app.route("/api/highlights", methods=["GET"])
 def list_highlights():
     """Return upcoming highlight reminders detected from transcripts."""
-    highlights = get_upcoming_highlights()
-    return jsonify({"highlights": highlights})
+    args = request.args
+    status = (args.get("status") or "active").strip().lower()
+    if status != "all" and status not in VALID_HIGHLIGHT_STATUSES:
+        return jsonify({"error": "Invalid status."}), 400
+    try:
+        start_ts = parse_time_bound(args.get("from"))
+        end_ts = parse_time_bound(args.get("to"))
+        limit = args.get("limit", str(MAX_RETURNED_HIGHLIGHTS))
+        if not (limit.isascii() and limit.isdigit()):
+            raise ValueError("Invalid limit.")
+        limit = min(max(int(limit), 1), 500)
+        highlights, next_cursor = query_highlights(
+            start_ts=start_ts,
+            end_ts=end_ts,
+            person=args.get("person") or None,
+            category=(args.get("category") or "").strip().lower() or None,
+            status=None if status == "all" else status,
+            limit=limit,
+            cursor=args.get("cursor") or None,
+        )
+    except ValueError as exc:
+        return jsonify({"error": f"Bad query: {exc}"}), 400
+    return jsonify({"highlights": highlights, "next_cursor": next_cursor})
 
 
 @app.route("/api/highlights/<highlight_id>", methods=["PATCH"])
@@ -220,93 +394,324 @@ def update_highlight(highlight_id):
 """
 req: http://localhost:3000/api/process - POST
 form-data: file: <video file>
-returns: processing result JSON
+returns: { "job_id": "...", "status": "queued", "status_url": "..." } (202)
 """
 @app.route("/api/process", methods=["POST"])
 def process_upload():
-    """Upload a video, process it (face + transcript), and return results."""
+    """Upload a video and queue it for processing (face + transcript)."""
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
-    curr_time = time.time()
     file = request.files["file"]
     if file.filename == "":
         return jsonify({"error": "Empty filename"}), 400
 
-    uploads_dir = BASE_DIR / "uploads"
-    uploads_dir.mkdir(exist_ok=True)
-    video_path = uploads_dir / file.filename
-    file.save(video_path)
+    job_id = uuid.uuid4().hex
+    # Copied and hashed in one pass; the client's filename only supplies the extension
+    upload = upload_store.save(file.stream, filename=file.filename, upload_id=job_id)
 
-    print(f"📁 Uploaded video saved to: {video_path}")
+    print(f"📁 Uploaded video saved to: {upload['path']}")
 
+    job = job_queue.submit(upload["path"], payload={"upload_id": job_id}, job_id=job_id)
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['id']}",
+    }), 202
+
+def _upload_response(upload, status=200):
+    """JSON + Upload-Offset header describing an upload (and its job, once queued)."""
+    job = job_queue.get(upload["id"])
+    body = {
+        "upload_id": upload["id"],
+        "status": upload["status"],
+        "offset": upload["received"],
+        "size": upload["size"],
+        "sha256": upload["sha256"],
+        "upload_url": f"/api/uploads/{upload['id']}",
+        "job_id": job["id"] if job else None,
+        "status_url": f"/api/jobs/{job['id']}" if job else None,
+    }
+    response = jsonify(body)
+    response.status_code = status
+    response.headers["Upload-Offset"] = str(upload["received"])
+    return response
+
+def _ensure_job(upload):
+    """Queue the upload's job (job id = upload id) once it has work to do.
+
+    That is when the upload is sealed or, with UPLOAD_EARLY_START, as soon
+    as the arrived prefix probes as decodable. A client that opens an
+    upload and then stalls never holds one of the job workers.
+    """
+    if job_queue.get(upload["id"]):
+        return
+    if upload["status"] != "complete" and not (UPLOAD_EARLY_START and upload_store.probe(upload)):
+        return
+    job_queue.submit(upload["path"], payload={"upload_id": upload["id"]}, job_id=upload["id"])
+
+# resumable chunked upload
+"""
+req: http://localhost:3000/api/uploads - POST
+json (optional): { "size": <total bytes>, "filename": "clip.mp4" }
+returns: { "upload_id", "status": "open", "offset": 0, "upload_url", "job_id", "status_url" } (201)
+
+Then PATCH upload_url with each chunk as the raw body and an Upload-Offset
+header (bytes already sent). The upload completes by itself once "size"
+bytes have arrived, otherwise POST upload_url + "/complete". After a
+dropped connection, GET (or HEAD) upload_url and resume from "offset".
+The job is queued once the upload is sealed. With UPLOAD_EARLY_START=1
+it is queued as soon as the arrived prefix probes as streamable (see
+services/uploads.container_streamable), and it demuxes the upload as it
+arrives. Until then "job_id" is null.
+"""
+@app.route("/api/uploads", methods=["POST"])
+def create_upload():
+    """Open a resumable upload."""
+    data = request.get_json(silent=True) or {}
+    size = data.get("size")
+    if size is not None and (not isinstance(size, int) or isinstance(size, bool)):
+        return jsonify({"error": "size must be an integer number of bytes."}), 400
     try:
-        result = process_video(str(video_path))
-    except Exception as e:
-        print("❌ Error while processing:", e)
-        return jsonify({"error": str(e)}), 500
+        upload = upload_store.create(size=size, filename=str(data.get("filename") or ""))
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 400
+    print(f"📥 Upload {upload['id']} opened ({size if size is not None else 'unknown'} bytes).")
+    return _upload_response(upload, 201)
 
-    print(f"🚀 TOTAL VIDEO PROCESSING: {time.time() - curr_time:.2f} seconds.")
-    return jsonify(result)
+"""
+req: http://localhost:3000/api/uploads/<upload_id> - PATCH
+headers: Upload-Offset: <bytes already sent>; body: the next chunk
+returns: the upload (see POST /api/uploads); 409 with the server's "offset" if it differs
+"""
+@app.route("/api/uploads/<upload_id>", methods=["PATCH"])
+def append_upload(upload_id):
+    """Append one chunk to an open upload."""
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        if offset < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "Upload-Offset header must be a non-negative integer."}), 400
 
-# === GLOBAL THREAD VARS ===
-transcript_result = {}
-transcript_done = threading.Event()
+    try:
+        upload = upload_store.append(upload_id, offset, request.stream, length=request.content_length)
+    except KeyError:
+        return jsonify({"error": f"Upload {upload_id} not found."}), 404
+    except UploadOffsetMismatch as exc:
+        return jsonify({"error": str(exc), "offset": exc.offset}), 409
+    except UploadClosed as exc:
+        return jsonify({"error": str(exc)}), 409
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 400
+    _ensure_job(upload)
+    return _upload_response(upload)
 
-def run_transcript(video_path):
-    """Thread: run Whisper + Gemini transcript analyzer"""
-    global transcript_result
-    transcript_result = analyze_transcript(video_path)
-    transcript_done.set()
+"""
+req: http://localhost:3000/api/uploads/<upload_id> - GET (or HEAD)
+returns: the upload (see POST /api/uploads); "offset" is where to resume
+"""
+@app.route("/api/uploads/<upload_id>", methods=["GET"])
+def get_upload(upload_id):
+    """Report how much of an upload has arrived."""
+    upload = upload_store.get(upload_id)
+    if not upload:
+        return jsonify({"error": f"Upload {upload_id} not found."}), 404
+    return _upload_response(upload)
 
-def run_face(video_path):
-    """Thread: detect face, wait for transcript if new person"""
-    face_result = analyze_video(video_path)
+"""
+req: http://localhost:3000/api/uploads/<upload_id>/complete - POST
+returns: the sealed upload with its "sha256" and "status_url"
+"""
+@app.route("/api/uploads/<upload_id>/complete", methods=["POST"])
+def complete_upload(upload_id):
+    """Seal an upload that was opened without a size."""
+    try:
+        upload = upload_store.complete(upload_id)
+    except KeyError:
+        return jsonify({"error": f"Upload {upload_id} not found."}), 404
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 409
+    _ensure_job(upload)
+    return _upload_response(upload)
+
+"""
+req: http://localhost:3000/api/uploads/<upload_id> - DELETE
+returns: { "upload_id", "aborted": true } — its job fails instead of saving anything
+"""
+@app.route("/api/uploads/<upload_id>", methods=["DELETE"])
+def abort_upload(upload_id):
+    """Abandon an open upload."""
+    if not upload_store.get(upload_id):
+        return jsonify({"error": f"Upload {upload_id} not found."}), 404
+    if not upload_store.abort(upload_id):
+        return jsonify({"error": "Upload is already complete."}), 409
+    return jsonify({"upload_id": upload_id, "aborted": True})
+
+# job status
+"""
+req: http://localhost:3000/api/jobs/<job_id> - GET
+returns: { "job_id", "status", "stage", "progress", "result", "error" }
+"""
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Report status and progress of a processing job."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job {job_id} not found."}), 404
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+    })
+
+# result cache counters
+"""
+req: http://localhost:3000/api/cache/stats - GET
+returns: { "hits": {stage: n}, "misses": {stage: n}, "hit_rate", "bytes", ... }
+"""
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    """Expose result cache hit/miss counters."""
+    return jsonify(result_cache.stats())
+
+@app.route("/api/ready", methods=["GET"])
+def readiness():
+    """200 once every registered model is loaded, else 503 (with per-model state and timings)."""
+    status = model_registry.status()
+    status["pid"] = os.getpid()
+    status["cpu_pool"] = cpu_pool_stats()
+    return jsonify(status), (200 if status["ready"] else 503)
+
+@app.route("/api/llm/stats", methods=["GET"])
+def llm_stats():
+    """Expose per-call-site LLM latency histograms."""
+    return jsonify(llm_gateway.latency_stats())
+
+def _open_stream(state):
+    """A fresh reader over the still-arriving upload, or None once it is sealed."""
+    return upload_store.follow(state["upload_id"]) if state.get("streaming") else None
+
+def run_transcript(video_path, state):
+    """Thread: run speech + Gemini transcript analyzer for one job."""
+    stream = _open_stream(state)
+    try:
+        state["transcript"] = analyze_transcript(video_path, cache_entry=state["cache_entry"], stream=stream) or {}
+    except Exception as e:
+        print(f"❌ Transcript analysis failed: {e}")
+        state["transcript"] = {}
+    finally:
+        if stream is not None:
+            stream.close()
+        state["transcript_done"].set()
+        state["report"]("transcript_done")
+
+def run_face(video_path, state):
+    """Thread: detect face, wait for this job's transcript if new person"""
+    stream = _open_stream(state)
+    try:
+        face_result = analyze_video(video_path, cache_entry=state["cache_entry"], stream=stream)
+    finally:
+        if stream is not None:
+            stream.close()
+    state["report"]("face_done")
 
     # 🧠 If new face detected, wait for transcript to identify the name
     if face_result["status"] == "new":
         print("🕒 New face detected — waiting for transcript to identify name...")
-        transcript_done.wait(timeout=180)  # wait up to 3 minutes for Gemini
-        time.sleep(0.10) 
+        state["transcript_done"].wait(timeout=180)  # wait up to 3 minutes for Gemini
 
         # 🧩 After transcript finishes, get the detected name
-        name = transcript_result.get("guessed_name", "Unknown")
-        face_result["name"] = name
-
-        # 🧠 Enroll only after transcript gives a valid name
-        face_path = face_result.get("face_path")
-        if name and name.lower() != "unknown" and face_path:
-            try:
-                enroll(face_path, name)
-                face_result["auto_enrolled"] = True
-                print(f"✅ Auto-enrolled new person as: {name}")
-            except Exception as e:
-                print(f"⚠️ Enrollment failed for {name}: {e}")
-                face_result["auto_enrolled"] = False
-        else:
-            print("⚠️ Could not auto-enroll — missing name or face path.")
-            face_result["auto_enrolled"] = False
+        enroll_new_face(face_result, state["transcript"].get("guessed_name", "Unknown"))
 
     else:
         # 🧠 If existing face matched, no need to wait for transcript
         face_result["auto_enrolled"] = False
 
-    # Merge conversation for return consistency
-    face_result["conversation"] = transcript_result.get("conversation", [])
     return face_result
 
-def process_video(video_path):
+def enroll_new_face(face_result, name):
+    """Name a "new" face result and enroll its crop (needs a usable name)."""
+    face_result["name"] = name
+
+    # 🧠 Enroll only after transcript gives a valid name
+    face_path = face_result.get("face_path")
+    if name and name.lower() != "unknown" and face_path:
+        try:
+            enroll(face_path, name)
+            reload_face_index()
+            people_catalog.invalidate()
+            release_crop(face_path)
+            face_result["auto_enrolled"] = True
+            print(f"✅ Auto-enrolled new person as: {name}")
+        except Exception as e:
+            print(f"⚠️ Enrollment failed for {name}: {e}")
+            face_result["auto_enrolled"] = False
+    else:
+        print("⚠️ Could not auto-enroll — missing name or face path.")
+        face_result["auto_enrolled"] = False
+
+# Share of job progress each stage contributes once finished
+STAGE_WEIGHTS = {"face_done": 0.45, "transcript_done": 0.45}
+
+def process_video(video_path, report=None, upload_id=None):
     print(f"\n🚀 Processing video: {video_path}\n")
+    curr_time = time.time()
 
-    global transcript_result
-    transcript_result = {}      # 🔹 clear any old transcript data
-    transcript_done.clear()
+    # 🔹 per-job state — nothing shared with other uploads
+    progress_lock = threading.Lock()
+    finished_stages = []
+
+    def mark(stage):
+        with progress_lock:
+            finished_stages.append(stage)
+            progress = sum(STAGE_WEIGHTS.get(s, 0) for s in finished_stages)
+        if report:
+            report(stage, progress)
+
+    streaming = False
+    if upload_id:
+        # Overlap transfer with compute when the prefix is decodable; else wait for the rest
+        if report:
+            report("uploading", 0.01)
+        streaming = upload_store.streamable(upload_id)
+        if streaming:
+            print("📶 Upload still arriving — analyzing the prefix as it streams in.")
+            cache_entry = None   # keyed by the content hash, known once the upload is sealed
+        else:
+            upload = upload_store.wait(upload_id)
+            video_path = upload["path"]
+            cache_entry = result_cache.entry(upload["sha256"])   # hashed while it streamed in
+    else:
+        if report:
+            report("hashing", 0.01)
+        cache_entry = result_cache.entry_for_file(video_path)
+
+    state = {
+        "transcript": {},
+        "transcript_done": threading.Event(),
+        "report": mark,
+        "cache_entry": cache_entry,
+        "upload_id": upload_id,
+        "streaming": streaming,
+    }
+    if report:
+        report("analyzing", 0.05)
 
     face_result_box = {}
-    t1 = threading.Thread(target=run_transcript, args=(video_path,))
+    t1 = threading.Thread(target=run_transcript, args=(video_path, state))
 
     def face_thread_wrapper():
-        face_result_box["data"] = run_face(video_path)
+        try:
+            face_result_box["data"] = run_face(video_path, state)
+        except Exception as e:
+            print(f"❌ Face analysis failed: {e}")
 
     t2 = threading.Thread(target=face_thread_wrapper)
 
@@ -316,8 +721,31 @@ def process_video(video_path):
     t2.join()
 
     face_result = face_result_box.get("data", {"status": "unknown"})
+    transcript_result = state["transcript"]
+
+    if streaming:
+        # Raises if the upload was aborted or stalled: nothing gets saved
+        upload = upload_store.wait(upload_id)
+        video_path = upload["path"]
+        cache_entry = result_cache.entry(upload["sha256"])
+        if transcript_result:
+            cache_entry.put_json("gemini", transcript_result)
+
+    final = final_result(video_path, face_result, transcript_result)
+
+    if report:
+        report("saving", 0.92)
+    # A client retry of the same clip must not append the conversation twice:
+    # the store records the upload's hash with the entry it saved
+    save_conversation(final, source=cache_entry.key)
+    print("\n=== FINAL RESULT ===")
+    print(json.dumps(final, indent=2))
+    print(f"🚀 TOTAL VIDEO PROCESSING: {time.time() - curr_time:.2f} seconds.")
+    return final
 
-    final = {
+def final_result(video_path, face_result, transcript_result):
+    """The result a job (or live session) reports and saves."""
+    return {
         "video_path": video_path,
         "guessed_name": transcript_result.get("guessed_name"),
         "conversation": transcript_result.get("conversation", []),
@@ -327,24 +755,18 @@ def process_video(video_path):
         "face_status": face_result.get("status", "unknown"),
         "face_name": face_result.get("name"),
         "auto_enrolled": face_result.get("auto_enrolled", False),
+        # frames decoded / analyzed and time to decision (see face_analyzer.FaceScan)
+        "face_scan": face_result.get("scan"),
     }
 
-    save_conversation(final)
-    print("\n=== FINAL RESULT ===")
-    print(json.dumps(final, indent=2))
-    return final
+def run_job(job, report):
+    """Job queue handler: process one uploaded video."""
+    payload = job.get("payload") or {}
+    return process_video(job["video_path"], report=report, upload_id=payload.get("upload_id"))
 
-def save_conversation(data):
-    """Append conversation JSON for each person."""
+def save_conversation(data, source=None):
+    """Append conversation JSON for each person (once per source, if given)."""
     name = data.get("face_name") or data.get("guessed_name") or "Unknown"
-    path = MEMORY_DIR / f"{name}.json"
-
-    existing = []
-    if path.exists():
-        try:
-            existing = json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            print(f"⚠️ Could not parse old file for {name}, resetting it.")
 
     entry = {
         "timestamp": int(time.time()),
@@ -353,29 +775,30 @@ def save_conversation(data):
         "headline": data.get("headline", ""),
     }
 
-    latest_profile = next(
-        (
-            item for item in reversed(existing)
-            if isinstance(item, dict) and item.get("linkedin")
-        ),
-        None
-    )
-    if latest_profile:
-        if latest_profile.get("linkedin"):
-            entry["linkedin"] = latest_profile.get("linkedin")
-        if latest_profile.get("bio"):
-            entry["bio"] = latest_profile.get("bio")
-
-    existing.append(entry)
-    path.write_text(json.dumps(existing, indent=2), encoding="utf-8")
+    # Carry the latest LinkedIn profile forward onto the new entry
+    entry.update(conversation_store.latest_profile(name))
+
+    entry_idx = conversation_store.append_entry(name, entry, source=source)
+    if entry_idx is None:
+        print(f"⚡ Same upload already saved for {conversation_store.saved_source(source)} — skipping save.")
+        return
+    people_catalog.invalidate()
     print(f"💾 Conversation history updated for: {name}")
+    try:
+        conversation_index.append_entry(name, entry_idx, entry)
+    except Exception as exc:
+        print(f"⚠️ Failed to index conversation for {name}: {exc}")
+    if semantic_index is not None:
+        try:
+            semantic_index.add_entry(name, entry_idx, entry)
+        except Exception as exc:
+            print(f"⚠️ Failed to embed conversation for {name}: {exc}")
 
     try:
         highlights_created = detect_and_store_highlights(
             person_name=name,
             conversation=entry.get("conversation", []),
             conversation_timestamp=entry.get("timestamp", int(time.time())),
-            gemini_client=gemini_client,
             headline=entry.get("headline"),
         )
         if highlights_created:
@@ -387,19 +810,14 @@ def save_conversation(data):
 
 def enrich_latest_linkedin(name, force=False):
     """Fetch or update LinkedIn info for the most recent conversation entry."""
-    path = MEMORY_DIR / f"{name}.json"
-    if not path.exists():
+    if not conversation_store.exists(name):
         return None, "missing_file"
 
-    try:
-        entries = json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return None, "invalid_file"
-
-    if not entries:
+    latest_idx = conversation_store.count(name) - 1
+    latest = conversation_store.entry(name, latest_idx) if latest_idx >= 0 else None
+    if not latest:
         return None, "no_entries"
 
-    latest = entries[-1]
     existing_info = {
         "linkedin": latest.get("linkedin"),
         "bio": latest.get("bio"),
@@ -408,7 +826,7 @@ def enrich_latest_linkedin(name, force=False):
     if existing_info["linkedin"] and not force:
         return existing_info, "already_set"
 
-    if not gemini_client:
+    if not llm_gateway.is_enabled():
         return existing_info if existing_info["linkedin"] else None, "gemini_disabled"
 
     keywords = latest.get("keywords") or []
@@ -419,7 +837,6 @@ def enrich_latest_linkedin(name, force=False):
             person_name=name,
             keywords=keywords,
             conversation=conversation,
-            gemini_client=gemini_client,
         )
     except Exception as exc:
         print(f"⚠️ LinkedIn enrichment failed for {name}: {exc}")
@@ -428,8 +845,10 @@ def enrich_latest_linkedin(name, force=False):
     if not profile_info:
         return existing_info if existing_info["linkedin"] else None, "no_match"
 
-    latest.update(profile_info)
-    path.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+    # Appends a patch record; the history itself is never rewritten
+    conversation_store.update_entry(name, latest_idx, profile_info)
+    people_catalog.invalidate()
+    conversation_index.update_entry(name, latest_idx, conversation_store.entry(name, latest_idx))
     return profile_info, "updated"
 
 # rename person endpoint
@@ -445,85 +864,65 @@ def rename_person():
     
     old_face = FACES_DIR / f"{old_name.lower()}.jpg"
     new_face = FACES_DIR / f"{new_name.lower()}.jpg"
-    old_conv = MEMORY_DIR / f"{old_name}.json"
-    new_conv = MEMORY_DIR / f"{new_name}.json"
-    embeddings_path = DB_ROOT / "embeddings.json"
-    
+
+    def normalize_entry(entry):
+        """Rewrite old_name -> new_name in speaker labels and turn text."""
+        convo = entry.get("conversation")
+        if isinstance(convo, list):
+            for turn in convo:
+                # Update speaker field
+                spk = turn.get("speaker") if isinstance(turn, dict) else None
+                if isinstance(spk, str) and spk.strip().lower() == old_name.strip().lower():
+                    turn["speaker"] = new_name
+
+                # Update text content - replace old name with new name (case-insensitive)
+                text = turn.get("text") if isinstance(turn, dict) else None
+                if isinstance(text, str):
+                    turn["text"] = re.sub(
+                        r'\b' + re.escape(old_name) + r'\b',
+                        new_name,
+                        text,
+                        flags=re.IGNORECASE
+                    )
+        return entry
+
     try:
         # Rename face file
         if old_face.exists():
             old_face.rename(new_face)
             print(f"✅ Renamed face: {old_face} -> {new_face}")
+
+        # Move the conversation history (one rewrite, speaker/text normalized on the way)
+        if conversation_store.rename(old_name, new_name, transform=normalize_entry):
+            print(f"✅ Renamed conversation history: {old_name} -> {new_name}")
+        people_catalog.invalidate()
+
+        # Move the person's postings under the new name
+        try:
+            conversation_index.rename_person(old_name, new_name)
+            if semantic_index is not None:
+                # Turn text was rewritten (and entry indexes shift on a merge): re-embed
+                semantic_index.remove_person(old_name)
+                semantic_index.index_person(new_name, conversation_store.entries(new_name))
+        except Exception as ix:
+            print(f"⚠️ Could not update conversation index for rename: {ix}")
         
-        # Rename conversation file (if present)
-        if old_conv.exists():
-            old_conv.rename(new_conv)
-            print(f"✅ Renamed conversation: {old_conv} -> {new_conv}")
-
-        # Normalize speaker labels AND text content inside conversation entries from old_name -> new_name
-        conv_path = new_conv if new_conv.exists() else (old_conv if old_conv.exists() else None)
-        if conv_path and conv_path.exists():
-            try:
-                entries = json.loads(conv_path.read_text(encoding="utf-8"))
-                changed = False
-                if isinstance(entries, list):
-                    for entry in entries:
-                        convo = entry.get("conversation")
-                        if isinstance(convo, list):
-                            for turn in convo:
-                                # Update speaker field
-                                spk = turn.get("speaker") if isinstance(turn, dict) else None
-                                if isinstance(spk, str) and spk.strip().lower() == old_name.strip().lower():
-                                    turn["speaker"] = new_name
-                                    changed = True
-                                
-                                # Update text content - replace old name with new name (case-insensitive)
-                                text = turn.get("text") if isinstance(turn, dict) else None
-                                if isinstance(text, str):
-                                    # Use regex for case-insensitive replacement, preserving original case pattern
-                                    new_text = re.sub(
-                                        r'\b' + re.escape(old_name) + r'\b',
-                                        new_name,
-                                        text,
-                                        flags=re.IGNORECASE
-                                    )
-                                    if new_text != text:
-                                        turn["text"] = new_text
-                                        changed = True
-                if changed:
-                    conv_path.write_text(json.dumps(entries, indent=2), encoding="utf-8")
-                    print(f"✅ Updated speaker labels and text content in {conv_path.name}: {old_name} -> {new_name}")
-            except Exception as cx:
-                print(f"⚠️ Could not normalize speakers in {conv_path.name}: {cx}")
-        
-        # Update embeddings.json
-        if embeddings_path.exists():
-            embeddings = json.loads(embeddings_path.read_text(encoding="utf-8"))
-            if old_name in embeddings:
-                # Update the key and the path value
-                embeddings[new_name] = str(new_face)
-                del embeddings[old_name]
-                embeddings_path.write_text(json.dumps(embeddings, indent=2), encoding="utf-8")
-                print(f"✅ Updated embeddings.json: {old_name} -> {new_name}")
-
-        # Update highlights.json person_name if exists
-        highlights_path = BASE_DIR / "highlights.json"
-        if highlights_path.exists():
-            try:
-                highlights = json.loads(highlights_path.read_text(encoding="utf-8"))
-                changed = False
-                if isinstance(highlights, list):
-                    for row in highlights:
-                        pname = (row or {}).get("person_name")
-                        if isinstance(pname, str) and pname.strip().lower() == old_name.strip().lower():
-                            row["person_name"] = new_name
-                            changed = True
-                if changed:
-                    highlights_path.write_text(json.dumps(highlights, indent=2), encoding="utf-8")
-                    print(f"✅ Updated highlights.json person_name: {old_name} -> {new_name}")
-            except Exception as hx:
-                print(f"⚠️ Could not update highlights.json for rename: {hx}")
-        
+        # Update the embedding sidecar (append-only, matrix untouched)
+        if embedding_store.rename(old_face.stem, new_face.stem, image_path=str(new_face)):
+            # Not loaded yet → its first load reads the renamed sidecar
+            face_index = model_registry.peek("face_index")
+            if face_index is not None:
+                face_index.rename(old_face.stem, new_face.stem)
+            print(f"✅ Updated embedding sidecar: {old_face.stem} -> {new_face.stem}")
+
+        # Move highlights to the new name
+        try:
+            moved = rename_person_highlights(old_name, new_name)
+            if moved:
+                print(f"✅ Updated highlights person_name: {old_name} -> {new_name}")
+        except Exception as hx:
+            print(f"⚠️ Could not update highlights for rename: {hx}")
+
         return jsonify({"success": True, "new_name": new_name})
     except Exception as e:
         print(f"❌ Rename failed: {e}")
@@ -551,44 +950,6 @@ def enrich_linkedin_endpoint(name):
         "bio": (info or {}).get("bio"),
     }
     return jsonify(response)
-STOPWORDS = {
-    "the", "a", "an", "is", "it", "to", "and", "i", "you", "they", "we", "he", "she",
-    "them", "of", "in", "on", "for", "with", "at", "what", "who", "when", "where",
-    "how", "are", "was", "be", "do", "does", "did", "this", "that", "their"
-}
-SELF_SPEAKER_LABELS = {"me", "myself", "user"}
-
-def _tokenize_text(text):
-    return [w for w in re.findall(r"\w+", text.lower()) if w and w not in STOPWORDS]
-
-def _is_fuzzy_token_match(token, word):
-    if not token or not word:
-        return False
-    if token == word:
-        return True
-    if abs(len(token) - len(word)) > 2:
-        return False
-    similarity = difflib.SequenceMatcher(None, token, word).ratio()
-    return similarity >= 0.78
-
-def _score_tokens_in_text(tokens, lower_text):
-    if not tokens or not lower_text:
-        return 0
-    words = re.findall(r"\w+", lower_text)
-    score = 0
-    for token in tokens:
-        if not token:
-            continue
-        occurrences = lower_text.count(token)
-        if occurrences:
-            score += occurrences
-            continue
-        for word in words:
-            if _is_fuzzy_token_match(token, word):
-                score += 1
-                break
-    return score
-
 def _collect_person_assets():
     assets = {}
     for face_file in FACES_DIR.glob("*.*"):
@@ -599,7 +960,7 @@ def _collect_person_assets():
     return assets
 
 def summarize_with_gemini(question, match):
-    if not gemini_client or not GEMINI_API_KEY:
+    if not llm_gateway.is_enabled():
         return None
 
     conversation = match.get("conversation") or []
@@ -636,16 +997,11 @@ Question: "{question}"
 Conversation log:
 {convo_text}
 """
-    print(prompt)
     try:
-        response = gemini_client.models.generate_content(
-            model="gemini-2.0-flash-lite", contents=prompt
+        # Interactive request — fail fast rather than keep the user waiting
+        parsed = llm_gateway.generate_json(
+            prompt, call_site="assistant.summary", timeout=15, retries=1
         )
-        print(response.text)
-        raw = (response.text or "").strip()
-        if raw.startswith("```"):
-            raw = raw.strip("`").replace("json", "").strip()
-        parsed = json.loads(raw)
         if "suggestion" not in parsed:
             parsed["suggestion"] = ""
         return parsed
@@ -691,90 +1047,31 @@ def build_contextual_excerpt(match, ai_excerpt, window=1):
     match["highlight_indices"] = sorted(highlight_indices)
     return excerpt
 
-def find_relevant_people(question, target_name=None):
+def find_relevant_people(question, target_name=None, mode="lexical"):
     """Search saved conversations for entries that best answer the question.
 
     If target_name is provided, limit the search to that person only.
+    mode="hybrid" adds semantic turn scores when the semantic index is on.
     """
-    tokens = _tokenize_text(question)
+    tokens = tokenize_text(question)
     assets = _collect_person_assets()
     matches = []
-    normalized_target = target_name.lower() if target_name else None
 
-    for conv_file in MEMORY_DIR.glob("*.json"):
-        name = conv_file.stem
-        if normalized_target and name.lower() != normalized_target:
-            continue
+    turn_boosts = None
+    if mode == "hybrid" and semantic_index is not None:
         try:
-            entries = json.loads(conv_file.read_text(encoding="utf-8"))
-        except Exception:
-            continue
+            turn_boosts = semantic_index.turn_boosts(question, target_name)
+        except Exception as exc:
+            print(f"⚠️ Semantic lookup failed, using lexical only: {exc}")
 
-        name_lower = name.lower()
-        name_boost = 5 if name_lower in tokens else 0
-
-        best_entry = None
-        best_score = -1
-        best_highlight_idx = -1
-        best_timestamp = 0
-
-        for entry in entries:
-            conversation = entry.get("conversation", [])
-            if not conversation:
-                continue
-
-            ts = entry.get("timestamp", 0)
-            entry_score = 0
-            highlight_idx = 0
-            highlight_score = -1
-
-            for idx, turn in enumerate(conversation):
-                text = turn.get("text", "")
-                if not text:
-                    continue
-                lower_text = text.lower()
-                if tokens:
-                    line_score = _score_tokens_in_text(tokens, lower_text)
-                else:
-                    line_score = 1
-
-                speaker_label = (turn.get("speaker") or "").strip().lower()
-                if line_score > 0:
-                    if speaker_label and speaker_label not in SELF_SPEAKER_LABELS:
-                        line_score *= 1.6
-                    elif speaker_label in SELF_SPEAKER_LABELS:
-                        line_score *= 0.6
-
-                entry_score += line_score
-
-                if line_score > highlight_score:
-                    highlight_score = line_score
-                    highlight_idx = idx
-
-            if not tokens and entry_score == 0 and conversation:
-                # fallback to most recent line if no tokens extracted
-                entry_score = len(conversation)
-                highlight_idx = len(conversation) - 1
-
-            if entry_score > 0:
-                entry_score += name_boost
-
-            if entry_score > best_score or (entry_score == best_score and ts > best_timestamp):
-                best_entry = entry
-                best_score = entry_score
-                best_highlight_idx = highlight_idx
-                best_timestamp = ts
-
-        if not best_entry and entries:
-            best_entry = entries[-1]
-            best_timestamp = best_entry.get("timestamp", 0)
-            conv = best_entry.get("conversation", [])
-            best_highlight_idx = len(conv) - 1 if conv else -1
-            best_score = 0
+    for hit in conversation_index.search(tokens, target_name, turn_boosts=turn_boosts):
+        name = hit["name"]
+        best_timestamp = hit["timestamp"]
+        best_highlight_idx = hit["highlight_index"]
+        conversation_block = hit["conversation"]
 
         highlight_turn = None
         snippet_text = None
-        conversation_block = best_entry.get("conversation", []) if best_entry else []
         if conversation_block and 0 <= best_highlight_idx < len(conversation_block):
             highlight_turn = conversation_block[best_highlight_idx]
             snippet_text = highlight_turn.get("text")
@@ -794,7 +1091,7 @@ def find_relevant_people(question, target_name=None):
             "snippet": snippet_text,
             "speaker": (highlight_turn or {}).get("speaker", "Unknown"),
             "timestamp": best_timestamp,
-            "score": max(best_score, 0),
+            "score": hit["score"],
             "conversation": conversation_block,
             "highlight_index": best_highlight_idx,
             "highlight_indices": [best_highlight_idx] if best_highlight_idx >= 0 else [],
@@ -805,6 +1102,259 @@ def find_relevant_people(question, target_name=None):
     matches.sort(key=lambda m: (-m["score"], -m["timestamp"]))
     return matches
 
+# === JOB QUEUE ===
+job_queue = JobQueue(handler=run_job)
+
+
+# === LIVE SESSIONS ===
+# Guess the name again once this many new words arrived (until the face or a name is known)
+LIVE_NAME_MIN_NEW_WORDS = int(os.getenv("LIVE_NAME_MIN_NEW_WORDS", "12"))
+
+def _session_elapsed(state):
+    return round(time.time() - state["started_at"], 2)
+
+def live_face_step(index, path, state, publish):
+    """Scan one segment until the face is known; keep the best crop otherwise."""
+    face = state.setdefault("face", {
+        "status": "scanning", "crop": None, "score": 0.0, "vote": None,
+        "frames_decoded": 0, "frames_analyzed": 0,
+    })
+    if face["status"] == "old":
+        return  # identified — later segments are not decoded for faces
+    result = scan_segment(str(path), vote=face["vote"])
+    face["vote"] = result.get("vote")
+    scan = result.get("scan") or {}
+    face["frames_decoded"] += scan.get("frames_decoded", 0)
+    face["frames_analyzed"] += scan.get("frames_analyzed", 0)
+
+    if result["status"] == "old":
+        release_crop(face.get("crop"))
+        face.update(
+            status="old", crop=None, name=result["name"], similarity=result["similarity"],
+            segment=index, identified_after_sec=_session_elapsed(state),
+        )
+        print(f"⚡ Live session identified {face['name']} after {face['identified_after_sec']:.1f} s.")
+        publish("face", {
+            "status": "old", "name": face["name"], "similarity": face["similarity"],
+            "segment": index, "elapsed_sec": face["identified_after_sec"],
+            "frames_decoded": face["frames_decoded"], "frames_analyzed": face["frames_analyzed"],
+        })
+    elif result["status"] == "scanning":
+        # Only the best crop so far is kept for the closing match / enrollment
+        if result["score"] > face["score"]:
+            release_crop(face.get("crop"))
+            face.update(crop=result["crop"], score=result["score"])
+        else:
+            release_crop(result["crop"])
+
+def live_transcript_step(session_id, index, path, state, publish):
+    """Transcribe one segment on top of the session's transcript so far."""
+    live = state.setdefault("transcript", {"chunks": [], "results": [], "audio_bytes": 0, "sentences": [], "words": 0})
+    try:
+        pcm = extract_pcm(str(path))
+    except Exception as e:
+        print(f"⚠️ Live segment {index} has no usable audio: {e}")
+        return
+    words = transcribe_live_segment(live, live_sessions.root / session_id / "audio.pcm", pcm)
+    # Only the last sentence can still grow — send it and everything after
+    since = max(0, len(live["sentences"]) - 1)
+    live["sentences"] = build_sentences(words)
+    live["words"] = len(words)
+    publish("transcript", {"segment": index, "from": since, "sentences": live["sentences"][since:], "words": live["words"]})
+
+def live_name_step(index, state, publish):
+    """Ask Gemini for the other person's name while nobody is identified."""
+    live = state.get("transcript") or {}
+    if state.get("guessed_name") or (state.get("face") or {}).get("status") == "old":
+        return
+    if live.get("words", 0) - state.get("named_at_words", 0) < LIVE_NAME_MIN_NEW_WORDS:
+        return
+    state["named_at_words"] = live["words"]
+    try:
+        name = (ask_gemini(live["sentences"]) or {}).get("guessed_name")
+    except Exception as e:
+        print(f"⚠️ Live name guess failed: {e}")
+        return
+    if name and name.lower() not in ("other", "unknown"):
+        state["guessed_name"] = name
+        publish("name", {"guessed_name": name, "segment": index, "elapsed_sec": _session_elapsed(state)})
+
+def process_live_segment(session_id, index, path, state, publish):
+    """live_sessions handler: face and transcript for one segment, in parallel."""
+    threads = [
+        threading.Thread(target=live_face_step, args=(index, path, state, publish)),
+        threading.Thread(target=live_transcript_step, args=(session_id, index, path, state, publish)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    live_name_step(index, state, publish)
+    path.unlink(missing_ok=True)  # everything later steps need is in the state and audio.pcm
+    return state
+
+def close_live_session(session_id, state, publish):
+    """live_sessions closer: final Gemini pass, face match/enroll, save."""
+    sentences = (state.get("transcript") or {}).get("sentences", [])
+    transcript_result = {}
+    if sentences:
+        try:
+            transcript_result = ask_gemini(sentences) or {}
+        except Exception as e:
+            print(f"❌ Live transcript analysis failed: {e}")
+
+    face = state.get("face") or {}
+    if face.get("status") == "old":
+        face_result = {"status": "old", "name": face["name"], "similarity": face["similarity"], "match_source": "index"}
+    elif face.get("crop"):
+        face_result = compare_with_all_faces(face["crop"])
+        if face_result["status"] == "old":
+            release_crop(face["crop"])
+    else:
+        face_result = {"status": "no_face"}
+
+    if face_result["status"] == "new":
+        enroll_new_face(face_result, transcript_result.get("guessed_name") or state.get("guessed_name") or "Unknown")
+    else:
+        face_result["auto_enrolled"] = False
+
+    final = final_result(str(live_sessions.root / session_id), face_result, transcript_result)
+    final["session_id"] = session_id
+    final["identified_after_sec"] = face.get("identified_after_sec")
+    final["face_scan"] = {
+        "decision": "early_exit" if face.get("status") == "old" else "full_scan",
+        "frames_decoded": face.get("frames_decoded", 0),
+        "frames_analyzed": face.get("frames_analyzed", 0),
+    }
+    if sentences or face_result.get("name"):
+        save_conversation(final)
+    print(f"🏁 Live session {session_id} closed after {_session_elapsed(state):.1f} s.")
+    return final
+
+live_sessions = LiveSessions(handler=process_live_segment, closer=close_live_session)
+
+def _session_response(session, status=200):
+    body = {
+        "session_id": session["id"],
+        "status": session["status"],
+        "segments": session["segments"],
+        "segments_url": f"/api/sessions/{session['id']}/segments",
+        "events_url": f"/api/sessions/{session['id']}/events",
+        "close_url": f"/api/sessions/{session['id']}/close",
+        "result": session["result"],
+    }
+    return jsonify(body), status
+
+# live conversation session
+"""
+req: http://localhost:3000/api/sessions - POST
+returns: { "session_id", "status": "open", "segments_url", "events_url", "close_url" } (201)
+
+While the conversation goes on, POST each short clip (a few seconds,
+self-contained mp4/webm) to segments_url, as multipart "file" or as the
+raw body (?filename=seg.webm). Segments are processed in the order they
+arrive. POST close_url when the conversation ends. A segment over
+LIVE_SEGMENT_MAX_BYTES gets 413; its number is skipped ("segment" event
+with "dropped": true).
+
+Results come back on events_url (text/event-stream, resumable with
+Last-Event-ID): "face" as soon as a known face is matched, "name" when
+the transcript reveals a new person's name, "transcript" after every
+segment (sentences from index "from" on replace the client's copy from
+there), then "final" (the saved result) and "closed".
+"""
+@app.route("/api/sessions", methods=["POST"])
+def create_session():
+    """Open a live conversation session."""
+    session = live_sessions.create()
+    print(f"🎙️ Live session {session['id']} opened.")
+    return _session_response(session, 201)
+
+@app.route("/api/sessions/<session_id>", methods=["GET"])
+def get_session(session_id):
+    """Status of a live session (and its final result once closed)."""
+    session = live_sessions.get(session_id)
+    if not session:
+        return jsonify({"error": f"Session {session_id} not found."}), 404
+    return _session_response(session)
+
+@app.route("/api/sessions/<session_id>/segments", methods=["POST"])
+def add_session_segment(session_id):
+    """Queue the next clip of a live session."""
+    if "file" in request.files:
+        file = request.files["file"]
+        stream, filename = file.stream, file.filename
+    else:
+        stream, filename = request.stream, request.args.get("filename", "segment.mp4")
+    try:
+        index = live_sessions.add_segment(session_id, stream, filename=filename)
+    except KeyError:
+        return jsonify({"error": f"Session {session_id} not found."}), 404
+    except SessionClosed as exc:
+        return jsonify({"error": str(exc)}), 409
+    except SegmentTooLarge as exc:
+        return jsonify({"error": str(exc), "session_id": session_id, "segment": exc.index}), 413
+    return jsonify({"session_id": session_id, "segment": index}), 202
+
+@app.route("/api/sessions/<session_id>/close", methods=["POST"])
+def close_session(session_id):
+    """End a live session; the final result follows on the event stream."""
+    try:
+        session = live_sessions.close(session_id)
+    except KeyError:
+        return jsonify({"error": f"Session {session_id} not found."}), 404
+    return _session_response(session, 202)
+
+@app.route("/api/sessions/<session_id>/events", methods=["GET"])
+def session_events(session_id):
+    """Server-sent events for a live session."""
+    if not live_sessions.get(session_id):
+        return jsonify({"error": f"Session {session_id} not found."}), 404
+    after = request.headers.get("Last-Event-ID") or request.args.get("after") or "0"
+    try:
+        after = int(after)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer."}), 400
+    return Response(
+        live_sessions.sse(session_id, after),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# === BACKGROUND SERVICES ===
+def start_background_services(warmup: str = MODEL_WARMUP, cpu_workers: int = CPU_POOL_WORKERS) -> None:
+    """Start the process's background work (idempotent).
+
+    Threads don't survive fork, so under gunicorn this runs in each worker
+    from the post_fork hook (see wsgi.py); the dev server runs it at import.
+    The CPU pool forks first, before this process has any thread.
+    """
+    start_cpu_pool(cpu_workers)
+    # Stale temp crops, finished live sessions and expired highlights are swept
+    # in the background, never on a request
+    start_janitor(TEMP_DIR, sweeps=[live_sessions.sweep])
+    start_highlight_compaction()
+    # Headless browsers for LinkedIn lookups start on first use, or now if BROWSER_POOL_WARM=1
+    warm_browser_pool()
+    # Started last so recovered jobs never see a half-imported module
+    job_queue.start()
+    live_sessions.recover()
+    # Warm models (MODEL_WARMUP / RECALL_FAST_START); light routes don't wait
+    model_registry.start(warmup)
+
+
+# With the debug reloader `python app.py` runs twice: a file-watching parent
+# and the child that serves. Only the child starts background work
+_RELOADER_PARENT = (
+    __name__ == "__main__" and FLASK_DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+)
+if not DEFER_BACKGROUND and not _RELOADER_PARENT:
+    start_background_services()
+    model_registry.record_timing("boot_ms", (time.perf_counter() - _BOOT_T0) * 1000)
+    print(f"🚀 App ready to serve in {(time.perf_counter() - _BOOT_T0) * 1000:.0f} ms.")
+
 # === START FLASK APP ===
+# Development server; production runs gunicorn -c gunicorn.conf.py wsgi:app
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=3000, debug=True)
+    app.run(host="0.0.0.0", port=PORT, debug=FLASK_DEBUG)
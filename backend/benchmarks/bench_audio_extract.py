@@ -0,0 +1,73 @@
+# bench_audio_extract.py — time and memory per minute of video for audio extraction
+#
+# Run from backend/:  python -m benchmarks.bench_audio_extract path/to/clip.mp4
+# Each method runs in a fresh interpreter so peak RSS is not shared between them.
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+METHODS = ("ffmpeg_pipe", "moviepy")
+
+
+def run_one(method: str, path: str) -> dict:
+    start = time.perf_counter()
+    if method == "ffmpeg_pipe":
+        from analyzers.audio_extract import extract_audio_wav, pcm_duration_sec
+        wav = extract_audio_wav(path)
+        duration = pcm_duration_sec(wav[44:])
+        out_bytes = len(wav)
+    else:
+        # The previous implementation: VideoFileClip → temp_audio.wav on disk
+        from moviepy import VideoFileClip
+        with tempfile.TemporaryDirectory() as tmp:
+            wav_path = os.path.join(tmp, "temp_audio.wav")
+            clip = VideoFileClip(path)
+            clip.audio.write_audiofile(wav_path, logger=None)
+            duration = clip.duration
+            clip.close()
+            with open(wav_path, "rb") as f:
+                out_bytes = len(f.read())
+    elapsed = time.perf_counter() - start
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {
+        "method": method,
+        "duration_sec": duration,
+        "elapsed_sec": elapsed,
+        "peak_rss_mb": self_kb / 1024,
+        "peak_child_rss_mb": child_kb / 1024,
+        "output_bytes": out_bytes,
+    }
+
+
+def main(path: str) -> None:
+    print(f"🏁 Audio extraction on {path}")
+    for method in METHODS:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_audio_extract", "--one", method, path],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{method:<12} skipped: {proc.stderr.strip().splitlines()[-1] if proc.stderr else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        minutes = max(r["duration_sec"] / 60.0, 1e-6)
+        print(
+            f"{method:<12} {r['elapsed_sec'] / minutes:6.2f} s/min | "
+            f"python peak {r['peak_rss_mb']:7.1f} MB | ffmpeg peak {r['peak_child_rss_mb']:6.1f} MB | "
+            f"{r['output_bytes'] / minutes / 1e6:5.2f} MB audio/min"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "--one":
+        print(json.dumps(run_one(sys.argv[2], sys.argv[3])))
+    elif len(sys.argv) == 2:
+        main(sys.argv[1])
+    else:
+        sys.exit("usage: python -m benchmarks.bench_audio_extract clip.mp4")
@@ -0,0 +1,43 @@
+# bench_chunked_transcribe.py — transcription latency vs. recording length and concurrency
+#
+# Run from backend/:  python -m benchmarks.bench_chunked_transcribe
+# Uses the offline LocalStubBackend with a fixed per-request latency standing
+# in for the recognizer round trip, so no credentials or network are needed.
+import time
+
+import numpy as np
+
+from analyzers.audio_extract import AUDIO_SAMPLE_RATE
+from analyzers.chunked_transcriber import LocalStubBackend, split_on_silence, transcribe_pcm
+
+REQUEST_LATENCY_SEC = 1.5
+LENGTHS_MIN = [1, 10, 30]
+WORKERS = [1, 4, 8]
+
+
+def synthetic_conversation(minutes: int, seed: int = 0) -> bytes:
+    """Alternating voiced bursts and pauses, roughly like two people talking."""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * AUDIO_SAMPLE_RATE)
+    out = np.zeros(total, dtype=np.int16)
+    pos = 0
+    while pos < total:
+        burst = int(rng.uniform(0.2, 0.6) * AUDIO_SAMPLE_RATE)
+        amp = rng.uniform(2000, 9000)
+        t = np.arange(min(burst, total - pos)) / AUDIO_SAMPLE_RATE
+        out[pos:pos + len(t)] = (amp * np.sin(2 * np.pi * rng.uniform(120, 300) * t)).astype(np.int16)
+        pos += burst + int(rng.choice([0.15, 0.3, 0.9]) * AUDIO_SAMPLE_RATE)
+    return out.tobytes()
+
+
+if __name__ == "__main__":
+    backend = LocalStubBackend(latency_sec=REQUEST_LATENCY_SEC)
+    print(f"🏁 Chunked transcription, stub recognizer latency {REQUEST_LATENCY_SEC}s/request")
+    for minutes in LENGTHS_MIN:
+        pcm = synthetic_conversation(minutes)
+        chunks = len(split_on_silence(pcm))
+        for workers in WORKERS:
+            t0 = time.perf_counter()
+            words = transcribe_pcm(pcm, backend=backend, max_workers=workers)
+            elapsed = time.perf_counter() - t0
+            print(f"{minutes:>3} min | {chunks:>3} chunks | {workers} workers | {elapsed:6.2f} s | {len(words)} words")
@@ -0,0 +1,55 @@
+# bench_face_detection.py — full-resolution HOG vs. the downscaled, batched stage
+#
+# Run from backend/:  python -m benchmarks.bench_face_detection path/to/clip.mp4 [backend]
+import sys
+import time
+
+import cv2
+import face_recognition
+
+from analyzers.face_detector import DETECTION_MAX_SIDE, detect_faces, get_detector
+from analyzers.frame_sampler import sample_frames
+
+INTERVAL_SEC = 2
+
+
+def load_samples(path):
+    video = cv2.VideoCapture(path)
+    samples = list(sample_frames(video, INTERVAL_SEC))
+    video.release()
+    return samples
+
+
+def full_res_hog(samples):
+    found = 0
+    for sample in samples:
+        rgb = cv2.cvtColor(sample.image, cv2.COLOR_BGR2RGB)
+        found += len(face_recognition.face_locations(rgb, model="hog"))
+    return found
+
+
+def staged(samples, detector):
+    return sum(len(boxes) for _, boxes in detect_faces(samples, detector))
+
+
+def timed(label, fn, *args):
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    found = fn(*args)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    print(f"{label:<28} wall {wall:7.2f} s | cpu {cpu:7.2f} s | faces {found}")
+    return wall
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m benchmarks.bench_face_detection clip.mp4 [hog|cnn|insightface]")
+    backend = sys.argv[2] if len(sys.argv) > 2 else "hog"
+    face_app = None
+    if backend == "insightface":
+        from analyzers.face_analyzer import load_insightface
+        face_app = load_insightface()
+    samples = load_samples(sys.argv[1])
+    print(f"🏁 {len(samples)} sampled frames, detection max side {DETECTION_MAX_SIDE}px")
+    base = timed("full-res hog (old)", full_res_hog, samples)
+    wall = timed(f"downscaled batched {backend}", staged, samples, get_detector(backend, face_app=face_app))
+    print(f"speedup x{base / wall:.1f}")
@@ -0,0 +1,48 @@
+# bench_face_index.py — match latency of the in-memory face index
+#
+# Run from backend/:  python -m benchmarks.bench_face_index
+import time
+
+import numpy as np
+
+from analyzers.face_index import EMBEDDING_DIM, FaceIndex
+
+GALLERY_SIZES = [10, 1_000, 50_000]
+QUERIES = 200
+TOP_K = 5
+
+
+def bench(size, rng):
+    vectors = rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32)
+    names = [f"person_{i}" for i in range(size)]
+
+    t0 = time.perf_counter()
+    index = FaceIndex()
+    index.set_all(names, vectors)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    # Queries are noisy copies of enrolled faces so the top-1 is known
+    picks = rng.integers(0, size, QUERIES)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((QUERIES, EMBEDDING_DIM)).astype(np.float32)
+
+    hits = 0
+    timings = []
+    for pick, query in zip(picks, queries):
+        t0 = time.perf_counter()
+        result = index.search(query, k=TOP_K)
+        timings.append((time.perf_counter() - t0) * 1000)
+        hits += result[0][0] == names[pick]
+
+    timings = np.array(timings)
+    print(
+        f"{size:>7} faces | build {build_ms:8.2f} ms | "
+        f"match p50 {np.percentile(timings, 50):.3f} ms  p95 {np.percentile(timings, 95):.3f} ms | "
+        f"top-1 {hits}/{QUERIES}"
+    )
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"🏁 FaceIndex top-{TOP_K} cosine search, dim={EMBEDDING_DIM}")
+    for size in GALLERY_SIZES:
+        bench(size, rng)
@@ -0,0 +1,87 @@
+# bench_face_scan.py — full scan vs. early-exit identification (face_analyzer.FaceScan)
+#
+# Run from backend/:  python -m benchmarks.bench_face_scan path/to/clip.mp4 [gallery_size]
+# "known": the gallery holds the clip's own face among random distractors,
+# so early exit should decide after K samples. "new": distractors only,
+# so it probes EARLY_EXIT_MAX_PROBES samples and then scans to the end.
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from analyzers.face_analyzer import (
+    FRAME_INTERVAL_SEC,
+    IDENTIFY_BATCH_SIZE,
+    FaceScan,
+)
+from analyzers.face_detector import DETECTION_BATCH_SIZE, detect_faces, get_detector
+from analyzers.face_index import EMBEDDING_DIM, FaceIndex, embed_face_rgb
+from analyzers.frame_sampler import new_sampler_stats, sample_frames
+
+
+def scan(path, identify, index, detector):
+    t0 = time.perf_counter()
+    video = cv2.VideoCapture(path)
+    stats = new_sampler_stats()
+    face_scan = FaceScan(identify=identify, index=index)
+    samples = sample_frames(video, FRAME_INTERVAL_SEC, stats=stats)
+    batch_size = lambda: IDENTIFY_BATCH_SIZE if face_scan.identify else DETECTION_BATCH_SIZE
+    detections = detect_faces(samples, detector, batch_size=batch_size, stats=stats)
+    for sample, locs in detections:
+        if face_scan.add(sample.image, locs):
+            break
+    detections.close()
+    samples.close()
+    video.release()
+    if face_scan.match is None and face_scan.best_frame is not None:
+        # A full scan ends by matching its best crop
+        rgb = cv2.cvtColor(face_scan.best_frame, cv2.COLOR_BGR2RGB)
+        embedding = embed_face_rgb(rgb, face_scan.best_box)
+        if embedding is not None:
+            index.search(embedding, k=1)
+    report = face_scan.report(stats)
+    report["wall_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    report["name"] = (face_scan.match or {}).get("name")
+    return report
+
+
+def gallery(size, rng, face=None):
+    names = [f"person_{i}" for i in range(size)]
+    vectors = rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32)
+    if face is not None:
+        names[0], vectors[0] = "target", face
+    index = FaceIndex()
+    index.set_all(names, vectors)
+    return index
+
+
+def clip_face(path, detector):
+    """Embedding of the clip's best face, found by one full scan."""
+    video = cv2.VideoCapture(path)
+    face_scan = FaceScan(identify=False, index=FaceIndex())
+    for sample, locs in detect_faces(sample_frames(video, FRAME_INTERVAL_SEC), detector):
+        face_scan.add(sample.image, locs)
+    video.release()
+    if face_scan.best_frame is None:
+        sys.exit(f"No face found in {path}.")
+    return embed_face_rgb(cv2.cvtColor(face_scan.best_frame, cv2.COLOR_BGR2RGB), face_scan.best_box)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m benchmarks.bench_face_scan clip.mp4 [gallery_size]")
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    detector = get_detector()
+    rng = np.random.default_rng(0)
+    face = clip_face(sys.argv[1], detector)
+
+    print(f"🏁 {sys.argv[1]}: gallery of {size}, one sample every {FRAME_INTERVAL_SEC} s")
+    for case, index in (("known", gallery(size, rng, face)), ("new", gallery(size, rng))):
+        for label, identify in (("full scan", False), ("early exit", True)):
+            r = scan(sys.argv[1], identify, index, detector)
+            print(
+                f"{case:<6} {label:<11} decoded {r['frames_decoded']:6d} | analyzed {r['frames_analyzed']:4d} | "
+                f"embedded {r['faces_embedded']:3d} | decision {r['time_to_decision_ms']:8.1f} ms | "
+                f"{r['decision']} {r['name'] or ''}"
+            )
@@ -0,0 +1,86 @@
+# bench_frame_sampler.py — frame sampler vs. the old read-every-frame loop
+#
+# Run from backend/:
+#   python -m benchmarks.bench_frame_sampler [path/to/clip.mp4]
+# Without a path a synthetic 5-minute 1080p clip is generated once
+# (videos/bench_5min_1080p.mp4) so runs are comparable.
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from analyzers.frame_sampler import new_sampler_stats, sample_frames
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SYNTHETIC_PATH = BASE_DIR / "videos" / "bench_5min_1080p.mp4"
+DURATION_SEC = 300
+FPS = 30
+SIZE = (1920, 1080)
+INTERVAL_SEC = 2
+
+
+def make_synthetic_clip(path: Path) -> Path:
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"🎬 Writing synthetic clip to {path} (one-off, takes a while)...")
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), FPS, SIZE)
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (SIZE[1], SIZE[0], 3), dtype=np.uint8)
+    for i in range(DURATION_SEC * FPS):
+        frame = background.copy()
+        # Moving block plus a "cut" every 20 seconds so scene mode has work to do
+        x = (i * 7) % (SIZE[0] - 300)
+        cv2.rectangle(frame, (x, 300), (x + 300, 700), (40, 200, 40), -1)
+        if (i // (20 * FPS)) % 2:
+            frame = cv2.bitwise_not(frame)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def legacy_loop(path: str) -> int:
+    """The original analyze_video loop: read() every frame, keep every Nth."""
+    video = cv2.VideoCapture(path)
+    fps = int(video.get(cv2.CAP_PROP_FPS)) or 25
+    frame_step = max(int(fps * INTERVAL_SEC), 1)
+    frame_count = 0
+    kept = 0
+    while True:
+        ret, frame = video.read()
+        if not ret:
+            break
+        if frame_count % frame_step == 0:
+            kept += 1
+        frame_count += 1
+    video.release()
+    return kept
+
+
+def sampler_loop(path: str, mode: str) -> int:
+    video = cv2.VideoCapture(path)
+    stats = new_sampler_stats()
+    kept = sum(1 for _ in sample_frames(video, INTERVAL_SEC, mode=mode, stats=stats))
+    video.release()
+    return kept, stats
+
+
+def timed(label, fn, *args):
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    out = fn(*args)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    kept, stats = out if isinstance(out, tuple) else (out, None)
+    extra = f" | {stats}" if stats else ""
+    print(f"{label:<18} wall {wall:7.2f} s | cpu {cpu:7.2f} s | frames kept {kept:4d}{extra}")
+    return wall
+
+
+if __name__ == "__main__":
+    clip = sys.argv[1] if len(sys.argv) > 1 else str(make_synthetic_clip(SYNTHETIC_PATH))
+    print(f"🏁 Sampling every {INTERVAL_SEC}s from {clip}")
+    base = timed("legacy read()", legacy_loop, clip)
+    for mode in ("uniform", "scene"):
+        wall = timed(f"sampler {mode}", sampler_loop, clip, mode)
+        print(f"{'':<18} speedup x{base / wall:.1f}")
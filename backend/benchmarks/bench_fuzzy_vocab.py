@@ -0,0 +1,94 @@
+# bench_fuzzy_vocab.py — fuzzy token matching: per-line difflib scan vs FuzzyVocab
+#
+# Run from backend/:  python -m benchmarks.bench_fuzzy_vocab
+# Checks that both give identical line scores, then times them on a
+# synthetic corpus (random words, queries with typos).
+import random
+import re
+import time
+
+from services.conversation_index import score_tokens_in_text
+from services.fuzzy_vocab import FuzzyVocab, is_fuzzy_match
+
+CORPUS_LINES = [500, 5_000, 20_000]
+VOCAB_SIZE = 8_000
+WORDS_PER_LINE = 12
+QUERIES = 30
+TOKENS_PER_QUERY = 3
+_WORD_RE = re.compile(r"\w+")
+
+
+def make_word(rng):
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    return "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(rng.randint(2, 5)))
+
+
+def typo(word, rng):
+    i = rng.randrange(len(word))
+    op = rng.choice("sdi")
+    if op == "s":
+        return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+    if op == "d" and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    return word[:i] + rng.choice("aeiou") + word[i:]
+
+
+def score_with_vocab(tokens, lines, fuzzy):
+    """New path: one fuzzy lookup per token, then set membership per line."""
+    candidates = {t: set(fuzzy.lookup(t)) for t in tokens}
+    scores = []
+    for line in lines:
+        words = None
+        score = 0
+        for token in tokens:
+            occurrences = line.count(token)
+            if occurrences:
+                score += occurrences
+                continue
+            if words is None:
+                words = set(_WORD_RE.findall(line))
+            if words & candidates[token]:
+                score += 1
+        scores.append(score)
+    return scores
+
+
+def bench(n_lines, rng):
+    vocab = [make_word(rng) for _ in range(VOCAB_SIZE)]
+    lines = [" ".join(rng.choice(vocab) for _ in range(WORDS_PER_LINE)) for _ in range(n_lines)]
+    words = sorted({w for line in lines for w in _WORD_RE.findall(line)})
+    queries = [
+        [typo(rng.choice(vocab), rng) if rng.random() < 0.7 else make_word(rng) for _ in range(TOKENS_PER_QUERY)]
+        for _ in range(QUERIES)
+    ]
+
+    t0 = time.perf_counter()
+    fuzzy = FuzzyVocab(words)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    # Lookup must agree with testing every vocabulary word
+    for tokens in queries[:10]:
+        for token in tokens:
+            expected = {w for w in words if is_fuzzy_match(token, w)}
+            assert set(fuzzy.lookup(token)) == expected, token
+
+    t0 = time.perf_counter()
+    old = [[score_tokens_in_text(tokens, line) for line in lines] for tokens in queries]
+    old_ms = (time.perf_counter() - t0) * 1000 / QUERIES
+
+    t0 = time.perf_counter()
+    new = [score_with_vocab(tokens, lines, fuzzy) for tokens in queries]
+    new_ms = (time.perf_counter() - t0) * 1000 / QUERIES
+
+    assert old == new, "line scores differ"
+    print(
+        f"{n_lines:>6} lines, {len(words):>5} words | build {build_ms:7.1f} ms | "
+        f"per query: difflib scan {old_ms:9.1f} ms  vocab {new_ms:7.1f} ms  ({old_ms / max(new_ms, 1e-9):5.1f}x) | scores match"
+    )
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    print(f"🏁 Fuzzy token matching, {QUERIES} queries × {TOKENS_PER_QUERY} tokens")
+    for n in CORPUS_LINES:
+        bench(n, rng)
@@ -0,0 +1,93 @@
+# bench_linkedin_search.py — LinkedIn profile search against the local fixture
+#
+# Run from backend/:  python -m benchmarks.bench_linkedin_search
+# Starts services/search_fixture_server.py and points both search URLs at
+# it, then runs linkedin_enricher._search_profiles with the http and the
+# browser backend. Checks the parsed profiles (redirect unwrapped, posts
+# and other sites skipped), the no-results page, the http → browser
+# fallback and that browser lookups reuse one pooled session, and times
+# each lookup. The browser part needs Selenium + Firefox; without them it
+# is reported as skipped.
+import time
+
+import services.linkedin_enricher as enricher
+from services.browser_pool import BrowserPool
+from services.search_fixture_server import FIXTURE_DELAY_SEC, start_fixture_server
+
+QUERY = "Datadog Shimu linkedin"
+EXPECTED = [
+    "https://www.linkedin.com/in/datadog-shimu",
+    "https://www.linkedin.com/in/datadog-1",
+    "https://www.linkedin.com/in/shimu-2",
+]
+LOOKUPS = 3
+
+
+def browser_available() -> bool:
+    try:
+        import selenium  # noqa: F401
+    except ImportError:
+        return False
+    try:
+        with enricher.get_browser_pool().session() as driver:
+            return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+def search(backend, query):
+    """One uncached lookup with the given backend; returns (profiles, ms)."""
+    enricher.SEARCH_BACKEND = backend
+    enricher._profile_cache = enricher._TTLCache()
+    t0 = time.perf_counter()
+    profiles = enricher._search_profiles(query)
+    return profiles, (time.perf_counter() - t0) * 1000
+
+
+def check_backend(backend):
+    times = []
+    for i in range(LOOKUPS):
+        profiles, ms = search(backend, QUERY)
+        assert profiles == EXPECTED, f"{backend}: {profiles}"
+        times.append(ms)
+    # Second lookup of the same query comes from the cache
+    t0 = time.perf_counter()
+    assert enricher._search_profiles(QUERY) == EXPECTED
+    cached_ms = (time.perf_counter() - t0) * 1000
+
+    empty, _ = search(backend, "noresults at all")
+    assert empty == [], f"{backend}: no-results page gave {empty}"
+    # The results page is served after FIXTURE_DELAY_SEC: the lookup waited for it
+    assert min(times) >= FIXTURE_DELAY_SEC * 1000, f"{backend}: returned before the results were ready"
+    print(
+        f"{backend:>7} | first {times[0]:7.1f} ms  then {sum(times[1:]) / (LOOKUPS - 1):7.1f} ms/lookup  "
+        f"cached {cached_ms:5.2f} ms | profiles match, no-results page ok"
+    )
+
+
+if __name__ == "__main__":
+    server = start_fixture_server()
+    base = f"http://127.0.0.1:{server.server_address[1]}/"
+    enricher.SEARCH_URL = enricher.HTTP_SEARCH_URL = base
+    print(f"🏁 LinkedIn search against {base} ({FIXTURE_DELAY_SEC:g}s result delay)")
+
+    check_backend("http")
+
+    if not browser_available():
+        print("browser | skipped: Selenium / Firefox not available")
+        # http failing with no browser to fall back on: no answer, not an empty one
+        enricher.HTTP_SEARCH_URL = "http://127.0.0.1:1/"
+        assert search("http", QUERY)[0] is None
+        print("fallback | http down, no browser → None")
+    else:
+        pool = enricher.get_browser_pool()
+        created = pool.stats()["created"]
+        check_backend("browser")
+        assert pool.stats()["created"] == created, "browser lookups did not reuse the pooled session"
+        print(f"browser | {pool.stats()['leases']} leases on {pool.stats()['created']} session(s)")
+
+        enricher.HTTP_SEARCH_URL = "http://127.0.0.1:1/"
+        profiles, ms = search("http", QUERY)
+        assert profiles == EXPECTED, f"fallback: {profiles}"
+        print(f"fallback | http down → browser answered in {ms:.1f} ms")
+    server.shutdown()
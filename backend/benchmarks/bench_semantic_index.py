@@ -0,0 +1,85 @@
+# bench_semantic_index.py — semantic turn lookup latency and recall (IVF vs exact)
+#
+# Run from backend/:  python -m benchmarks.bench_semantic_index
+# Vectors are synthetic (clustered, like real topic structure), so the
+# table measures the index alone. Query encoding is then timed with the
+# configured embedder (SEMANTIC_EMBEDDER, default all-MiniLM-L6-v2 via
+# sentence-transformers) and added to the largest index's lookup time,
+# which is what a hybrid question pays end to end.
+import tempfile
+import time
+
+import numpy as np
+
+from services.semantic_index import SEMANTIC_DIM, SEMANTIC_EMBEDDER, HashingEmbedder, SemanticIndex, get_embedder
+
+SIZES = [10_000, 100_000]
+QUERIES = 200
+EMBED_QUERIES = 100
+TOP_K = 10
+TOPICS = 500
+
+
+def build(root, size, rng):
+    topics = rng.standard_normal((TOPICS, SEMANTIC_DIM)).astype(np.float32)
+    vectors = topics[rng.integers(0, TOPICS, size)] + 0.6 * rng.standard_normal((size, SEMANTIC_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = SemanticIndex(HashingEmbedder(), root=root)
+    t0 = time.perf_counter()
+    for start in range(0, size, 10_000):
+        block = vectors[start:start + 10_000]
+        keys = [(f"p{(start + i) % 1000}", 0, start + i) for i in range(len(block))]
+        index.add_vectors(keys, block)
+    return index, vectors, time.perf_counter() - t0
+
+
+def bench(size, rng):
+    with tempfile.TemporaryDirectory() as root:
+        index, vectors, build_sec = build(root, size, rng)
+        picks = rng.integers(0, size, QUERIES)
+        queries = vectors[picks] + 0.03 * rng.standard_normal((QUERIES, SEMANTIC_DIM)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        index.search_vector(queries[0], k=TOP_K)  # warm the mmap
+        timings, recall = [], 0
+        for q in queries:
+            t0 = time.perf_counter()
+            got = index.search_vector(q, k=TOP_K)
+            timings.append((time.perf_counter() - t0) * 1000)
+            exact = np.argpartition(-(vectors @ q), TOP_K)[:TOP_K]
+            recall += len({key[2] for key, _ in got} & set(exact.tolist())) / TOP_K
+
+        timings = np.array(timings)
+        print(
+            f"{size:>7} turns | build+train {build_sec:6.2f} s | "
+            f"query p50 {np.percentile(timings, 50):6.2f} ms  p95 {np.percentile(timings, 95):6.2f} ms | "
+            f"recall@{TOP_K} {recall / QUERIES:.3f}"
+        )
+        return float(np.percentile(timings, 50))
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"🏁 Semantic index, dim={SEMANTIC_DIM}, top-{TOP_K}")
+    lookup_ms = 0.0
+    for size in SIZES:
+        lookup_ms = bench(size, rng)
+
+    try:
+        embedder = get_embedder()
+    except ImportError as exc:
+        print(f"⚠️ {SEMANTIC_EMBEDDER} embedder unavailable ({exc}); timing the hash stand-in, not the real model")
+        embedder = HashingEmbedder()
+    question = "who works in fintech or at a payments startup?"
+    embedder.embed([question])  # model warm-up
+    timings = []
+    for _ in range(EMBED_QUERIES):
+        t0 = time.perf_counter()
+        embedder.embed([question])
+        timings.append((time.perf_counter() - t0) * 1000)
+    embed_ms = float(np.percentile(timings, 50))
+    print(
+        f"query embedding ({embedder.name}) p50 {embed_ms:.2f} ms | "
+        f"embedding + lookup at {SIZES[-1]} turns p50 {embed_ms + lookup_ms:.2f} ms"
+    )
@@ -0,0 +1,197 @@
+# bench_serving.py — requests/s and memory: Flask dev server vs preforked gunicorn
+#
+# Run from backend/:  python -m benchmarks.bench_serving [--workers 4] [--path /api/people]
+# Starts each server on a free port against this backend's data and waits
+# for /api/ready. It then drives the paths with keep-alive clients from
+# several processes, so the client's GIL isn't the limit. RSS and PSS are
+# reported for every server process from /proc (Linux). PSS splits shared
+# pages between the processes that map them, so with preload_app the
+# workers' PSS stays well below their RSS: the models are shared.
+import argparse
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+READY_TIMEOUT_SEC = 300
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode: str, workers: int):
+    if mode == "single":
+        return [sys.executable, "app.py"], {"FLASK_DEBUG": "0"}
+    return (
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        {"WEB_CONCURRENCY": str(workers)},
+    )
+
+
+def wait_ready(port: int, proc: subprocess.Popen) -> float:
+    """Seconds until /api/ready answers 200 (or anything, once models failed)."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < READY_TIMEOUT_SEC:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with {proc.returncode}.")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/api/ready")
+            resp = conn.getresponse()
+            body = resp.read()
+            conn.close()
+            if resp.status == 200 or b'"failed"' in body:
+                return time.perf_counter() - t0
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("Server did not become ready.")
+
+
+def stop(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+# === Memory (Linux /proc) ===
+def _proc_kb(path: str, field: str) -> int:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree(root_pid: int):
+    """root_pid and all its descendants, parents first."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    order, stack = [], [(root_pid, 0)]
+    while stack:
+        pid, depth = stack.pop()
+        order.append((pid, depth))
+        stack.extend((c, depth + 1) for c in sorted(children.get(pid, []), reverse=True))
+    return order
+
+
+def memory_report(root_pid: int):
+    rows = []
+    for pid, depth in process_tree(root_pid):
+        rss = _proc_kb(f"/proc/{pid}/status", "VmRSS")
+        pss = _proc_kb(f"/proc/{pid}/smaps_rollup", "Pss")
+        rows.append((pid, depth, rss / 1024, pss / 1024))
+    return rows
+
+
+# === Load ===
+def _client(port: int, paths, count: int):
+    conn, latencies, errors = None, [], 0
+    for i in range(count):
+        path = paths[i % len(paths)]
+        t0 = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 500:
+                errors += 1
+            if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn = None
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies, errors
+
+
+def _client_process(port: int, paths, threads: int, per_thread: int):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: _client(port, paths, per_thread), range(threads)))
+    return [ms for lat, _ in results for ms in lat], sum(err for _, err in results)
+
+
+def drive(port: int, paths, total: int, concurrency: int, client_procs: int):
+    threads = max(1, concurrency // client_procs)
+    per_thread = max(1, total // (client_procs * threads))
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=client_procs) as pool:
+        futures = [pool.submit(_client_process, port, paths, threads, per_thread) for _ in range(client_procs)]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - t0
+    latencies = np.array([ms for lat, _ in results for ms in lat])
+    return len(latencies) / elapsed, latencies, sum(err for _, err in results)
+
+
+def bench(mode: str, args):
+    port = free_port()
+    cmd, extra_env = server_command(mode, args.workers)
+    env = dict(os.environ, PORT=str(port), RECALL_BIND=f"127.0.0.1:{port}", **extra_env)
+    log = open(os.devnull, "w") if not args.verbose else None
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=log, start_new_session=True)
+    try:
+        ready_sec = wait_ready(port, proc)
+        drive(port, args.path, min(200, args.requests), args.concurrency, args.client_procs)  # warm-up
+        rps, latencies, errors = drive(port, args.path, args.requests, args.concurrency, args.client_procs)
+        memory = memory_report(proc.pid)
+    finally:
+        stop(proc)
+
+    label = "flask dev server (1 process)" if mode == "single" else f"gunicorn preload ({args.workers} workers)"
+    print(f"\n🏁 {label}: ready in {ready_sec:.1f} s")
+    print(
+        f"   {rps:8.0f} req/s | p50 {np.percentile(latencies, 50):6.1f} ms  "
+        f"p95 {np.percentile(latencies, 95):6.1f} ms | errors {errors}"
+    )
+    for pid, depth, rss, pss in memory:
+        print(f"   {'  ' * depth}pid {pid:<7} RSS {rss:7.1f} MB  PSS {pss:7.1f} MB")
+    total_pss = sum(pss for *_, pss in memory)
+    print(f"   total PSS {total_pss:.1f} MB across {len(memory)} process(es)")
+    return rps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--client-procs", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--path", action="append", help="GET path to hit (repeatable; default /api/people)")
+    parser.add_argument("--mode", choices=["single", "gunicorn", "both"], default="both")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+    args.path = args.path or ["/api/people"]
+
+    modes = ["single", "gunicorn"] if args.mode == "both" else [args.mode]
+    results = {mode: bench(mode, args) for mode in modes}
+    if len(results) == 2:
+        print(f"\n⚡ gunicorn / dev server throughput: {results['gunicorn'] / results['single']:.2f}x")
@@ -0,0 +1,35 @@
+# gunicorn.conf.py — preforking production server
+#
+#   cd backend && gunicorn -c gunicorn.conf.py wsgi:app
+#
+# WEB_CONCURRENCY    worker processes (default: host CPUs, at most 4)
+# WEB_THREADS        request threads per worker (uploads and LLM calls block)
+# CPU_POOL_WORKERS   detection processes per worker (default: CPUs / workers)
+# PORT / RECALL_BIND where to listen
+import os
+
+# CPUs this process may run on (honours taskset / container cpusets)
+host_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, host_cpus))))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+bind = os.getenv("RECALL_BIND", f"0.0.0.0:{os.getenv('PORT', '3000')}")
+timeout = int(os.getenv("WEB_TIMEOUT_SEC", "120"))
+graceful_timeout = 30
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# Import the app (and load models) in the master, then fork: see wsgi.py
+preload_app = True
+
+# The host's CPUs are split between the workers' detection pools
+cpu_pool_workers = int(os.getenv("CPU_POOL_WORKERS") or max(1, host_cpus // workers))
+
+
+def post_fork(server, worker):
+    # Runs in the new worker before it starts any thread of its own
+    from wsgi import start_background_services
+
+    start_background_services(warmup="eager", cpu_workers=cpu_pool_workers)
+    server.log.info("Worker %s: background services started.", worker.pid)
@@ -0,0 +1,192 @@
+"""Pool of long-lived headless browser sessions for web lookups.
+
+Starting Firefox costs seconds, so sessions are created once and handed
+out with `with pool.session() as driver:`. Each session is health-checked
+before it is handed out. It is recycled after BROWSER_MAX_USES lookups,
+and discarded if a lookup raises while holding it. Sessions start
+lazily, or in the background with warm_in_background()
+(BROWSER_POOL_WARM=1). Selenium is imported only when the first
+browser is created.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+BROWSER_ACQUIRE_TIMEOUT_SEC = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT_SEC", "60"))
+BROWSER_PAGE_TIMEOUT_SEC = float(os.getenv("BROWSER_PAGE_TIMEOUT_SEC", "20"))
+BROWSER_POOL_WARM = os.getenv("BROWSER_POOL_WARM", "0") == "1"
+
+
+class BrowserPoolTimeout(RuntimeError):
+    pass
+
+
+def firefox_factory():
+    """New headless Firefox session."""
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+
+    options = FirefoxOptions()
+    options.add_argument("--headless")
+    driver = webdriver.Firefox(options=options)
+    driver.set_page_load_timeout(BROWSER_PAGE_TIMEOUT_SEC)
+    return driver
+
+
+class _Session:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        factory: Callable[[], Any] = firefox_factory,
+        size: int = BROWSER_POOL_SIZE,
+        max_uses: int = BROWSER_MAX_USES,
+    ):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle: List[_Session] = []
+        self._closed = False
+        self._stats = {"created": 0, "recycled": 0, "discarded": 0, "leases": 0, "wait_ms": 0.0, "start_ms": 0.0}
+
+    def _create(self) -> _Session:
+        t0 = time.perf_counter()
+        driver = self.factory()
+        elapsed = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._stats["created"] += 1
+            self._stats["start_ms"] += elapsed
+        print(f"🌐 Browser session started in {elapsed:.0f} ms.")
+        return _Session(driver)
+
+    @staticmethod
+    def _healthy(session: _Session) -> bool:
+        try:
+            return session.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(session: _Session) -> None:
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def session(self, timeout: float = BROWSER_ACQUIRE_TIMEOUT_SEC):
+        """Lease a driver; at most `size` are leased at once."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed.")
+        t0 = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            raise BrowserPoolTimeout(f"No browser session free within {timeout:g}s.")
+        session = None
+        ok = False
+        try:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is not None and not self._healthy(session):
+                print("⚠️ Browser session failed its health check — replacing it.")
+                self._quit(session)
+                with self._lock:
+                    self._stats["discarded"] += 1
+                session = None
+            if session is None:
+                session = self._create()
+            with self._lock:
+                self._stats["leases"] += 1
+                self._stats["wait_ms"] += (time.perf_counter() - t0) * 1000
+            yield session.driver
+            ok = True
+        finally:
+            if session is not None:
+                session.uses += 1
+                self._release(session, ok)
+            self._slots.release()
+
+    def _release(self, session: _Session, ok: bool) -> None:
+        if not ok or self._closed:
+            self._quit(session)
+            with self._lock:
+                self._stats["discarded"] += 1
+            return
+        if session.uses >= self.max_uses:
+            self._quit(session)
+            with self._lock:
+                self._stats["recycled"] += 1
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    def warm(self, count: Optional[int] = None) -> int:
+        """Start sessions up front; returns how many are idle afterwards."""
+        target = min(self.size, count or self.size)
+        while not self._closed:
+            with self._lock:
+                if len(self._idle) >= target:
+                    return len(self._idle)
+            session = self._create()
+            with self._lock:
+                self._idle.append(session)
+        return 0
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._quit(session)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+        stats["size"] = self.size
+        stats["max_uses"] = self.max_uses
+        leases = stats["leases"] or 1
+        stats["avg_wait_ms"] = round(stats.pop("wait_ms") / leases, 1)
+        stats["avg_start_ms"] = round(stats.pop("start_ms") / (stats["created"] or 1), 1)
+        return stats
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """The process-wide pool (created on first use, closed at exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def warm_in_background(enabled: bool = BROWSER_POOL_WARM) -> Optional[threading.Thread]:
+    """Start the pool's sessions on a daemon thread when BROWSER_POOL_WARM=1."""
+    if not enabled:
+        return None
+
+    def run():
+        try:
+            get_browser_pool().warm()
+        except Exception as exc:
+            print(f"⚠️ Browser pool warm-up failed: {exc}")
+
+    thread = threading.Thread(target=run, name="browser-pool-warm", daemon=True)
+    thread.start()
+    return thread
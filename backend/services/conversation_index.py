@@ -0,0 +1,558 @@
+"""Persistent inverted index over saved conversations for the assistant.
+
+Every word of every turn is a (word, person, entry, turn, tf) posting in
+SQLite, so a question only touches the turns that share a word with it
+instead of re-reading every conversation. Scores are the same as
+the original linear scan: substring counts per token, a one-point fuzzy
+fallback, 1.6 / 0.6 speaker weights and the +5 name boost.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .fuzzy_vocab import FuzzyVocab, is_fuzzy_match as is_fuzzy_token_match
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+INDEX_DB_PATH = BASE_DIR / "conversation_index.sqlite3"
+
+OTHER_SPEAKER_WEIGHT = 1.6
+SELF_SPEAKER_WEIGHT = 0.6
+NAME_BOOST = 5
+SYNC_INTERVAL_SEC = 2.0       # how often a search re-checks store generations
+SQL_BATCH = 500               # stay under SQLite's bound-parameter limit
+SUBSTRING_GRAM = 3            # n-gram size of the substring lookup
+INDEX_SCHEMA_VERSION = 2      # bump to rebuild the (derived) index from scratch
+
+STOPWORDS = {
+    "the", "a", "an", "is", "it", "to", "and", "i", "you", "they", "we", "he", "she",
+    "them", "of", "in", "on", "for", "with", "at", "what", "who", "when", "where",
+    "how", "are", "was", "be", "do", "does", "did", "this", "that", "their"
+}
+SELF_SPEAKER_LABELS = {"me", "myself", "user"}
+_WORD_RE = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    person     TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    person         TEXT NOT NULL,
+    entry_idx      INTEGER NOT NULL,
+    timestamp      INTEGER NOT NULL,
+    n_turns        INTEGER NOT NULL,
+    first_text_idx INTEGER NOT NULL,
+    base_score     REAL NOT NULL,
+    base_highlight INTEGER NOT NULL,
+    conversation   TEXT NOT NULL,
+    PRIMARY KEY (person, entry_idx)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    word      TEXT NOT NULL,
+    person    TEXT NOT NULL,
+    entry_idx INTEGER NOT NULL,
+    turn_idx  INTEGER NOT NULL,
+    tf        INTEGER NOT NULL,
+    weight    REAL NOT NULL,
+    PRIMARY KEY (word, person, entry_idx, turn_idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_person ON postings (person);
+CREATE TABLE IF NOT EXISTS vocab (
+    word TEXT PRIMARY KEY,
+    df   INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+# ======================================================
+# SCORING PRIMITIVES
+# ======================================================
+def tokenize_text(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w and w not in STOPWORDS]
+
+
+def score_tokens_in_text(tokens: Sequence[str], lower_text: str) -> int:
+    """Reference line scorer — the index reproduces this from postings."""
+    if not tokens or not lower_text:
+        return 0
+    words = _WORD_RE.findall(lower_text)
+    score = 0
+    for token in tokens:
+        if not token:
+            continue
+        occurrences = lower_text.count(token)
+        if occurrences:
+            score += occurrences
+            continue
+        for word in words:
+            if is_fuzzy_token_match(token, word):
+                score += 1
+                break
+    return score
+
+
+def speaker_weight(speaker: Any) -> float:
+    label = str(speaker or "").strip().lower()
+    if label and label not in SELF_SPEAKER_LABELS:
+        return OTHER_SPEAKER_WEIGHT
+    if label in SELF_SPEAKER_LABELS:
+        return SELF_SPEAKER_WEIGHT
+    return 1
+
+
+def _ngrams(word: str, n: int = SUBSTRING_GRAM) -> set:
+    return {word[i:i + n] for i in range(len(word) - n + 1)}
+
+
+class SubstringVocab:
+    """Which vocabulary words contain a token, without scanning them all.
+
+    Every word is filed under its character trigrams; a token of three
+    or more characters only checks the words that share its rarest
+    trigrams. Shorter tokens fall back to a scan, remembered per token
+    until the vocabulary changes.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._grams: Dict[str, set] = defaultdict(set)
+        self._known = set()
+        self._short_cache: Dict[str, List[str]] = {}
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, word: str) -> None:
+        if not word or word in self._known:
+            return
+        self._known.add(word)
+        for gram in _ngrams(word):
+            self._grams[gram].add(word)
+        self._short_cache.clear()
+
+    def lookup(self, token: str, vocab: Dict[str, int]) -> List[str]:
+        """Words of vocab that contain token (vocab drops removed words)."""
+        if len(token) < SUBSTRING_GRAM:
+            cached = self._short_cache.get(token)
+            if cached is None:
+                cached = self._short_cache[token] = [w for w in self._known if token in w]
+            return [w for w in cached if w in vocab]
+        candidates = None
+        for bucket in sorted((self._grams.get(g, set()) for g in _ngrams(token)), key=len):
+            candidates = set(bucket) if candidates is None else candidates & bucket
+            if not candidates:
+                return []
+        return [w for w in candidates if token in w and w in vocab]
+
+
+def _chunks(items: Sequence, size: int = SQL_BATCH) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ======================================================
+# INDEX
+# ======================================================
+class ConversationIndex:
+    """Inverted index over a ConversationStore, kept in SQLite.
+
+    Writers update it incrementally (append_entry / update_entry /
+    index_person / rename_person); sync() catches anything written behind its back by
+    comparing per-person store generations. A version counter in `meta`
+    tells other processes when their in-memory vocabulary is stale.
+    """
+
+    def __init__(self, store, db_path: Path = INDEX_DB_PATH):
+        self.store = store
+        self.db_path = Path(db_path)
+        self._write_lock = threading.Lock()
+        self._vocab_lock = threading.Lock()
+        self._vocab: Dict[str, int] = {}
+        self._fuzzy = FuzzyVocab()
+        self._substrings = SubstringVocab()
+        self._version = -1
+        self._last_sync = 0.0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA_VERSION:
+                for table in ("meta", "sources", "entries", "postings", "vocab"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+            conn.executescript(_SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+            self._refresh_vocab(conn)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # === Vocabulary ===
+    def _refresh_vocab(self, conn) -> None:
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        if version == self._version:
+            return
+        vocab = {row["word"]: row["df"] for row in conn.execute("SELECT word, df FROM vocab")}
+        with self._vocab_lock:
+            self._vocab = vocab
+            self._version = version
+            # Dropped words only cost a few empty posting lookups; rebuild
+            # once they make up half the fuzzy index
+            if len(self._fuzzy) > 2 * len(vocab) + 1000:
+                self._fuzzy = FuzzyVocab()
+                self._substrings = SubstringVocab()
+            for word in vocab:
+                self._fuzzy.add(word)
+                self._substrings.add(word)
+
+    def vocabulary(self) -> List[str]:
+        with self._vocab_lock:
+            return list(self._vocab)
+
+    def _containing(self, token: str) -> List[str]:
+        with self._vocab_lock:
+            return self._substrings.lookup(token, self._vocab)
+
+    def _bump_version(self, conn) -> None:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    # === Writes ===
+    def _delete_postings(self, conn, where: str, params: Tuple) -> None:
+        counts = conn.execute(
+            f"SELECT word, COUNT(*) AS n FROM postings WHERE {where} GROUP BY word", params
+        ).fetchall()
+        conn.executemany("UPDATE vocab SET df = df - ? WHERE word = ?", [(r["n"], r["word"]) for r in counts])
+        conn.execute("DELETE FROM vocab WHERE df <= 0")
+        conn.execute(f"DELETE FROM postings WHERE {where}", params)
+        conn.execute(f"DELETE FROM entries WHERE {where}", params)
+
+    def _delete_person(self, conn, name: str) -> None:
+        self._delete_postings(conn, "person = ?", (name,))
+        conn.execute("DELETE FROM sources WHERE person = ?", (name,))
+
+    def _insert_entry(self, conn, name: str, entry_idx: int, entry: Any) -> None:
+        entry = entry if isinstance(entry, dict) else {}
+        conversation = entry.get("conversation") or []
+        if not isinstance(conversation, list):
+            conversation = []
+
+        postings = []
+        first_text_idx = -1
+        base_score = 0
+        base_highlight = 0
+        best_weight = -1
+        for idx, turn in enumerate(conversation):
+            text = turn.get("text") if isinstance(turn, dict) else None
+            if not text or not isinstance(text, str):
+                continue
+            weight = speaker_weight(turn.get("speaker"))
+            if first_text_idx < 0:
+                first_text_idx = idx
+            # Question without usable tokens: every line scores 1 × weight
+            base_score += weight
+            if weight > best_weight:
+                best_weight, base_highlight = weight, idx
+            for word, tf in Counter(_WORD_RE.findall(text.lower())).items():
+                postings.append((word, name, entry_idx, idx, tf, weight))
+
+        if base_score == 0 and conversation:
+            base_score, base_highlight = len(conversation), len(conversation) - 1
+
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (person, entry_idx, timestamp, n_turns, first_text_idx, "
+            "base_score, base_highlight, conversation) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                name, entry_idx, entry.get("timestamp", 0) or 0, len(conversation),
+                max(first_text_idx, 0), base_score, base_highlight, json.dumps(conversation),
+            ),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO postings (word, person, entry_idx, turn_idx, tf, weight) VALUES (?, ?, ?, ?, ?, ?)",
+            postings,
+        )
+        df = Counter(p[0] for p in postings)
+        conn.executemany(
+            "INSERT INTO vocab (word, df) VALUES (?, ?) ON CONFLICT(word) DO UPDATE SET df = df + excluded.df",
+            list(df.items()),
+        )
+
+    def _set_source(self, conn, name: str, generation: int) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO sources (person, generation) VALUES (?, ?)",
+            (name, generation),
+        )
+
+    def index_person(self, name: str) -> int:
+        """(Re)build one person's postings from the store; returns entry count."""
+        # Generation first: a write that lands meanwhile leaves us stale, not wrong
+        generation = self.store.generation(name)
+        if generation is None:
+            self.remove_person(name)
+            return 0
+        entries = self.store.entries(name)
+
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_person(conn, name)
+                for idx, entry in enumerate(entries):
+                    self._insert_entry(conn, name, idx, entry)
+                self._set_source(conn, name, generation)
+                self._bump_version(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._refresh_vocab(conn)
+        return len(entries)
+
+    def append_entry(self, name: str, entry_idx: int, entry: Dict[str, Any]) -> None:
+        """Index one newly appended entry; rebuilds the person if out of step."""
+        generation = self.store.generation(name)
+        if generation is None:
+            return
+        in_step = False
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                indexed = conn.execute("SELECT COUNT(*) FROM entries WHERE person = ?", (name,)).fetchone()[0]
+                in_step = indexed == entry_idx
+                if in_step:
+                    self._insert_entry(conn, name, entry_idx, entry)
+                    self._set_source(conn, name, generation)
+                    self._bump_version(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._refresh_vocab(conn)
+        if not in_step:
+            self.index_person(name)
+
+    def update_entry(self, name: str, entry_idx: int, entry: Dict[str, Any]) -> None:
+        """Re-index one patched entry; rebuilds the person if out of step.
+
+        In step means the index saw every store write but this one, so
+        only this entry's postings need replacing.
+        """
+        generation = self.store.generation(name)
+        if generation is None:
+            return
+        in_step = False
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                indexed = conn.execute("SELECT generation FROM sources WHERE person = ?", (name,)).fetchone()
+                in_step = indexed is not None and indexed["generation"] == generation - 1
+                if in_step:
+                    self._delete_postings(conn, "person = ? AND entry_idx = ?", (name, entry_idx))
+                    self._insert_entry(conn, name, entry_idx, entry)
+                    self._set_source(conn, name, generation)
+                    self._bump_version(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._refresh_vocab(conn)
+        if not in_step:
+            self.index_person(name)
+
+    def remove_person(self, name: str) -> None:
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_person(conn, name)
+                self._bump_version(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._refresh_vocab(conn)
+
+    def rename_person(self, old_name: str, new_name: str) -> None:
+        # Rename rewrites speaker labels and text too, so re-read the history
+        if old_name != new_name:
+            self.remove_person(old_name)
+        self.index_person(new_name)
+
+    def sync(self, force: bool = False) -> int:
+        """Re-index people whose store generation changed; returns people touched."""
+        now = time.time()
+        if not force and now - self._last_sync < SYNC_INTERVAL_SEC:
+            return 0
+        self._last_sync = now
+
+        current = self.store.generations()
+        with self._connect() as conn:
+            indexed = {
+                row["person"]: row["generation"]
+                for row in conn.execute("SELECT person, generation FROM sources")
+            }
+        changed = [name for name, gen in current.items() if indexed.get(name) != gen]
+        removed = [name for name in indexed if name not in current]
+        for name in changed:
+            self.index_person(name)
+        for name in removed:
+            self.remove_person(name)
+        return len(changed) + len(removed)
+
+    # === Reads ===
+    def _postings(self, conn, words: Sequence[str], people: Optional[Sequence[str]]):
+        for batch in _chunks(list(words)):
+            sql = (
+                "SELECT word, person, entry_idx, turn_idx, tf, weight FROM postings "
+                f"WHERE word IN ({','.join('?' * len(batch))})"
+            )
+            params = list(batch)
+            if people is not None:
+                sql += f" AND person IN ({','.join('?' * len(people))})"
+                params += list(people)
+            yield from conn.execute(sql, params)
+
+    def _score_turns(self, conn, tokens: Sequence[str], people: Optional[Sequence[str]]) -> Dict[Tuple[str, int, int], float]:
+        """Weighted line score for every turn that matches at least one token."""
+        line: Dict[Tuple[str, int, int], int] = defaultdict(int)
+        weights: Dict[Tuple[str, int, int], float] = {}
+
+        for token, times in Counter(t for t in tokens if t).items():
+            # A \w+ token can only occur inside a single \w+ word, so the
+            # substring count over a line is the sum over its words.
+            containing = self._containing(token)
+            hits: Dict[Tuple[str, int, int], int] = defaultdict(int)
+            for row in self._postings(conn, containing, people):
+                key = (row["person"], row["entry_idx"], row["turn_idx"])
+                hits[key] += row["tf"] * row["word"].count(token)
+                weights[key] = row["weight"]
+            for key, count in hits.items():
+                line[key] += count * times
+
+            fuzzy = [w for w in self._fuzzy.lookup(token) if token not in w]
+            fuzzy_hits = set()
+            for row in self._postings(conn, fuzzy, people):
+                key = (row["person"], row["entry_idx"], row["turn_idx"])
+                if key not in hits:
+                    fuzzy_hits.add(key)
+                    weights[key] = row["weight"]
+            for key in fuzzy_hits:
+                line[key] += times
+
+        return {key: score * weights[key] for key, score in line.items()}
+
+    def search(
+        self,
+        tokens: Sequence[str],
+        target_name: Optional[str] = None,
+        turn_boosts: Optional[Dict[Tuple[str, int, int], float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Best entry per person for the question tokens.
+
+        turn_boosts adds extra (e.g. semantic) scores to individual turns
+        before entries are ranked. Returns one hit per person (every
+        person, like the old scan):
+        {"name", "timestamp", "score", "highlight_index", "conversation"}.
+        """
+        self.sync()
+        normalized_target = target_name.lower() if target_name else None
+
+        with self._connect() as conn:
+            self._refresh_vocab(conn)
+            people = [
+                row["person"]
+                for row in conn.execute("SELECT person FROM sources ORDER BY person")
+                if not normalized_target or row["person"].lower() == normalized_target
+            ]
+            if not people:
+                return []
+            scoped = people if normalized_target else None
+
+            entries_by_person: Dict[str, List[sqlite3.Row]] = defaultdict(list)
+            sql = (
+                "SELECT person, entry_idx, timestamp, n_turns, first_text_idx, base_score, base_highlight "
+                "FROM entries"
+            )
+            params: List[Any] = []
+            if scoped is not None:
+                sql += f" WHERE person IN ({','.join('?' * len(scoped))})"
+                params = list(scoped)
+            for row in conn.execute(sql + " ORDER BY person, entry_idx", params):
+                entries_by_person[row["person"]].append(row)
+
+            # Per entry: summed line score + first turn holding the max
+            entry_scores: Dict[Tuple[str, int], List] = {}
+            if tokens:
+                turn_scores = self._score_turns(conn, tokens, scoped)
+                for key, boost in (turn_boosts or {}).items():
+                    if scoped is None or key[0] in scoped:
+                        turn_scores[key] = turn_scores.get(key, 0) + boost
+                for (person, entry_idx, turn_idx), score in sorted(turn_scores.items()):
+                    agg = entry_scores.setdefault((person, entry_idx), [0, -1, -1])
+                    agg[0] += score
+                    if score > agg[1]:
+                        agg[1], agg[2] = score, turn_idx
+
+            hits = []
+            for person in people:
+                name_boost = NAME_BOOST if person.lower() in tokens else 0
+                best = None
+                best_score, best_highlight, best_ts = -1, -1, 0
+                for row in entries_by_person.get(person, []):
+                    if not row["n_turns"]:
+                        continue
+                    if tokens:
+                        agg = entry_scores.get((person, row["entry_idx"]))
+                        score, highlight = (agg[0], agg[2]) if agg else (0, row["first_text_idx"])
+                        if score > 0:
+                            score += name_boost
+                    else:
+                        score, highlight = row["base_score"], row["base_highlight"]
+                    ts = row["timestamp"]
+                    if score > best_score or (score == best_score and ts > best_ts):
+                        best, best_score, best_highlight, best_ts = row, score, highlight, ts
+
+                rows = entries_by_person.get(person)
+                if best is None and rows:
+                    best = rows[-1]
+                    best_ts = best["timestamp"]
+                    best_highlight = best["n_turns"] - 1 if best["n_turns"] else -1
+                    best_score = 0
+
+                conversation = []
+                if best is not None:
+                    stored = conn.execute(
+                        "SELECT conversation FROM entries WHERE person = ? AND entry_idx = ?",
+                        (person, best["entry_idx"]),
+                    ).fetchone()
+                    conversation = json.loads(stored["conversation"]) if stored else []
+                hits.append({
+                    "name": person,
+                    "timestamp": best_ts,
+                    "score": max(best_score, 0),
+                    "highlight_index": best_highlight,
+                    "conversation": conversation,
+                })
+        return hits
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            return {
+                "people": conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0],
+                "entries": conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+                "postings": conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0],
+                "vocabulary": conn.execute("SELECT COUNT(*) FROM vocab").fetchone()[0],
+                "version": conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0],
+            }
@@ -0,0 +1,611 @@
+"""Conversation storage: one append-only segment per person + SQLite metadata.
+
+    conversations/<person>.jsonl   segment; one JSON record per line:
+        {"op": "segment", "id"}                 header (new id on every rewrite)
+        {"op": "entry", "entry": {...}}         one saved conversation
+        {"op": "patch", "idx", "fields"}        later metadata change (LinkedIn)
+    conversations.sqlite3          people + entries (timestamp, headline,
+                                   keywords, linkedin, bio, byte offset/length)
+                                   + sources (upload hashes already saved)
+
+Saving a conversation is one fsync'd append plus one SQLite row, instead
+of re-writing the person's whole history. Appends happen inside a
+BEGIN IMMEDIATE transaction, so concurrent jobs (threads or processes)
+are serialised. On startup a segment that is longer than its indexed
+length (crash between append and commit) has its tail indexed, and a
+torn final line is cut off.
+
+A rename writes the merged history to <new>.jsonl.rename (its header
+names the old person) and commits both people's rows in one
+transaction; the files are swapped after the commit. recover() finishes
+a rename that was committed but interrupted, and drops one that wasn't.
+
+Migrate legacy conversations/<person>.json files:
+    python -m services.conversation_store --migrate
+"""
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MEMORY_DIR = BASE_DIR / "conversations"
+STORE_DB_PATH = BASE_DIR / "conversations.sqlite3"
+LEGACY_DIR_NAME = "legacy_json"
+RENAME_SUFFIX = ".jsonl.rename"
+METADATA_FIELDS = ("headline", "keywords", "linkedin", "bio")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS people (
+    person        TEXT PRIMARY KEY,
+    segment_id    TEXT NOT NULL,
+    segment_bytes INTEGER NOT NULL,
+    n_entries     INTEGER NOT NULL,
+    generation    INTEGER NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    person    TEXT NOT NULL,
+    entry_idx INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    headline  TEXT NOT NULL DEFAULT '',
+    keywords  TEXT NOT NULL DEFAULT '[]',
+    linkedin  TEXT,
+    bio       TEXT,
+    n_turns   INTEGER NOT NULL,
+    offset    INTEGER NOT NULL,
+    length    INTEGER NOT NULL,
+    PRIMARY KEY (person, entry_idx)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_person_ts ON entries (person, timestamp);
+CREATE TABLE IF NOT EXISTS sources (
+    source    TEXT PRIMARY KEY,
+    person    TEXT NOT NULL,
+    saved_at  REAL NOT NULL
+);
+"""
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ConversationStore:
+    def __init__(self, root: Path = MEMORY_DIR, db_path: Path = STORE_DB_PATH):
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._flock_fd: Optional[int] = None
+        self._flock_depth = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _locked(self):
+        """Thread lock + a flock on the store directory (re-entrant per thread).
+
+        Held around every write, so multi-step changes that also move
+        files (rename) are atomic for other server processes too.
+        """
+        with self._lock:
+            if self._flock_depth == 0:
+                fd = os.open(str(self.root), os.O_RDONLY)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._flock_fd = fd
+            self._flock_depth += 1
+            try:
+                yield
+            finally:
+                self._flock_depth -= 1
+                if self._flock_depth == 0:
+                    os.close(self._flock_fd)
+                    self._flock_fd = None
+
+    @contextmanager
+    def _write(self):
+        """Store lock + BEGIN IMMEDIATE (serialises writers across processes)."""
+        with self._locked(), self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def segment_path(self, name: str) -> Path:
+        return self.root / f"{name}.jsonl"
+
+    def _staged_path(self, name: str) -> Path:
+        return self.root / f"{name}{RENAME_SUFFIX}"
+
+    # === Segment scanning / indexing ===
+    def _scan(self, path: Path, start: int = 0):
+        """Yield (offset, length, record) for complete lines from start."""
+        with open(path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return  # torn final write
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield offset, len(line), record
+                offset += len(line)
+
+    def _index_record(self, conn, name: str, offset: int, length: int, record: Dict[str, Any], next_idx: int) -> int:
+        op = record.get("op")
+        if op == "entry":
+            entry = record.get("entry") or {}
+            conversation = entry.get("conversation")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (person, entry_idx, timestamp, headline, keywords, linkedin, bio, "
+                "n_turns, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name, next_idx, int(entry.get("timestamp") or 0), entry.get("headline") or "",
+                    json.dumps(entry.get("keywords") or []), entry.get("linkedin"), entry.get("bio"),
+                    len(conversation) if isinstance(conversation, list) else 0, offset, length,
+                ),
+            )
+            return next_idx + 1
+        if op == "patch":
+            self._apply_patch_row(conn, name, record.get("idx"), record.get("fields") or {})
+        return next_idx
+
+    def _apply_patch_row(self, conn, name: str, idx: int, fields: Dict[str, Any]) -> None:
+        sets, params = [], []
+        for key in METADATA_FIELDS:
+            if key in fields:
+                sets.append(f"{key} = ?")
+                value = fields[key]
+                params.append(json.dumps(value or []) if key == "keywords" else value)
+        if sets:
+            conn.execute(
+                f"UPDATE entries SET {', '.join(sets)} WHERE person = ? AND entry_idx = ?",
+                params + [name, idx],
+            )
+
+    def _reindex(self, conn, name: str, path: Optional[Path] = None) -> None:
+        """Rebuild one person's rows from their whole segment (or a staged one)."""
+        path = path or self.segment_path(name)
+        conn.execute("DELETE FROM entries WHERE person = ?", (name,))
+        segment_id, end, n = "", 0, 0
+        for offset, length, record in self._scan(path):
+            end = offset + length
+            if not record:
+                continue
+            if record.get("op") == "segment":
+                segment_id = record.get("id", "")
+                continue
+            n = self._index_record(conn, name, offset, length, record, n)
+        self._truncate_torn_tail(path, end)
+        self._set_person(conn, name, segment_id, end, n)
+
+    def _truncate_torn_tail(self, path: Path, end: int) -> None:
+        if path.stat().st_size > end:
+            with open(path, "r+b") as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _set_person(self, conn, name: str, segment_id: str, segment_bytes: int, n_entries: int) -> None:
+        conn.execute(
+            "INSERT INTO people (person, segment_id, segment_bytes, n_entries, generation, updated_at) "
+            "VALUES (?, ?, ?, ?, 1, ?) ON CONFLICT(person) DO UPDATE SET segment_id = excluded.segment_id, "
+            "segment_bytes = excluded.segment_bytes, n_entries = excluded.n_entries, "
+            "generation = people.generation + 1, updated_at = excluded.updated_at",
+            (name, segment_id, segment_bytes, n_entries, time.time()),
+        )
+
+    def _read_header(self, path: Path) -> Dict[str, Any]:
+        try:
+            with open(path, "rb") as f:
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return {}
+
+    def _read_header_id(self, path: Path) -> str:
+        return self._read_header(path).get("id", "")
+
+    def _ensure_consistent(self, conn, name: str) -> Optional[sqlite3.Row]:
+        """Bring a person's rows in line with their segment; returns the row."""
+        path = self.segment_path(name)
+        row = conn.execute("SELECT * FROM people WHERE person = ?", (name,)).fetchone()
+        if not path.exists():
+            if row:
+                conn.execute("DELETE FROM entries WHERE person = ?", (name,))
+                conn.execute("DELETE FROM people WHERE person = ?", (name,))
+            return None
+        size = path.stat().st_size
+        if row is None or row["segment_id"] != self._read_header_id(path) or size < row["segment_bytes"]:
+            self._reindex(conn, name)
+        elif size > row["segment_bytes"]:
+            # Appended but not committed (crash) — index the complete tail
+            n, end = row["n_entries"], row["segment_bytes"]
+            for offset, length, record in self._scan(path, row["segment_bytes"]):
+                end = offset + length
+                if record:
+                    n = self._index_record(conn, name, offset, length, record, n)
+            self._truncate_torn_tail(path, end)
+            self._set_person(conn, name, row["segment_id"], end, n)
+        return conn.execute("SELECT * FROM people WHERE person = ?", (name,)).fetchone()
+
+    def _finish_rename(self, name: str) -> None:
+        """Swap in a committed rename's segment and drop the old person's file."""
+        staged, path = self._staged_path(name), self.segment_path(name)
+        if staged.exists():
+            os.replace(staged, path)
+            _fsync_dir(self.root)
+        old_name = self._read_header(path).get("renamed_from")
+        if old_name and old_name != name and not self.exists(old_name):
+            self.segment_path(old_name).unlink(missing_ok=True)
+
+    def _recover_renames(self) -> None:
+        with self._locked():
+            for staged in self.root.glob(f"*{RENAME_SUFFIX}"):
+                name = staged.name[: -len(RENAME_SUFFIX)]
+                with self._connect() as conn:
+                    row = conn.execute("SELECT segment_id FROM people WHERE person = ?", (name,)).fetchone()
+                if row and row["segment_id"] == self._read_header_id(staged):
+                    self._finish_rename(name)        # committed, files not swapped yet
+                else:
+                    staged.unlink(missing_ok=True)   # transaction never committed
+            # Crash between swapping in the new segment and unlinking the old one
+            for path in self.root.glob("*.jsonl"):
+                if self._read_header(path).get("renamed_from"):
+                    self._finish_rename(path.stem)
+
+    def recover(self) -> int:
+        """Reconcile every segment on disk with SQLite; returns people checked."""
+        self._recover_renames()
+        names = {p.stem for p in self.root.glob("*.jsonl")}
+        with self._connect() as conn:
+            names |= {r["person"] for r in conn.execute("SELECT person FROM people")}
+        for name in names:
+            with self._write() as conn:
+                self._ensure_consistent(conn, name)
+        return len(names)
+
+    # === Writes ===
+    def _new_segment(self, path: Path, entries: List[Dict[str, Any]], **header: Any) -> None:
+        """Write a complete segment atomically (tmp + fsync + rename)."""
+        tmp = path.with_suffix(f".jsonl.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_encode({"op": "segment", "id": uuid.uuid4().hex, **header}))
+            for entry in entries:
+                f.write(_encode({"op": "entry", "entry": entry}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(path.parent)
+
+    def _append(self, conn, name: str, record: Dict[str, Any]) -> Tuple[int, int]:
+        path = self.segment_path(name)
+        if not path.exists():
+            self._new_segment(path, [])
+        person = self._ensure_consistent(conn, name)
+        data = _encode(record)
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return person["segment_bytes"], len(data)
+
+    def append_entry(self, name: str, entry: Dict[str, Any], source: Optional[str] = None) -> Optional[int]:
+        """Durably append one conversation entry; returns its index.
+
+        source (the upload's content hash) makes the save idempotent: if
+        an entry was already saved from it, nothing is appended and None
+        is returned.
+        """
+        with self._write() as conn:
+            if source is not None:
+                if conn.execute("SELECT 1 FROM sources WHERE source = ?", (source,)).fetchone():
+                    return None
+                conn.execute(
+                    "INSERT INTO sources (source, person, saved_at) VALUES (?, ?, ?)", (source, name, time.time())
+                )
+            offset, length = self._append(conn, name, {"op": "entry", "entry": entry})
+            person = conn.execute("SELECT * FROM people WHERE person = ?", (name,)).fetchone()
+            idx = self._index_record(conn, name, offset, length, {"op": "entry", "entry": entry}, person["n_entries"])
+            self._set_person(conn, name, person["segment_id"], offset + length, idx)
+        return idx - 1
+
+    def update_entry(self, name: str, idx: int, fields: Dict[str, Any]) -> None:
+        """Patch metadata (headline, keywords, linkedin, bio) of one entry."""
+        unknown = set(fields) - set(METADATA_FIELDS)
+        if unknown:
+            raise ValueError(f"Only {', '.join(METADATA_FIELDS)} can be updated, not {', '.join(sorted(unknown))}.")
+        with self._write() as conn:
+            person = self._ensure_consistent(conn, name)
+            if person is None or not 0 <= idx < person["n_entries"]:
+                raise KeyError(f"No entry {idx} for {name}.")
+            offset, length = self._append(conn, name, {"op": "patch", "idx": idx, "fields": fields})
+            self._apply_patch_row(conn, name, idx, fields)
+            self._set_person(conn, name, person["segment_id"], offset + length, person["n_entries"])
+
+    def import_entries(self, name: str, entries: List[Dict[str, Any]]) -> int:
+        """Replace a person's history with entries (migration / rename)."""
+        with self._write() as conn:
+            self._new_segment(self.segment_path(name), entries)
+            self._reindex(conn, name)
+        return len(entries)
+
+    def rename(self, old_name: str, new_name: str, transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> bool:
+        """Move old_name's history under new_name (appended after any existing).
+
+        transform(entry) may rewrite entries on the way (speaker labels).
+        """
+        if old_name == new_name or not self.exists(old_name):
+            return False
+        # Reads, both people's rows and the file swap happen under one store
+        # lock; a save by another worker waits instead of being lost
+        with self._locked():
+            with self._write() as conn:
+                if self._ensure_consistent(conn, old_name) is None:
+                    return False
+                self._ensure_consistent(conn, new_name)
+                moved = [transform(e) if transform else e for e in self.entries(old_name)]
+                existing = self.entries(new_name)
+                if transform:
+                    existing = [transform(e) for e in existing]
+                staged = self._staged_path(new_name)
+                self._new_segment(staged, existing + moved, renamed_from=old_name)
+                self._reindex(conn, new_name, path=staged)
+                conn.execute("DELETE FROM entries WHERE person = ?", (old_name,))
+                conn.execute("DELETE FROM people WHERE person = ?", (old_name,))
+                conn.execute("UPDATE sources SET person = ? WHERE person = ?", (new_name, old_name))
+            # Committed: only now do the files change
+            self._finish_rename(new_name)
+        return True
+
+    # === Reads ===
+    def exists(self, name: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM people WHERE person = ?", (name,)).fetchone() is not None
+
+    def people(self) -> List[str]:
+        with self._connect() as conn:
+            return [r["person"] for r in conn.execute("SELECT person FROM people ORDER BY person")]
+
+    def saved_source(self, source: str) -> Optional[str]:
+        """Person an upload with this content hash was saved under, if any."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT person FROM sources WHERE source = ?", (source,)).fetchone()
+        return row["person"] if row else None
+
+    def generations(self) -> Dict[str, int]:
+        """person → generation; bumps on every write (for derived indexes)."""
+        with self._connect() as conn:
+            return {r["person"]: r["generation"] for r in conn.execute("SELECT person, generation FROM people")}
+
+    def generation(self, name: str) -> Optional[int]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT generation FROM people WHERE person = ?", (name,)).fetchone()
+        return row["generation"] if row else None
+
+    def count(self, name: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT n_entries FROM people WHERE person = ?", (name,)).fetchone()
+        return row["n_entries"] if row else 0
+
+    def entries(self, name: str) -> List[Dict[str, Any]]:
+        """Full history (patches applied), in save order."""
+        path = self.segment_path(name)
+        if not path.exists():
+            return []
+        entries: List[Dict[str, Any]] = []
+        for _, _, record in self._scan(path):
+            if not record:
+                continue
+            if record.get("op") == "entry":
+                entries.append(record.get("entry") or {})
+            elif record.get("op") == "patch" and 0 <= record.get("idx", -1) < len(entries):
+                entries[record["idx"]].update(record.get("fields") or {})
+        return entries
+
+    def entry(self, name: str, idx: int) -> Optional[Dict[str, Any]]:
+        """One entry by index — a single seek, metadata from SQLite."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM entries WHERE person = ? AND entry_idx = ?", (name, idx)).fetchone()
+        if row is None:
+            return None
+        with open(self.segment_path(name), "rb") as f:
+            f.seek(row["offset"])
+            entry = json.loads(f.read(row["length"]))["entry"]
+        entry.update(self._metadata(row))
+        return entry
+
+    def _row_filter(self, name: str, since: Optional[int], after: Optional[Tuple[int, int]], before: Optional[Tuple[int, int]]):
+        clauses, params = ["person = ?"], [name]
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if after is not None:
+            clauses.append("(timestamp, entry_idx) > (?, ?)")
+            params.extend(after)
+        if before is not None:
+            clauses.append("(timestamp, entry_idx) < (?, ?)")
+            params.extend(before)
+        return " AND ".join(clauses), params
+
+    def entry_rows(
+        self,
+        name: str,
+        since: Optional[int] = None,
+        after: Optional[Tuple[int, int]] = None,
+        before: Optional[Tuple[int, int]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[sqlite3.Row]:
+        """Index rows in (timestamp, entry_idx) order — no segment reads.
+
+        after / before are (timestamp, entry_idx) keyset cursors; with only
+        `before`, the `limit` rows closest to it are returned.
+        """
+        where, params = self._row_filter(name, since, after, before)
+        order = "DESC" if before is not None and after is None else "ASC"
+        sql = f"SELECT * FROM entries WHERE {where} ORDER BY timestamp {order}, entry_idx {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return rows[::-1] if order == "DESC" else rows
+
+    def count_rows(
+        self,
+        name: str,
+        since: Optional[int] = None,
+        after: Optional[Tuple[int, int]] = None,
+        before: Optional[Tuple[int, int]] = None,
+    ) -> int:
+        where, params = self._row_filter(name, since, after, before)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM entries WHERE {where}", params).fetchone()[0]
+
+    def find_row(self, name: str, timestamp: int) -> Optional[sqlite3.Row]:
+        """First entry saved at timestamp (the assistant's ?ts= deep link)."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM entries WHERE person = ? AND timestamp = ? ORDER BY entry_idx LIMIT 1",
+                (name, timestamp),
+            ).fetchone()
+
+    def load_rows(self, name: str, rows: List[sqlite3.Row], body: bool = True) -> List[Dict[str, Any]]:
+        """Entries for index rows; only these rows' bytes are read (none if not body)."""
+        out = []
+        f = open(self.segment_path(name), "rb") if body and rows else None
+        try:
+            for row in rows:
+                entry: Dict[str, Any] = {"timestamp": row["timestamp"], "n_turns": row["n_turns"]}
+                if f is not None:
+                    f.seek(row["offset"])
+                    entry.update(json.loads(f.read(row["length"]))["entry"])
+                entry.update(self._metadata(row))
+                entry["entry_index"] = row["entry_idx"]
+                out.append(entry)
+        finally:
+            if f is not None:
+                f.close()
+        return out
+
+    def _metadata(self, row: sqlite3.Row) -> Dict[str, Any]:
+        meta = {"headline": row["headline"], "keywords": json.loads(row["keywords"] or "[]")}
+        for key in ("linkedin", "bio"):
+            if row[key]:
+                meta[key] = row[key]
+        return meta
+
+    def latest_headline(self, name: str) -> str:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT headline FROM entries WHERE person = ? AND headline != '' "
+                "ORDER BY entry_idx DESC LIMIT 1",
+                (name,),
+            ).fetchone()
+        return row["headline"] if row else ""
+
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        """person → {count, last_seen, headline} in one query (people catalogue)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT p.person, p.n_entries, "
+                "(SELECT MAX(timestamp) FROM entries e WHERE e.person = p.person) AS last_seen, "
+                "(SELECT headline FROM entries e WHERE e.person = p.person AND headline != '' "
+                " ORDER BY entry_idx DESC LIMIT 1) AS headline "
+                "FROM people p"
+            ).fetchall()
+        return {
+            r["person"]: {"count": r["n_entries"], "last_seen": r["last_seen"] or 0, "headline": r["headline"] or ""}
+            for r in rows
+        }
+
+    def stamp(self) -> Tuple[int, float]:
+        """(people, last write time) — changes whenever any history does."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*), COALESCE(MAX(updated_at), 0) FROM people").fetchone()
+        return row[0], row[1]
+
+    def latest_profile(self, name: str) -> Dict[str, str]:
+        """LinkedIn fields of the most recent entry that has them."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT linkedin, bio FROM entries WHERE person = ? AND linkedin IS NOT NULL AND linkedin != '' "
+                "ORDER BY entry_idx DESC LIMIT 1",
+                (name,),
+            ).fetchone()
+        if not row:
+            return {}
+        return {key: row[key] for key in ("linkedin", "bio") if row[key]}
+
+    # === Migration ===
+    def migrate_legacy(self) -> Dict[str, int]:
+        """Import conversations/<person>.json files; originals are moved aside."""
+        legacy_dir = self.root / LEGACY_DIR_NAME
+        migrated, skipped = 0, 0
+        for path in sorted(self.root.glob("*.json")):
+            name = path.stem
+            try:
+                entries = json.loads(path.read_text(encoding="utf-8"))
+                if not isinstance(entries, list):
+                    raise ValueError("expected a list of entries")
+            except Exception as exc:
+                print(f"⚠️ Skipping {path.name}: {exc}")
+                skipped += 1
+                continue
+            entries = [e for e in entries if isinstance(e, dict)]
+            if self.exists(name):
+                current = self.entries(name)
+                # A rerun after an interrupted migration already holds the
+                # legacy history; otherwise keep newer store entries after it
+                entries = current if current[:len(entries)] == entries else entries + current
+            self.import_entries(name, entries)
+            legacy_dir.mkdir(exist_ok=True)
+            shutil.move(str(path), str(legacy_dir / path.name))
+            migrated += 1
+            print(f"📦 Migrated {path.name} ({len(entries)} entries).")
+        return {"migrated": migrated, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--migrate"]:
+        sys.exit("usage: python -m services.conversation_store --migrate")
+    store = ConversationStore()
+    result = store.migrate_legacy()
+    print(f"✅ {result['migrated']} migrated, {result['skipped']} skipped, "
+          f"{store.recover()} people in the store.")
@@ -0,0 +1,81 @@
+"""Process pool for CPU-bound stages (face detection batches).
+
+Job threads share one interpreter, so CPU-heavy work is sent to worker
+processes with submit_cpu(fn, *args). The pool uses the fork start method
+and starts every child at once in start_cpu_pool(). Call it right after
+the web worker forks and before that process starts any thread: children
+then inherit already-loaded models copy-on-write instead of loading their
+own. With CPU_POOL_WORKERS=0 (the dev-server default) nothing forks and
+work runs inline. gunicorn.conf.py sizes the pool to the host.
+"""
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "0"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def host_cpu_count() -> int:
+    """CPUs this process may run on (honours taskset / container cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def start_cpu_pool(workers: int = CPU_POOL_WORKERS) -> Optional[ProcessPoolExecutor]:
+    """Fork the pool's processes now; returns None when running inline."""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None or workers <= 0:
+            return _pool
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"))
+        # With fork, the first submit starts all children at once
+        pool.submit(os.getpid).result()
+        _pool, _pool_size = pool, workers
+    atexit.register(stop_cpu_pool)
+    print(f"🧮 CPU pool: {workers} process(es) forked from pid {os.getpid()}.")
+    return pool
+
+
+def stop_cpu_pool() -> None:
+    global _pool, _pool_size
+    with _pool_lock:
+        pool, _pool, _pool_size = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def cpu_pool_size() -> int:
+    """Processes in the pool; 0 means submit_cpu runs inline."""
+    return _pool_size
+
+
+def submit_cpu(fn: Callable[..., Any], *args: Any) -> Future:
+    """Run fn(*args) in the pool (fn must be a module-level function)."""
+    pool = _pool
+    if pool is not None:
+        try:
+            return pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A child died (e.g. OOM-killed); keep serving inline
+            print("⚠️ CPU pool is broken — running CPU stages inline.")
+            stop_cpu_pool()
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def cpu_pool_stats() -> Dict[str, Any]:
+    return {"workers": _pool_size, "host_cpus": host_cpu_count(), "pid": os.getpid()}
@@ -0,0 +1,100 @@
+"""Fuzzy lookup over the conversation vocabulary.
+
+The assistant's fuzzy rule is difflib's SequenceMatcher ratio >= 0.78
+between words whose lengths differ by at most 2. That ratio is bounded
+above by 2 * |shared characters| / (len(a) + len(b)) (difflib's
+quick_ratio), which only needs per-word character counts. Words are
+bucketed by length with one count matrix per bucket; a query token
+checks the buckets within ±2 with a single numpy pass, and only the
+few survivors are verified with the exact SequenceMatcher ratio. Same
+matches as comparing against every word, a fraction of the work.
+"""
+import difflib
+import string
+import threading
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+FUZZY_MATCH_RATIO = 0.78
+MAX_LENGTH_DIFF = 2
+_ALPHABET = string.ascii_lowercase + string.digits + "_"
+_COLUMN = {ch: i for i, ch in enumerate(_ALPHABET)}
+_OTHER = len(_ALPHABET)       # every other character shares one column
+_WIDTH = len(_ALPHABET) + 1
+
+
+def char_counts(word: str) -> np.ndarray:
+    counts = np.zeros(_WIDTH, dtype=np.uint8)
+    for ch in word:
+        counts[_COLUMN.get(ch, _OTHER)] += 1
+    return counts
+
+
+def is_fuzzy_match(token: str, word: str, threshold: float = FUZZY_MATCH_RATIO) -> bool:
+    """The assistant's fuzzy rule (exact, no index)."""
+    if not token or not word:
+        return False
+    if token == word:
+        return True
+    if abs(len(token) - len(word)) > MAX_LENGTH_DIFF:
+        return False
+    return difflib.SequenceMatcher(None, token, word).ratio() >= threshold
+
+
+class FuzzyVocab:
+    """Length-bucketed character-count index for fuzzy word lookup.
+
+    The shared "other" column can only over-count shared characters, so
+    the filter never drops a real match; it only lets a few extra
+    candidates through to the exact check.
+    """
+
+    def __init__(self, words: Iterable[str] = (), threshold: float = FUZZY_MATCH_RATIO):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._words: Dict[int, List[str]] = {}
+        self._pending: Dict[int, List[np.ndarray]] = {}
+        self._matrix: Dict[int, np.ndarray] = {}
+        self._known = set()
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, word: str) -> None:
+        if not word or word in self._known:
+            return
+        with self._lock:
+            self._known.add(word)
+            self._words.setdefault(len(word), []).append(word)
+            self._pending.setdefault(len(word), []).append(char_counts(word))
+
+    def _bucket(self, length: int) -> np.ndarray:
+        # Rows added since the last lookup are stacked on lazily
+        pending = self._pending.pop(length, None)
+        if pending:
+            stacked = np.vstack(pending)
+            current = self._matrix.get(length)
+            self._matrix[length] = stacked if current is None else np.vstack([current, stacked])
+        return self._matrix.get(length, np.zeros((0, _WIDTH), dtype=np.uint8))
+
+    def lookup(self, token: str) -> List[str]:
+        """Vocabulary words the fuzzy rule accepts for token."""
+        if not token:
+            return []
+        query = char_counts(token)
+        n = len(token)
+        found = []
+        with self._lock:
+            for length in range(max(1, n - MAX_LENGTH_DIFF), n + MAX_LENGTH_DIFF + 1):
+                matrix = self._bucket(length)
+                if not len(matrix):
+                    continue
+                shared = np.minimum(matrix, query).sum(axis=1, dtype=np.int32)
+                # quick_ratio upper bound; tiny slack for float rounding
+                keep = np.flatnonzero(2.0 * shared / (n + length) >= self.threshold - 1e-9)
+                words = self._words[length]
+                found.extend(words[i] for i in keep)
+        return [w for w in found if is_fuzzy_match(token, w, self.threshold)]
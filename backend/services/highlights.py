@@ -1,38 +1,171 @@
+"""Upcoming-event highlights detected from saved conversations.
+
+Rows live in SQLite (highlights.sqlite3), indexed on event_timestamp,
+status and person, with a unique key on (person, summary, event_date)
+so re-detecting an event updates it in place. Reads never write:
+expired rows are removed by compact_expired(), which the app runs
+periodically in the background (start_compaction). A legacy
+highlights.json is imported once and renamed to highlights.json.migrated.
+"""
 import json
+import os
+import sqlite3
+import threading
 import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import llm_gateway
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-HIGHLIGHTS_PATH = BASE_DIR / "highlights.json"
+HIGHLIGHTS_PATH = BASE_DIR / "highlights.json"          # legacy store, migrated on first use
+HIGHLIGHTS_DB_PATH = BASE_DIR / "highlights.sqlite3"
 MAX_TRANSCRIPT_LINES = 40
 MAX_RETURNED_HIGHLIGHTS = 50
 VALID_HIGHLIGHT_STATUSES = {"active", "completed", "dismissed"}
 DEFAULT_HIGHLIGHT_STATUS = "active"
+EXPIRY_GRACE_SEC = 86400      # keep highlights for a day after the event
+HIGHLIGHT_COMPACT_INTERVAL_SEC = float(os.getenv("HIGHLIGHT_COMPACT_INTERVAL_SEC", "3600"))
+
+_COLUMNS = (
+    "id", "person_name", "summary", "description", "event_date", "event_timestamp",
+    "source_quote", "category", "confidence", "person_headline", "status",
+    "created_at", "updated_at", "completed_at", "dismissed_at",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS highlights (
+    id              TEXT PRIMARY KEY,
+    person_name     TEXT NOT NULL,
+    person_key      TEXT NOT NULL,
+    summary         TEXT NOT NULL,
+    summary_key     TEXT NOT NULL,
+    description     TEXT NOT NULL DEFAULT '',
+    event_date      TEXT NOT NULL,
+    event_timestamp INTEGER NOT NULL,
+    source_quote    TEXT NOT NULL DEFAULT '',
+    category        TEXT NOT NULL DEFAULT 'other',
+    confidence      REAL,
+    person_headline TEXT NOT NULL DEFAULT '',
+    status          TEXT NOT NULL DEFAULT 'active',
+    created_at      INTEGER,
+    updated_at      INTEGER,
+    completed_at    INTEGER,
+    dismissed_at    INTEGER,
+    UNIQUE (person_key, summary_key, event_date)
+);
+CREATE INDEX IF NOT EXISTS idx_highlights_event_ts ON highlights (event_timestamp);
+CREATE INDEX IF NOT EXISTS idx_highlights_status_ts ON highlights (status, event_timestamp);
+CREATE INDEX IF NOT EXISTS idx_highlights_person_ts ON highlights (person_key, event_timestamp);
+CREATE INDEX IF NOT EXISTS idx_highlights_category_ts ON highlights (category, event_timestamp);
+"""
+
+_init_lock = threading.Lock()
+_initialized = False
+_compactor: Optional[threading.Thread] = None
+
 
+def _key(text: Optional[str]) -> str:
+    return (text or "").strip().lower()
 
-def _ensure_storage_file() -> None:
-    if not HIGHLIGHTS_PATH.exists():
-        HIGHLIGHTS_PATH.write_text("[]\n", encoding="utf-8")
+
+def _raw_connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(HIGHLIGHTS_DB_PATH), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _init_store() -> None:
+    """Create the schema and import highlights.json once (first use, not import)."""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn = _raw_connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            if HIGHLIGHTS_PATH.exists():
+                _migrate_legacy(conn)
+        finally:
+            conn.close()
+        _initialized = True
+
+
+@contextmanager
+def _connect():
+    if not _initialized:
+        _init_store()
+    conn = _raw_connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 
-_ensure_storage_file()
+@contextmanager
+def _write():
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _insert_row(conn, row: Dict[str, Any], on_conflict: str = "IGNORE") -> None:
+    values = {col: row.get(col) for col in _COLUMNS}
+    # NOT NULL columns: OR IGNORE would silently skip the row instead of failing
+    values["description"] = values["description"] or values["summary"]
+    values["source_quote"] = values["source_quote"] or ""
+    values["category"] = values["category"] or "other"
+    values["person_headline"] = values["person_headline"] or ""
+    values["status"] = values["status"] or DEFAULT_HIGHLIGHT_STATUS
+    values["person_key"] = _key(values["person_name"])
+    values["summary_key"] = _key(values["summary"])
+    cols = list(values)
+    conn.execute(
+        f"INSERT OR {on_conflict} INTO highlights ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+        [values[c] for c in cols],
+    )
 
 
-def _load_store() -> List[Dict[str, Any]]:
+def _migrate_legacy(conn) -> None:
+    try:
+        rows = json.loads(HIGHLIGHTS_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        rows = []
+    imported = 0
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        data = json.loads(HIGHLIGHTS_PATH.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            return data
+        for row in rows if isinstance(rows, list) else []:
+            if not isinstance(row, dict) or not isinstance(row.get("event_timestamp"), (int, float)):
+                continue
+            if not row.get("summary") or not row.get("event_date"):
+                continue
+            row = dict(row)
+            row.setdefault("id", f"hl_{uuid.uuid4().hex[:10]}")
+            row.setdefault("person_name", "Unknown")
+            row.setdefault("status", DEFAULT_HIGHLIGHT_STATUS)
+            row["event_timestamp"] = int(row["event_timestamp"])
+            _insert_row(conn, row)
+            imported += 1
+        conn.execute("COMMIT")
     except Exception:
-        pass
-    return []
+        conn.execute("ROLLBACK")
+        raise
+    HIGHLIGHTS_PATH.replace(HIGHLIGHTS_PATH.with_name(HIGHLIGHTS_PATH.name + ".migrated"))
+    print(f"📦 Migrated {imported} highlight(s) from {HIGHLIGHTS_PATH.name}.")
 
 
-def _write_store(rows: Sequence[Dict[str, Any]]) -> None:
-    HIGHLIGHTS_PATH.write_text(json.dumps(list(rows), indent=2), encoding="utf-8")
+def _row_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    # Same shape as the old JSON rows: unset timestamps are simply absent
+    return {col: row[col] for col in _COLUMNS if row[col] is not None}
 
 
 def _parse_event_timestamp(date_str: Optional[str]) -> Optional[int]:
@@ -61,20 +194,46 @@ def _parse_event_timestamp(date_str: Optional[str]) -> Optional[int]:
     return int(dt.timestamp()) if dt else None
 
 
-def _cleanup_stale(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    now_ts = int(time.time())
-    fresh: List[Dict[str, Any]] = []
-    for row in entries:
-        ts = row.get("event_timestamp")
-        if not isinstance(ts, (int, float)):
-            continue
-        # Drop highlights that are more than 1 day past
-        if ts < now_ts - 86400:
-            continue
-        fresh.append(row)
-    if len(fresh) != len(entries):
-        _write_store(fresh)
-    return fresh
+def parse_time_bound(value: Optional[str]) -> Optional[int]:
+    """Unix seconds or an ISO date/datetime (query-string from/to) -> seconds."""
+    if value is None or not str(value).strip():
+        return None
+    text = str(value).strip()
+    if text.lstrip("-").isdigit():
+        return int(text)
+    ts = _parse_event_timestamp(text)
+    if ts is None:
+        raise ValueError(f"Unrecognised time: {value}")
+    return ts
+
+
+def compact_expired(now_ts: Optional[int] = None) -> int:
+    """Delete highlights more than a day past their event; returns rows removed."""
+    cutoff = (now_ts if now_ts is not None else int(time.time())) - EXPIRY_GRACE_SEC
+    with _write() as conn:
+        removed = conn.execute("DELETE FROM highlights WHERE event_timestamp < ?", (cutoff,)).rowcount
+    if removed:
+        print(f"🧹 Compacted {removed} expired highlight(s).")
+    return removed
+
+
+def start_compaction(interval_sec: float = HIGHLIGHT_COMPACT_INTERVAL_SEC) -> threading.Thread:
+    """Run compact_expired() now and then every interval_sec on a daemon thread."""
+    global _compactor
+    if _compactor and _compactor.is_alive():
+        return _compactor
+
+    def loop():
+        while True:
+            try:
+                compact_expired()
+            except Exception as exc:
+                print(f"⚠️ Highlight compaction failed: {exc}")
+            time.sleep(interval_sec)
+
+    _compactor = threading.Thread(target=loop, name="highlight-compaction", daemon=True)
+    _compactor.start()
+    return _compactor
 
 
 def detect_and_store_highlights(
@@ -82,18 +241,16 @@ def detect_and_store_highlights(
     person_name: str,
     conversation: Sequence[Dict[str, Any]],
     conversation_timestamp: int,
-    gemini_client,
     headline: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """Run Gemini highlight extraction and persist any upcoming events."""
-    if not gemini_client or not conversation:
+    if not llm_gateway.is_enabled() or not conversation:
         return []
 
     detected = _detect_highlights_with_gemini(
         person_name=person_name or "Unknown",
         conversation=conversation,
         reference_ts=conversation_timestamp,
-        gemini_client=gemini_client,
     )
     if not detected:
         return []
@@ -111,7 +268,6 @@ def _detect_highlights_with_gemini(
     person_name: str,
     conversation: Sequence[Dict[str, Any]],
     reference_ts: int,
-    gemini_client,
 ) -> List[Dict[str, Any]]:
     turns = [
         f"{(turn.get('speaker') or 'Unknown').strip()}: {(turn.get('text') or '').strip()}"
@@ -156,17 +312,7 @@ Conversation:
 """
 
     try:
-        response = gemini_client.models.generate_content(
-            model="gemini-2.0-flash-lite",
-            contents=prompt,
-        )
-        text = (response.text or "").strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            text = "\n".join(lines[1:-1])
-            if text.startswith("json"):
-                text = text[4:].strip()
-        parsed = json.loads(text)
+        parsed = llm_gateway.generate_json(prompt, call_site="highlights.detect")
     except Exception as exc:
         print(f"⚠️ Highlight parsing failed: {exc}")
         return []
@@ -195,100 +341,124 @@ def _upsert_highlights(
     new_highlights: Sequence[Dict[str, Any]],
 ) -> List[Dict[str, Any]]:
     now_ts = int(time.time())
-    store = _cleanup_stale(_load_store())
-    changed = False
     persisted: List[Dict[str, Any]] = []
 
-    for row in new_highlights:
-        event_ts = _parse_event_timestamp(row.get("event_date"))
-        if not event_ts:
-            continue
-        if event_ts < now_ts:
-            continue
-
-        summary = row.get("title") or row.get("description")
-        if not summary:
-            continue
-        description = row.get("description") or summary
-        source_quote = row.get("source_quote") or ""
-        category = row.get("category") or "other"
-        confidence = row.get("confidence")
-        try:
-            confidence_val = float(confidence) if confidence is not None else 0.6
-        except (TypeError, ValueError):
-            confidence_val = 0.6
-
-        match = next(
-            (
-                item
-                for item in store
-                if item.get("person_name", "").lower() == person_name.lower()
-                and item.get("summary", "").lower() == summary.lower()
-                and item.get("event_date") == row.get("event_date")
-            ),
-            None,
-        )
-
-        payload = {
-            "summary": summary,
-            "description": description,
-            "event_date": row.get("event_date"),
-            "event_timestamp": event_ts,
-            "source_quote": source_quote,
-            "category": category,
-            "confidence": confidence_val,
-            "person_name": person_name,
-            "person_headline": headline or "",
-        }
-
-        if match:
-            existing_status = match.get("status", DEFAULT_HIGHLIGHT_STATUS)
-            match.update(payload)
-            match["status"] = existing_status
-            match["updated_at"] = now_ts
-            changed = True
-            persisted.append(match)
-        else:
-            new_entry = {
-                "id": f"hl_{uuid.uuid4().hex[:10]}",
-                **payload,
-                "created_at": now_ts,
-                "status": DEFAULT_HIGHLIGHT_STATUS,
-            }
-            store.append(new_entry)
-            changed = True
-            persisted.append(new_entry)
-
-    if changed:
-        store.sort(key=lambda row: row.get("event_timestamp", 0))
-        _write_store(store)
+    with _write() as conn:
+        for row in new_highlights:
+            event_ts = _parse_event_timestamp(row.get("event_date"))
+            if not event_ts:
+                continue
+            if event_ts < now_ts:
+                continue
+
+            summary = row.get("title") or row.get("description")
+            if not summary:
+                continue
+            description = row.get("description") or summary
+            source_quote = row.get("source_quote") or ""
+            category = row.get("category") or "other"
+            confidence = row.get("confidence")
+            try:
+                confidence_val = float(confidence) if confidence is not None else 0.6
+            except (TypeError, ValueError):
+                confidence_val = 0.6
+
+            # Unique (person, summary, event_date): re-detection updates in place, keeps status
+            conn.execute(
+                "INSERT INTO highlights (id, person_name, person_key, summary, summary_key, description, "
+                "event_date, event_timestamp, source_quote, category, confidence, person_headline, "
+                "status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (person_key, summary_key, event_date) DO UPDATE SET "
+                "person_name = excluded.person_name, summary = excluded.summary, "
+                "description = excluded.description, event_timestamp = excluded.event_timestamp, "
+                "source_quote = excluded.source_quote, category = excluded.category, "
+                "confidence = excluded.confidence, person_headline = excluded.person_headline, "
+                "updated_at = ?",
+                (
+                    f"hl_{uuid.uuid4().hex[:10]}", person_name, _key(person_name), summary, _key(summary),
+                    description, row.get("event_date"), event_ts, source_quote, category, confidence_val,
+                    headline or "", DEFAULT_HIGHLIGHT_STATUS, now_ts, now_ts,
+                ),
+            )
+            stored = conn.execute(
+                "SELECT * FROM highlights WHERE person_key = ? AND summary_key = ? AND event_date = ?",
+                (_key(person_name), _key(summary), row.get("event_date")),
+            ).fetchone()
+            persisted.append(_row_dict(stored))
     return persisted
 
 
-def get_upcoming_highlights(limit: int = MAX_RETURNED_HIGHLIGHTS) -> List[Dict[str, Any]]:
+def _with_countdown(row: sqlite3.Row, now_ts: int) -> Dict[str, Any]:
+    remaining_sec = max(0, row["event_timestamp"] - now_ts)
+    enriched = _row_dict(row)
+    enriched["days_until"] = int(remaining_sec // 86400)
+    enriched["hours_until"] = int((remaining_sec % 86400) // 3600)
+    return enriched
+
+
+def _parse_cursor(cursor: str) -> Tuple[int, str]:
+    """Split a "<event_ts>:<id>" cursor; ValueError for anything else."""
+    cursor_ts, sep, cursor_id = cursor.partition(":")
+    if not sep or not cursor_id or not (cursor_ts.isascii() and cursor_ts.isdigit()):
+        raise ValueError("Invalid cursor.")
+    return int(cursor_ts), cursor_id
+
+
+def query_highlights(
+    *,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    person: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = DEFAULT_HIGHLIGHT_STATUS,
+    limit: int = MAX_RETURNED_HIGHLIGHTS,
+    cursor: Optional[str] = None,
+):
+    """Highlights with start_ts <= event < end_ts, soonest first.
+
+    One indexed range scan (event_timestamp, optionally narrowed by
+    status / person / category) that stops after limit rows, so a page
+    costs O(log n + k). status=None means any status. cursor is the
+    opaque next_cursor of the previous page ("<event_ts>:<id>").
+    Returns (rows, next_cursor); countdowns are computed for these rows only.
+    """
     now_ts = int(time.time())
-    entries = _cleanup_stale(_load_store())
-    upcoming: List[Dict[str, Any]] = []
-    for row in entries:
-        event_ts = row.get("event_timestamp")
-        if not isinstance(event_ts, (int, float)):
-            continue
-        if event_ts < now_ts:
-            continue
-        if row.get("status", DEFAULT_HIGHLIGHT_STATUS) != DEFAULT_HIGHLIGHT_STATUS:
-            continue
-        remaining_sec = max(0, event_ts - now_ts)
-        days = remaining_sec // 86400
-        hours = (remaining_sec % 86400) // 3600
-        enriched = dict(row)
-        enriched["days_until"] = int(days)
-        enriched["hours_until"] = int(hours)
-        upcoming.append(enriched)
+    if start_ts is None:
+        start_ts = now_ts
+    clauses, params = ["event_timestamp >= ?"], [start_ts]
+    if end_ts is not None:
+        clauses.append("event_timestamp < ?")
+        params.append(end_ts)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if person:
+        clauses.append("person_key = ?")
+        params.append(_key(person))
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    if cursor:
+        clauses.append("(event_timestamp, id) > (?, ?)")
+        params.extend(_parse_cursor(cursor))
+    sql = f"SELECT * FROM highlights WHERE {' AND '.join(clauses)} ORDER BY event_timestamp, id"
+    if limit:
+        # One extra row tells us whether there is a next page
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    with _connect() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1]['event_timestamp']}:{rows[-1]['id']}"
+    return [_with_countdown(row, now_ts) for row in rows], next_cursor
+
 
-    upcoming.sort(key=lambda r: r.get("event_timestamp", 0))
-    if limit and len(upcoming) > limit:
-        upcoming = upcoming[:limit]
-    return upcoming
+def get_upcoming_highlights(limit: int = MAX_RETURNED_HIGHLIGHTS) -> List[Dict[str, Any]]:
+    rows, _ = query_highlights(limit=limit)
+    return rows
 
 
 def set_highlight_status(highlight_id: str, raw_status: str):
@@ -296,22 +466,35 @@ def set_highlight_status(highlight_id: str, raw_status: str):
     if status not in VALID_HIGHLIGHT_STATUSES:
         return None, "invalid_status"
 
-    store = _load_store()
-    target = next((item for item in store if item.get("id") == highlight_id), None)
-    if not target:
-        return None, "not_found"
-
     now_ts = int(time.time())
-    target["status"] = status
-    if status == "completed":
-        target["completed_at"] = now_ts
-        target.pop("dismissed_at", None)
-    elif status == "dismissed":
-        target["dismissed_at"] = now_ts
-        target.pop("completed_at", None)
-    else:  # active
-        target.pop("completed_at", None)
-        target.pop("dismissed_at", None)
-    target["updated_at"] = now_ts
-    _write_store(store)
-    return target, "updated"
+    completed_at = now_ts if status == "completed" else None
+    dismissed_at = now_ts if status == "dismissed" else None
+    with _write() as conn:
+        updated = conn.execute(
+            "UPDATE highlights SET status = ?, completed_at = ?, dismissed_at = ?, updated_at = ? WHERE id = ?",
+            (status, completed_at, dismissed_at, now_ts, highlight_id),
+        ).rowcount
+        if not updated:
+            return None, "not_found"
+        target = conn.execute("SELECT * FROM highlights WHERE id = ?", (highlight_id,)).fetchone()
+    return _row_dict(target), "updated"
+
+
+def rename_person(old_name: str, new_name: str) -> int:
+    """Move highlights to a renamed person; returns rows moved.
+
+    A highlight the new name already has (same summary and date) wins
+    over the old name's copy.
+    """
+    if _key(old_name) == _key(new_name):
+        with _write() as conn:
+            return conn.execute(
+                "UPDATE highlights SET person_name = ? WHERE person_key = ?", (new_name, _key(old_name))
+            ).rowcount
+    with _write() as conn:
+        moved = conn.execute(
+            "UPDATE OR IGNORE highlights SET person_name = ?, person_key = ? WHERE person_key = ?",
+            (new_name, _key(new_name), _key(old_name)),
+        ).rowcount
+        conn.execute("DELETE FROM highlights WHERE person_key = ?", (_key(old_name),))
+    return moved
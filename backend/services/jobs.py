@@ -0,0 +1,272 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+JOBS_DB_PATH = BASE_DIR / "jobs.sqlite3"
+MAX_JOB_WORKERS = max(1, int(os.getenv("MAX_JOB_WORKERS", "2")))
+MAX_JOB_ATTEMPTS = 2
+IDLE_POLL_SEC = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    stage       TEXT NOT NULL DEFAULT 'queued',
+    progress    REAL NOT NULL DEFAULT 0,
+    video_path  TEXT NOT NULL,
+    payload     TEXT,
+    result      TEXT,
+    error       TEXT,
+    owner_pid   INTEGER,
+    owner_token TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+# handler(job, report) -> result dict; report(stage, progress) updates the row
+JobHandler = Callable[[Dict[str, Any], Callable[[str, float], None]], Dict[str, Any]]
+
+
+def _read_proc(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+_BOOT_ID = (_read_proc("/proc/sys/kernel/random/boot_id") or "").strip()
+_fallback_tokens: Dict[int, str] = {}
+
+
+def _process_token(pid: int) -> Optional[str]:
+    """Identity of the process running as pid: boot id + start time.
+
+    A pid can be handed out again (after a container restart it usually
+    is), the start time can't. None where /proc isn't available.
+    """
+    stat = _read_proc(f"/proc/{pid}/stat")
+    if stat is None:
+        return None
+    # starttime is field 22; count from after "(comm)", which may hold spaces
+    start_time = stat.rsplit(")", 1)[-1].split()[19]
+    return f"{_BOOT_ID}:{pid}:{start_time}"
+
+
+def _own_token() -> str:
+    pid = os.getpid()
+    token = _process_token(pid)
+    if token is None:
+        # No /proc: a random token per process (re-made after fork)
+        token = _fallback_tokens.setdefault(pid, uuid.uuid4().hex)
+    return token
+
+
+def _owner_alive(pid: Optional[int], token: Optional[str]) -> bool:
+    """Is the process that claimed a job (pid + token) still running?"""
+    if not pid:
+        return False
+    if pid == os.getpid():
+        # Recovery runs before this process claims anything
+        return token == _own_token()
+    if not _pid_alive(pid):
+        return False
+    current = _process_token(pid)
+    # Can't tell (no /proc, or a row from before tokens): trust the pid
+    return current is None or token is None or current == token
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    for key in ("payload", "result"):
+        if job.get(key):
+            try:
+                job[key] = json.loads(job[key])
+            except ValueError:
+                pass
+    return job
+
+
+class JobQueue:
+    """SQLite-backed job queue drained by a bounded pool of worker threads.
+
+    Jobs survive restarts: anything still queued is picked up again, and
+    jobs left running by a process that no longer exists are re-queued.
+    Owners are recorded as pid + owner_token (boot id and process start
+    time), so a new process that happens to get the old pid doesn't keep
+    the job "running" forever.
+    """
+
+    def __init__(self, handler: JobHandler, db_path: Path = JOBS_DB_PATH, max_workers: int = MAX_JOB_WORKERS):
+        self.handler = handler
+        self.db_path = Path(db_path)
+        self.max_workers = max_workers
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner_token" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner_token TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # === Public API ===
+    def start(self) -> None:
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        requeued = self._recover()
+        if requeued:
+            print(f"♻️ Re-queued {requeued} interrupted job(s).")
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, video_path: str, payload: Optional[Dict[str, Any]] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, stage, progress, video_path, payload, created_at, updated_at) "
+                "VALUES (?, 'queued', 'queued', 0, ?, ?, ?, ?)",
+                (job_id, str(video_path), json.dumps(payload or {}), now, now),
+            )
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def report(self, job_id: str, stage: str, progress: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ?",
+                (stage, round(max(0.0, min(1.0, progress)), 3), time.time(), job_id),
+            )
+
+    # === Internals ===
+    def _recover(self) -> int:
+        """Re-queue jobs whose owning process died mid-run (even if its pid was reused)."""
+        requeued = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, owner_pid, owner_token, attempts FROM jobs WHERE status = 'running'"
+            ).fetchall()
+            now = time.time()
+            for row in rows:
+                if _owner_alive(row["owner_pid"], row["owner_token"]):
+                    continue
+                if row["attempts"] >= MAX_JOB_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                        ("Interrupted too many times.", now, now, row["id"]),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', stage = 'queued', progress = 0, owner_pid = NULL, owner_token = NULL, updated_at = ? WHERE id = ?",
+                    (now, row["id"]),
+                )
+                requeued += 1
+            conn.execute("COMMIT")
+        return requeued
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = 'starting', owner_pid = ?, owner_token = ?, "
+                "attempts = attempts + 1, started_at = ?, updated_at = ? WHERE id = ?",
+                (os.getpid(), _own_token(), now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        return _row_to_job(row)
+
+    def _finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        status = "failed" if error else "done"
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = ?, result = ?, error = ?, "
+                "finished_at = ?, updated_at = ? WHERE id = ?",
+                (
+                    status,
+                    status,
+                    1.0 if status == "done" else 0.0,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    now,
+                    now,
+                    job_id,
+                ),
+            )
+
+    def _worker_loop(self) -> None:
+        while True:
+            try:
+                job = self._claim_next()
+            except sqlite3.Error as exc:
+                print(f"⚠️ Job queue unavailable: {exc}")
+                job = None
+            if not job:
+                self._wakeup.wait(IDLE_POLL_SEC)
+                self._wakeup.clear()
+                continue
+
+            job_id = job["id"]
+            print(f"🧵 Job {job_id} started ({job['video_path']})")
+            try:
+                result = self.handler(job, lambda stage, progress: self.report(job_id, stage, progress))
+                self._finish(job_id, result=result)
+                print(f"✅ Job {job_id} finished.")
+            except Exception as exc:
+                traceback.print_exc()
+                self._finish(job_id, error=str(exc))
+                print(f"❌ Job {job_id} failed: {exc}")
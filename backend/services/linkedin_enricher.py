@@ -1,16 +1,31 @@
-import json
+import os
 import re
-from typing import Any, Dict, List, Optional, Sequence
-from urllib.parse import urlparse, urlunparse, unquote
+import threading
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
 import time
 
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.common.by import By
+from requests.adapters import HTTPAdapter
 
-SEARCH_URL = "https://duckduckgo.com/"
+from . import llm_gateway
+from .browser_pool import BROWSER_PAGE_TIMEOUT_SEC, get_browser_pool
+
+# Point both at services/search_fixture_server.py for offline runs
+SEARCH_URL = os.getenv("LINKEDIN_SEARCH_URL", "https://duckduckgo.com/")
+HTTP_SEARCH_URL = os.getenv("LINKEDIN_HTTP_SEARCH_URL", "https://html.duckduckgo.com/html/")
+# http: plain HTTP fetch, browser only as fallback | browser: always Selenium
+SEARCH_BACKEND = os.getenv("LINKEDIN_SEARCH_BACKEND", "http")
+SEARCH_CACHE_TTL_SEC = float(os.getenv("LINKEDIN_SEARCH_CACHE_TTL_SEC", str(24 * 3600)))
+SEARCH_CACHE_EMPTY_TTL_SEC = 600          # "no profiles" answers expire sooner
+SEARCH_CACHE_MAX_ENTRIES = 1000
+HTTP_POOL_SIZE = 4
+# Any of these on the page means the search has finished rendering
+RESULTS_READY_CSS = (
+    "article[data-testid='result'], a[data-testid='result-title-a'], a.result__a, "
+    "[data-testid='no-results'], .no-results"
+)
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -19,7 +34,6 @@ DEFAULT_HEADERS = {
     ),
     "Accept-Language": "en-US,en;q=0.9",
 }
-MAX_LINKEDIN_HTML_CHARS = 100000
 HTTP_TIMEOUT = 15
 
 # ======================================================
@@ -29,7 +43,6 @@ def enrich_linkedin_profile(
     person_name: Optional[str],
     keywords: Optional[Sequence[str]],
     conversation: Optional[Sequence[Any]],
-    gemini_client,
 ) -> Dict[str, str]:
     """
     Use DuckDuckGo search to find LinkedIn profile URLs.
@@ -43,18 +56,15 @@ def enrich_linkedin_profile(
     print(f"📝 Original keywords: {keywords}")
     
     # Filter keywords using Gemini to keep only relevant ones
-    filtered_keywords = _filter_keywords_with_gemini(person_name, keywords or [], gemini_client)
+    filtered_keywords = _filter_keywords_with_gemini(person_name, keywords or [])
     
     query = _build_search_query(person_name, filtered_keywords, conversation or [])
     print(f"🔎 Final search query: {query}")
 
-    # Fetch search results using DuckDuckGo
-    search_html = _fetch_duckduckgo_html(query)
-    if not search_html:
+    # Search (cached by normalised query) and extract LinkedIn profile URLs
+    profile_urls = _search_profiles(query)
+    if profile_urls is None:
         return {}
-
-    # Extract LinkedIn profile URLs
-    profile_urls = _extract_linkedin_profiles(search_html)
     
     print(f"\n🔹 Found {len(profile_urls)} LinkedIn profile(s)")
     for idx, url in enumerate(profile_urls, 1):
@@ -77,13 +87,12 @@ def enrich_linkedin_profile(
 def _filter_keywords_with_gemini(
     person_name: str,
     keywords: Sequence[str],
-    gemini_client,
 ) -> List[str]:
     """
     Use Gemini to filter keywords, keeping only relevant ones for LinkedIn search.
     Removes generic terms like programming languages, keeps companies, locations, schools.
     """
-    if not gemini_client or not keywords:
+    if not llm_gateway.is_enabled() or not keywords:
         return list(keywords)
     
     # Remove person's name from keywords if it exists (case-insensitive)
@@ -126,20 +135,7 @@ Example output: ["Datadog", "intern", "New York City", "RPI"]
 """
     
     try:
-        response = gemini_client.models.generate_content(
-            model="gemini-2.0-flash-lite",
-            contents=prompt,
-        )
-        text = (response.text or "").strip()
-        
-        # Remove markdown code blocks
-        if text.startswith("```"):
-            lines = text.split("\n")
-            text = "\n".join(lines[1:-1])
-            if text.startswith("json"):
-                text = text[4:].strip()
-        
-        filtered = json.loads(text)
+        filtered = llm_gateway.generate_json(prompt, call_site="linkedin.filter_keywords")
         print(f"🧠 Gemini filtered keywords: {keywords} → {filtered}")
         return filtered if isinstance(filtered, list) else list(keywords)
     except Exception as e:
@@ -179,88 +175,232 @@ def _build_search_query(
     return " ".join(tokens)
 
 
+# ======================================================
+# PARSED-RESULT CACHE
+# ======================================================
+class _TTLCache:
+    """Small thread-safe {key: (expires_at, value)} map, oldest evicted first."""
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self._data[key]
+                return None
+            return item[1]
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.time() + ttl, value)
+            while len(self._data) > self.max_entries:
+                del self._data[next(iter(self._data))]
+
+
+_profile_cache = _TTLCache()
+
+
+def _cache_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
 # ======================================================
 # HTML FETCH
 # ======================================================
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def _session() -> requests.Session:
+    """Shared keep-alive session (connection pool reused across lookups)."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
 def _fetch_html(url: str, params: Optional[Dict[str, str]] = None) -> Optional[str]:
     try:
-        response = requests.get(
+        response = _session().get(
             url,
             params=params,
-            headers=DEFAULT_HEADERS,
             timeout=HTTP_TIMEOUT,
         )
         response.raise_for_status()
+        if response.status_code != 200:
+            # DuckDuckGo answers 202 with a challenge page when rate limiting
+            print(f"⚠️ HTTP fetch for {url} returned {response.status_code}")
+            return None
         return response.text
     except Exception as exc:
         print(f"⚠️ HTTP fetch failed for {url}: {exc}")
         return None
 
 
+def _fetch_http_results(query: str) -> Optional[str]:
+    """Fetch the no-JavaScript DuckDuckGo results page over plain HTTP."""
+    t0 = time.perf_counter()
+    html = _fetch_html(HTTP_SEARCH_URL, params={"q": query})
+    if html is not None:
+        print(f"📄 Got HTML over HTTP ({len(html)} chars) in {time.perf_counter() - t0:.2f}s")
+    return html
+
+
 def _fetch_duckduckgo_html(query: str) -> Optional[str]:
-    """Fetch search results using DuckDuckGo with Firefox (no robot checks)."""
-    options = FirefoxOptions()
-    options.add_argument("--headless")
-    
-    driver = None
+    """Fetch search results with a pooled headless Firefox session."""
     try:
-        driver = webdriver.Firefox(options=options)
-        print(f"🌐 Loading DuckDuckGo...")
-        driver.get(SEARCH_URL)
-        
-        print(f"🔍 Searching for: {query}")
-        search_box = driver.find_element(By.NAME, "q")
-        search_box.send_keys(query)
-        search_box.submit()
-        
-        print("⏳ Waiting for results...")
-        time.sleep(5)
-        
-        html = driver.page_source
-        print(f"📄 Got HTML ({len(html)} chars)")
-        return html
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+    except ImportError as exc:
+        print(f"⚠️ Browser search unavailable: {exc}")
+        return None
+
+    try:
+        with get_browser_pool().session() as driver:
+            print(f"🌐 Loading DuckDuckGo...")
+            driver.get(SEARCH_URL)
+
+            print(f"🔍 Searching for: {query}")
+            search_box = driver.find_element(By.NAME, "q")
+            search_box.send_keys(query)
+            search_box.submit()
+
+            print("⏳ Waiting for results...")
+            t0 = time.perf_counter()
+            try:
+                WebDriverWait(driver, BROWSER_PAGE_TIMEOUT_SEC).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_READY_CSS))
+                )
+            except TimeoutException:
+                print(f"⚠️ Results not ready after {BROWSER_PAGE_TIMEOUT_SEC:g}s — using the page as-is.")
+
+            html = driver.page_source
+            print(f"📄 Got HTML ({len(html)} chars) in {time.perf_counter() - t0:.2f}s")
+            return html
     except Exception as exc:
         print(f"⚠️ DuckDuckGo search failed: {exc}")
         return None
-    finally:
-        if driver:
-            driver.quit()
 
 
-def _extract_linkedin_profiles(html: str) -> List[str]:
-    """Extract unique LinkedIn profile URLs (/in/) from HTML, excluding posts."""
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    all_links = []
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag['href']
-        all_links.append(href)
-    
-    # Filter LinkedIn links
-    linkedin_links = []
-    for link in all_links:
-        if 'linkedin.com' in link.lower():
-            # Clean up redirect URLs
-            if '/url?q=' in link:
-                match = re.search(r'/url\?q=([^&]+)', link)
-                if match:
-                    link = unquote(match.group(1))
-            linkedin_links.append(link)
-    
-    # Filter to only profile links (/in/) and remove posts
-    profile_links = []
-    for link in linkedin_links:
-        if '/in/' in link and '/posts/' not in link:
-            profile_links.append(link)
-    
-    # Remove duplicates while preserving order
+# name → fn(query) -> results HTML or None (LINKEDIN_SEARCH_BACKEND)
+SEARCH_BACKENDS: Dict[str, Callable[[str], Optional[str]]] = {
+    "http": _fetch_http_results,
+    "browser": _fetch_duckduckgo_html,
+}
+
+
+def _search_profiles(query: str) -> Optional[List[str]]:
+    """Profile URLs for a query: cache, then the configured backend, then the browser.
+
+    Returns None only when every backend failed to produce a results page.
+    """
+    key = _cache_key(query)
+    cached = _profile_cache.get(key)
+    if cached is not None:
+        print(f"⚡ Search cache hit for: {key}")
+        return list(cached)
+
+    if SEARCH_BACKEND not in SEARCH_BACKENDS:
+        print(f"⚠️ Unknown search backend '{SEARCH_BACKEND}', using the browser.")
+    order = [SEARCH_BACKEND] if SEARCH_BACKEND in SEARCH_BACKENDS else []
+    if "browser" not in order:
+        order.append("browser")
+
+    for idx, name in enumerate(order):
+        html = SEARCH_BACKENDS[name](query)
+        if html is None:
+            continue
+        extracted = _LinkExtractor.parse(html)
+        profiles = _profiles_from_links(extracted.links)
+        last = idx == len(order) - 1
+        if profiles or extracted.results_page or last:
+            if profiles or extracted.results_page:
+                ttl = SEARCH_CACHE_TTL_SEC if profiles else SEARCH_CACHE_EMPTY_TTL_SEC
+                _profile_cache.put(key, profiles, ttl)
+            return profiles
+        # Blocked / challenge page rather than an empty result list
+        print(f"⚠️ {name} search returned no results page — falling back.")
+    return None
+
+
+class _LinkExtractor(HTMLParser):
+    """Streaming pass over a results page: every <a href>, plus whether
+    the page is a real results page (results or an explicit no-results
+    marker) rather than a bot check."""
+
+    _RESULT_MARKERS = ("result__a", "result-title-a", "no-results", "no_results")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[str] = []
+        self.results_page = False
+
+    def handle_starttag(self, tag, attrs):
+        if not self.results_page:
+            for key, value in attrs:
+                if key in ("class", "data-testid") and value and any(m in value for m in self._RESULT_MARKERS):
+                    self.results_page = True
+                    break
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+    @classmethod
+    def parse(cls, html: str) -> "_LinkExtractor":
+        parser = cls()
+        parser.feed(html)
+        parser.close()
+        return parser
+
+
+def _unwrap_redirect(link: str) -> str:
+    """Resolve search-engine redirect links (/url?q=..., DuckDuckGo /l/?uddg=...)."""
+    parsed = urlparse(link)
+    if parsed.path.endswith("/url") or parsed.path.startswith("/l/"):
+        params = parse_qs(parsed.query)
+        target = (params.get("uddg") or params.get("q") or [None])[0]
+        if target:
+            return target
+    if "/url?q=" in link:
+        match = re.search(r'/url\?q=([^&]+)', link)
+        if match:
+            return unquote(match.group(1))
+    return link
+
+
+def _profiles_from_links(links: Sequence[str]) -> List[str]:
+    """Unique LinkedIn profile URLs (/in/) in page order, excluding posts."""
     seen = set()
     unique_profiles = []
-    for link in profile_links:
+    for link in links:
+        link = _unwrap_redirect(link)
+        lowered = link.lower()
+        if 'linkedin.com' not in lowered or '/in/' not in link or '/posts/' in link:
+            continue
         # Normalize by removing query params and fragments
         base_url = link.split('?')[0].split('#')[0]
         if base_url not in seen:
             seen.add(base_url)
             unique_profiles.append(base_url)
-    
-    return unique_profiles
\ No newline at end of file
+    return unique_profiles
+
+
+def _extract_linkedin_profiles(html: str) -> List[str]:
+    """Extract unique LinkedIn profile URLs (/in/) from HTML, excluding posts."""
+    return _profiles_from_links(_LinkExtractor.parse(html).links)
@@ -0,0 +1,340 @@
+"""Live conversation sessions: short segments in, server-sent events out.
+
+    session = live.create()
+    live.add_segment(session["id"], request.stream, filename="seg.mp4")
+    live.close(session["id"])
+    Response(live.sse(session["id"]), mimetype="text/event-stream")
+
+Segments are numbered on arrival and written under sessions/<id>/. They
+are handled strictly in order by a drain that any server process may
+run: a directory flock makes one drain per session run at a time, and
+it picks up from state["segments_done"]. For each segment the drain calls
+handler(session_id, index, path, state, publish), which updates the
+session's JSON state and publishes events. After close() and the last
+segment, closer(session_id, state, publish) returns the final result.
+Sessions and their event log live in SQLite (sessions.sqlite3), so an
+event stream served by one process sees events published by another.
+sweep() drops closed and failed sessions (rows, events and files) once
+they are LIVE_SESSION_RETENTION_SEC old.
+"""
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SESSIONS_DIR = BASE_DIR / "uploads" / "sessions"
+SESSIONS_DB_PATH = BASE_DIR / "sessions.sqlite3"
+LIVE_MAX_WORKERS = int(os.getenv("LIVE_MAX_WORKERS", "4"))
+LIVE_SEGMENT_MAX_BYTES = int(os.getenv("LIVE_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+LIVE_EVENT_POLL_SEC = 0.2
+LIVE_HEARTBEAT_SEC = 15.0
+LIVE_IDLE_TIMEOUT_SEC = float(os.getenv("LIVE_IDLE_TIMEOUT_SEC", "1800"))
+LIVE_SESSION_RETENTION_SEC = float(os.getenv("LIVE_SESSION_RETENTION_SEC", str(24 * 3600)))
+SEGMENT_BLOCK_BYTES = 256 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,      -- open | closing | closed | failed
+    segments    INTEGER NOT NULL DEFAULT 0,
+    state       TEXT NOT NULL,
+    result      TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id  TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    type        TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+"""
+
+# publish(type, data) — append an event to the session's stream
+Publish = Callable[[str, Dict[str, Any]], None]
+SegmentHandler = Callable[[str, int, Path, Dict[str, Any], Publish], Dict[str, Any]]
+SessionCloser = Callable[[str, Dict[str, Any], Publish], Dict[str, Any]]
+
+
+class SessionClosed(ValueError):
+    pass
+
+
+class SegmentTooLarge(ValueError):
+    """The segment was over LIVE_SEGMENT_MAX_BYTES; its index is skipped."""
+
+    def __init__(self, index: int):
+        super().__init__(f"Segment {index} exceeds {LIVE_SEGMENT_MAX_BYTES} bytes and was dropped.")
+        self.index = index
+
+
+def _row_to_session(row: sqlite3.Row) -> Dict[str, Any]:
+    session = dict(row)
+    session["state"] = json.loads(session["state"])
+    session["result"] = json.loads(session["result"]) if session["result"] else None
+    return session
+
+
+class LiveSessions:
+    def __init__(
+        self,
+        handler: SegmentHandler,
+        closer: SessionCloser,
+        root: Path = SESSIONS_DIR,
+        db_path: Path = SESSIONS_DB_PATH,
+        max_workers: int = LIVE_MAX_WORKERS,
+    ):
+        self.handler = handler
+        self.closer = closer
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.max_workers = max_workers
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _dir(self, session_id: str) -> Path:
+        return self.root / session_id
+
+    def _segment_path(self, session_id: str, index: int) -> Optional[Path]:
+        matches = sorted(self._dir(session_id).glob(f"segment-{index:05d}.*"))
+        return matches[0] if matches else None
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        fd = os.open(self._dir(session_id), os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _submit(self, fn, *args) -> None:
+        # Created on first use, so a forking server never inherits its threads
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="live-session")
+        self._executor.submit(fn, *args)
+
+    # === Public API ===
+    def create(self) -> Dict[str, Any]:
+        session_id = uuid.uuid4().hex
+        self._dir(session_id).mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        state = {"segments_done": 0, "started_at": now}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, status, segments, state, created_at, updated_at) VALUES (?, 'open', 0, ?, ?, ?)",
+                (session_id, json.dumps(state), now, now),
+            )
+        self.publish(session_id, "open", {"session_id": session_id})
+        return self.get(session_id)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return _row_to_session(row) if row else None
+
+    def add_segment(self, session_id: str, stream: BinaryIO, filename: str = "") -> int:
+        """Store the next segment and schedule the drain; returns its index."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT status, segments FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                raise KeyError(session_id)
+            if row["status"] != "open":
+                conn.execute("ROLLBACK")
+                raise SessionClosed(f"Session is {row['status']}.")
+            index = row["segments"]
+            conn.execute(
+                "UPDATE sessions SET segments = ?, updated_at = ? WHERE id = ?",
+                (index + 1, time.time(), session_id),
+            )
+            conn.execute("COMMIT")
+
+        ext = Path(filename or "").suffix.lower()
+        ext = ext if ext[1:].isalnum() and len(ext) <= 8 else ".mp4"
+        target = self._dir(session_id) / f"segment-{index:05d}{ext}"
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        written = 0
+        with open(tmp, "wb") as f:
+            while True:
+                block = stream.read(SEGMENT_BLOCK_BYTES)
+                if not block:
+                    break
+                written += len(block)
+                if written > LIVE_SEGMENT_MAX_BYTES:
+                    break
+                f.write(block)
+        too_large = written > LIVE_SEGMENT_MAX_BYTES
+        if too_large:
+            # The index is already taken: an empty segment tells the drain to skip it
+            open(tmp, "wb").close()
+            print(f"⚠️ Session {session_id}: segment {index} exceeds {LIVE_SEGMENT_MAX_BYTES} bytes — dropped.")
+        # The drain only ever sees whole segments
+        os.replace(tmp, target)
+        self._submit(self._drain, session_id)
+        if too_large:
+            raise SegmentTooLarge(index)
+        return index
+
+    def close(self, session_id: str) -> Dict[str, Any]:
+        """Stop taking segments; the final result follows once the backlog is done."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE sessions SET status = 'closing', updated_at = ? WHERE id = ? AND status = 'open'",
+                (time.time(), session_id),
+            )
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        if cur.rowcount:
+            self._submit(self._drain, session_id)
+        return session
+
+    def recover(self) -> int:
+        """Resume sessions a restart interrupted between close and final result."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM sessions WHERE status = 'closing'").fetchall()
+        for row in rows:
+            self._submit(self._drain, row["id"])
+        return len(rows)
+
+    def sweep(self, max_age_sec: float = LIVE_SESSION_RETENTION_SEC) -> int:
+        """Delete closed and failed sessions last touched over max_age_sec ago."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM sessions WHERE status IN ('closed', 'failed') AND updated_at < ?",
+                (time.time() - max_age_sec,),
+            ).fetchall()
+        for row in rows:
+            session_id = row["id"]
+            if self._dir(session_id).is_dir():
+                with self._locked(session_id):
+                    shutil.rmtree(self._dir(session_id), ignore_errors=True)
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                conn.execute("COMMIT")
+        if rows:
+            print(f"🧹 Live sessions: removed {len(rows)} finished session(s).")
+        return len(rows)
+
+    # === Events ===
+    def publish(self, session_id: str, event_type: str, data: Dict[str, Any]) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO events (session_id, seq, type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, seq, event_type, json.dumps(data), time.time()),
+            )
+            conn.execute("COMMIT")
+        return seq
+
+    def events(self, session_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, type, data FROM events WHERE session_id = ? AND seq > ? ORDER BY seq",
+                (session_id, after),
+            ).fetchall()
+        return [{"seq": r["seq"], "type": r["type"], "data": json.loads(r["data"])} for r in rows]
+
+    def sse(self, session_id: str, after: int = 0) -> Iterator[str]:
+        """text/event-stream frames from event `after` on, until the session ends.
+
+        Each frame carries its seq as the SSE id, so a reconnecting
+        EventSource resumes via Last-Event-ID without gaps or repeats.
+        """
+        last_sent = time.monotonic()
+        last_event = time.monotonic()
+        yield "retry: 2000\n\n"
+        while True:
+            for event in self.events(session_id, after):
+                after = event["seq"]
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+                last_sent = last_event = time.monotonic()
+                if event["type"] in ("closed", "failed"):
+                    return
+            now = time.monotonic()
+            if now - last_event > LIVE_IDLE_TIMEOUT_SEC:
+                return
+            if now - last_sent >= LIVE_HEARTBEAT_SEC:
+                yield ": keep-alive\n\n"
+                last_sent = now
+            time.sleep(LIVE_EVENT_POLL_SEC)
+
+    # === Processing ===
+    def _save_state(self, session_id: str, state: Dict[str, Any], **fields) -> None:
+        fields.update(state=json.dumps(state), updated_at=time.time())
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE sessions SET {cols} WHERE id = ?", (*fields.values(), session_id))
+
+    def _drain(self, session_id: str) -> None:
+        publish = lambda event_type, data: self.publish(session_id, event_type, data)
+        if not self._dir(session_id).is_dir():
+            return  # swept after it ended
+        try:
+            with self._locked(session_id):
+                session = self.get(session_id)
+                if session is None or session["status"] in ("closed", "failed"):
+                    return
+                state = session["state"]
+                while True:
+                    index = state["segments_done"]
+                    path = self._segment_path(session_id, index)
+                    if path is None or path.suffix == ".tmp":
+                        break
+                    if path.stat().st_size == 0:
+                        # Dropped on arrival (too large); the numbering carries on
+                        state["segments_done"] = index + 1
+                        self._save_state(session_id, state)
+                        publish("segment", {"index": index, "dropped": True})
+                        continue
+                    t0 = time.perf_counter()
+                    state = self.handler(session_id, index, path, state, publish)
+                    state["segments_done"] = index + 1
+                    self._save_state(session_id, state)
+                    publish("segment", {"index": index, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)})
+
+                session = self.get(session_id)
+                if session["status"] == "closing" and state["segments_done"] >= session["segments"]:
+                    result = self.closer(session_id, state, publish)
+                    self._save_state(session_id, state, status="closed", result=json.dumps(result))
+                    publish("final", result)
+                    publish("closed", {"session_id": session_id})
+        except Exception as exc:
+            print(f"❌ Live session {session_id} failed: {exc}")
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE sessions SET status = 'failed', updated_at = ? WHERE id = ?", (time.time(), session_id)
+                )
+            publish("failed", {"error": str(exc)})
@@ -0,0 +1,270 @@
+"""Single entry point for LLM calls.
+
+Every call goes through one shared client with a per-call deadline, a
+bounded number of in-flight requests, retries with exponential backoff,
+JSON parsing (code fences stripped) and a latency histogram per call site.
+
+LLM_BACKEND=fake swaps Gemini for a deterministic local backend so the
+whole pipeline can be run and benchmarked offline.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")     # gemini | fake
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash-lite")
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_SEC = 0.5
+LLM_FAKE_LATENCY_SEC = float(os.getenv("LLM_FAKE_LATENCY_SEC", "0"))
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LLMError(Exception):
+    """Raised when a call fails after all retries (or the backend is off)."""
+
+
+# ======================================================
+# RESPONSE PARSING
+# ======================================================
+def parse_json_response(text: str) -> Any:
+    """Parse model output as JSON, tolerating ```json fences."""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        text = "\n".join(lines[1:-1]) if len(lines) > 1 else text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+        text = text.strip()
+    return json.loads(text)
+
+
+# ======================================================
+# BACKENDS
+# ======================================================
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from google import genai
+                from google.genai import types
+                self._client = genai.Client(
+                    api_key=self.api_key,
+                    http_options=types.HttpOptions(timeout=int(LLM_TIMEOUT_SEC * 1000)),
+                )
+            return self._client
+
+    def generate(self, prompt: str, call_site: str, model: str) -> str:
+        response = self._get_client().models.generate_content(model=model, contents=prompt)
+        return response.text or ""
+
+
+class FakeBackend:
+    """Deterministic offline stand-in; answers by call site."""
+    name = "fake"
+    enabled = True
+
+    def __init__(self, latency_sec: float = LLM_FAKE_LATENCY_SEC):
+        self.latency_sec = latency_sec
+        self.responders: Dict[str, Callable[[str], Any]] = {
+            "transcript.ask_gemini": _fake_transcript,
+            "assistant.summary": _fake_summary,
+            "highlights.detect": lambda prompt: {"highlights": []},
+            "linkedin.filter_keywords": _fake_keywords,
+        }
+
+    def generate(self, prompt: str, call_site: str, model: str) -> str:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        responder = self.responders.get(call_site, lambda prompt: {})
+        return json.dumps(responder(prompt))
+
+
+_LINE_RE = re.compile(r"^\s*\d+\.\s*\[Speaker (\d+)\]:\s*(.*)$")
+_INTRO_RE = re.compile(r"\b(?:I'm|I am|my name is|call me)\s+([A-Z][a-z]+)")
+
+
+def _fake_transcript(prompt: str) -> Dict[str, Any]:
+    lines = [m.groups() for m in map(_LINE_RE.match, prompt.splitlines()) if m]
+    name = "Other"
+    for speaker, text in lines:
+        match = _INTRO_RE.search(text)
+        if speaker != "0" and match:
+            name = match.group(1)
+            break
+    return {
+        "guessed_name": name,
+        "headline": "Contact",
+        "conversation": [
+            {"speaker": "Me" if speaker == "0" else name, "text": text}
+            for speaker, text in lines
+        ],
+        "keywords": [],
+        "has_linkedin_potential": False,
+    }
+
+
+def _fake_summary(prompt: str) -> Dict[str, Any]:
+    return {"answer": "Not enough information.", "excerpt": [], "suggestion": ""}
+
+
+def _fake_keywords(prompt: str) -> List[str]:
+    for line in prompt.splitlines():
+        if line.startswith("Keywords to filter:"):
+            raw = line.split(":", 1)[1]
+            return [kw.strip() for kw in raw.split(",") if kw.strip()][:6]
+    return []
+
+
+def _make_backend():
+    if LLM_BACKEND.lower() == "fake":
+        return FakeBackend()
+    return GeminiBackend(os.getenv("GEMINI_API_KEY"))
+
+
+# ======================================================
+# METRICS
+# ======================================================
+class _CallStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples: List[float] = []   # recent latencies for percentiles
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        idx = next((i for i, edge in enumerate(LATENCY_BUCKETS_MS) if ms <= edge), len(LATENCY_BUCKETS_MS))
+        self.buckets[idx] += 1
+        self.samples.append(ms)
+        if len(self.samples) > 1000:
+            del self.samples[:500]
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1) if ordered else None
+
+        labels = [f"le_{edge}ms" for edge in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+_backend = _make_backend()
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_stats: Dict[str, _CallStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _call_stats(call_site: str) -> _CallStats:
+    with _stats_lock:
+        return _stats.setdefault(call_site, _CallStats())
+
+
+# ======================================================
+# PUBLIC API
+# ======================================================
+def is_enabled() -> bool:
+    return bool(_backend.enabled)
+
+
+def backend_name() -> str:
+    return _backend.name
+
+
+def generate_text(
+    prompt: str,
+    call_site: str,
+    timeout: float = LLM_TIMEOUT_SEC,
+    retries: int = LLM_MAX_RETRIES,
+    model: str = LLM_MODEL,
+    parse: Optional[Callable[[str], Any]] = None,
+) -> Any:
+    """Run one prompt with deadline + retries; returns text (or parse(text))."""
+    if not is_enabled():
+        raise LLMError("LLM backend not configured.")
+
+    stats = _call_stats(call_site)
+    last_error: Optional[Exception] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            with _stats_lock:
+                stats.retries += 1
+            time.sleep(LLM_BACKOFF_BASE_SEC * (2 ** (attempt - 1)) * (1 + random.random()))
+
+        start = time.perf_counter()
+        if not _slots.acquire(timeout=timeout):
+            last_error = LLMError(f"{call_site}: no free LLM slot within {timeout:g}s")
+            continue
+        try:
+            future = _executor.submit(_backend.generate, prompt, call_site, model)
+        except Exception:
+            _slots.release()
+            raise
+        # The slot is held until the backend call really returns, even if
+        # we stop waiting for it, so concurrency stays bounded.
+        future.add_done_callback(lambda _: _slots.release())
+        try:
+            text = future.result(timeout=timeout)
+            result = parse(text) if parse else text
+        except FutureTimeout:
+            last_error = LLMError(f"{call_site}: timed out after {timeout:g}s")
+        except Exception as exc:
+            last_error = exc
+        else:
+            with _stats_lock:
+                stats.observe((time.perf_counter() - start) * 1000)
+            return result
+        with _stats_lock:
+            stats.observe((time.perf_counter() - start) * 1000)
+            stats.errors += 1
+        print(f"⚠️ LLM call {call_site} failed (attempt {attempt + 1}/{retries + 1}): {last_error}")
+
+    if isinstance(last_error, LLMError):
+        raise last_error
+    raise LLMError(f"{call_site}: {last_error}")
+
+
+def generate_json(prompt: str, call_site: str, **kwargs) -> Any:
+    """Like generate_text, but parses JSON; malformed output is retried."""
+    return generate_text(prompt, call_site, parse=parse_json_response, **kwargs)
+
+
+def latency_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {
+            "backend": _backend.name,
+            "model": LLM_MODEL,
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "call_sites": {site: s.snapshot() for site, s in _stats.items()},
+        }
@@ -0,0 +1,142 @@
+"""Named, lazily loaded models (InsightFace, face index, ...).
+
+Modules register a loader instead of building models at import:
+
+    model_registry.register("insightface", load_insightface)
+    face_app = model_registry.get("insightface")   # loads once, thread-safe
+
+Importing the app therefore costs only imports. At boot the app calls
+start(): by default every registered model is warmed in parallel on
+background threads (MODEL_WARMUP=background), so light routes answer
+straight away while /api/ready reports 503 until the models are in.
+MODEL_WARMUP=eager blocks until warm; MODEL_WARMUP=lazy (or
+RECALL_FAST_START=1) loads each model on first use only. A request that
+needs a model still warming simply waits for that one load.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+FAST_START = os.getenv("RECALL_FAST_START", "0") == "1"
+MODEL_WARMUP = "lazy" if FAST_START else os.getenv("MODEL_WARMUP", "background")   # background | eager | lazy
+
+
+class _Entry:
+    def __init__(self, loader: Callable[[], Any]):
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.state = "pending"        # pending | loading | ready | failed
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._timings: Dict[str, float] = {}
+        self.mode = "lazy"
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(loader)
+
+    def _entry(self, name: str) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"No model registered as '{name}'.")
+        return entry
+
+    def get(self, name: str) -> Any:
+        """The loaded model, loading it now if nobody has yet."""
+        entry = self._entry(name)
+        if entry.state == "ready":
+            return entry.value
+        with entry.lock:
+            if entry.state != "ready":
+                entry.state = "loading"
+                t0 = time.perf_counter()
+                try:
+                    entry.value = entry.loader()
+                except Exception as exc:
+                    entry.state = "failed"
+                    entry.error = str(exc)
+                    print(f"❌ Loading {name} failed: {exc}")
+                    raise
+                entry.load_ms = round((time.perf_counter() - t0) * 1000, 1)
+                entry.error = None
+                entry.state = "ready"
+                print(f"✅ {name} ready in {entry.load_ms:.0f} ms.")
+        return entry.value
+
+    def peek(self, name: str) -> Any:
+        """The model if already loaded, else None (never triggers a load)."""
+        entry = self._entry(name)
+        return entry.value if entry.state == "ready" else None
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """Load models in parallel; returns name → loaded ok."""
+        with self._lock:
+            names = list(names) if names is not None else list(self._entries)
+        if not names:
+            return {}
+
+        def load(name):
+            try:
+                self.get(name)
+                return True
+            except Exception:
+                return False
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="model-warm") as pool:
+            results = dict(zip(names, pool.map(load, names)))
+        self.record_timing("warmup_ms", (time.perf_counter() - t0) * 1000)
+        return results
+
+    def start(self, mode: str = MODEL_WARMUP) -> None:
+        """Boot-time warm-up according to mode (background | eager | lazy)."""
+        self.mode = mode
+        if mode == "eager":
+            self.warm()
+        elif mode == "background":
+            threading.Thread(target=self.warm, name="model-warmup", daemon=True).start()
+        print(f"🧠 Model warm-up: {mode}.")
+
+    def record_timing(self, label: str, ms: float) -> None:
+        with self._lock:
+            self._timings[label] = round(ms, 1)
+
+    def _ready(self, entries: Iterable[_Entry]) -> bool:
+        # Lazy mode loads on demand, so only a failed load means not ready
+        if self.mode == "lazy":
+            return all(e.state != "failed" for e in entries)
+        return all(e.state == "ready" for e in entries)
+
+    def ready(self) -> bool:
+        with self._lock:
+            entries = list(self._entries.values())
+        return self._ready(entries)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = dict(self._entries)
+            timings = dict(self._timings)
+        return {
+            "ready": self._ready(entries.values()),
+            "mode": self.mode,
+            "models": {
+                name: {"state": e.state, "load_ms": e.load_ms, "error": e.error}
+                for name, e in entries.items()
+            },
+            "timings": timings,
+        }
+
+
+# Process-wide registry shared by analyzers and the app
+model_registry = ModelRegistry()
@@ -0,0 +1,89 @@
+"""In-memory people catalogue behind GET /api/people.
+
+One row per enrolled face: name, image URL, latest headline, number of
+saved conversations and when we last saw them. The rows are built from
+one directory listing plus one store query and then served from memory,
+so a request costs the same however long anyone's history gets.
+
+Writers call invalidate() (enroll, save, rename, LinkedIn). Changes made
+by another process are picked up by a cheap stamp check — the faces
+directory mtime and the store's last write — at most every
+CATALOG_CHECK_SEC. Each rebuild bumps `version`; the ETag is a digest
+of the rows, so it is stable across processes serving the same data.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CATALOG_CHECK_SEC = float(os.getenv("PEOPLE_CATALOG_CHECK_SEC", "2.0"))
+
+
+class PeopleCatalog:
+    def __init__(self, faces_dir: Path, store, base_url: Optional[str] = None):
+        self.faces_dir = Path(faces_dir)
+        self.store = store
+        self.base_url = base_url
+        self.version = 0
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._etag = ""
+        self._stamp: Optional[Tuple] = None
+        self._dirty = True
+        self._last_check = 0.0
+
+    def invalidate(self) -> None:
+        """Mark the catalogue stale; the next read rebuilds it."""
+        self._dirty = True
+
+    def _current_stamp(self) -> Tuple:
+        try:
+            faces_mtime = self.faces_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            faces_mtime = 0
+        return (faces_mtime,) + tuple(self.store.stamp())
+
+    def _rebuild(self, stamp: Tuple) -> None:
+        summaries = self.store.summaries()
+        rows = []
+        for face_file in sorted(self.faces_dir.glob("*.*")):
+            if not face_file.is_file():
+                continue
+            name = face_file.stem
+            summary = summaries.get(name, {})
+            rows.append({
+                "name": name,
+                "image_url": f"{self.base_url}/faces/{face_file.name}",
+                "headline": summary.get("headline", ""),
+                "conversation_count": summary.get("count", 0),
+                "last_seen": summary.get("last_seen") or None,
+            })
+        body = json.dumps(rows, sort_keys=True).encode("utf-8")
+        self._rows = rows
+        self._etag = f"people-{hashlib.sha1(body).hexdigest()[:16]}"
+        self._stamp = stamp
+        self._dirty = False
+        self.version += 1
+
+    def snapshot(self) -> Tuple[List[Dict[str, Any]], str]:
+        """(rows, etag), rebuilding first if anything changed."""
+        with self._lock:
+            now = time.time()
+            if self._dirty or now - self._last_check >= CATALOG_CHECK_SEC:
+                self._last_check = now
+                stamp = self._current_stamp()
+                if self._dirty or stamp != self._stamp:
+                    t0 = time.perf_counter()
+                    self._rebuild(stamp)
+                    print(f"👥 People catalogue v{self.version}: {len(self._rows)} people "
+                          f"in {(time.perf_counter() - t0) * 1000:.1f} ms.")
+            return self._rows, self._etag
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int, str]:
+        """(rows[offset:offset+limit], total, etag)."""
+        rows, etag = self.snapshot()
+        end = None if limit is None else offset + limit
+        return rows[offset:end], len(rows), etag
@@ -0,0 +1,245 @@
+"""Result cache shared by every server process.
+
+Stage files are plain files under cache/; the size total and hit/miss
+counters live in cache/stats.sqlite3, and eviction runs under a flock on
+the cache directory, so workers agree on both.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "cache"
+CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+HASH_CHUNK_BYTES = 1024 * 1024
+STATS_DB_NAME = "stats.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,     -- hit:<stage> | miss:<stage> | evictions | bytes
+    value INTEGER NOT NULL
+);
+"""
+
+# stage name → file name inside an entry directory
+STAGE_FILES = {
+    "audio": "audio.pcm",
+    "sentences": "sentences.json",
+    "gemini": "gemini.json",
+    "face_scan": "face_scan.json",
+    "face_crop": "face_crop.jpg",
+}
+
+
+def hash_file(path, chunk_size: int = HASH_CHUNK_BYTES) -> str:
+    """Streaming SHA-256 of a file — never holds more than one chunk."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for p in path.iterdir():
+        try:
+            total += p.stat().st_size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+class CacheEntry:
+    """Per-upload view of the cache: one directory, one file per stage."""
+
+    def __init__(self, cache: "ResultCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.path = cache.root / key[:2] / key
+
+    def _stage_path(self, stage: str) -> Path:
+        return self.path / STAGE_FILES[stage]
+
+    def get_bytes(self, stage: str) -> Optional[bytes]:
+        p = self._stage_path(stage)
+        try:
+            data = p.read_bytes()
+        except FileNotFoundError:
+            self.cache._count(stage, hit=False)
+            return None
+        self.cache._count(stage, hit=True)
+        self.cache._touch(self.path)
+        return data
+
+    def put_bytes(self, stage: str, data: bytes) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self._stage_path(stage)
+        tmp = target.with_suffix(target.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        try:
+            old_size = target.stat().st_size
+        except FileNotFoundError:
+            old_size = 0
+        os.replace(tmp, target)  # readers never see a half-written stage
+        self.cache._touch(self.path)
+        self.cache._grew(len(data) - old_size)
+
+    def get_json(self, stage: str) -> Optional[Any]:
+        data = self.get_bytes(stage)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            return None
+
+    def put_json(self, stage: str, value: Any) -> None:
+        self.put_bytes(stage, json.dumps(value).encode("utf-8"))
+
+    def get_path(self, stage: str) -> Optional[Path]:
+        p = self._stage_path(stage)
+        hit = p.exists()
+        self.cache._count(stage, hit=hit)
+        if hit:
+            self.cache._touch(self.path)
+        return p if hit else None
+
+    def put_file(self, stage: str, src) -> None:
+        self.put_bytes(stage, Path(src).read_bytes())
+
+
+class ResultCache:
+    """Content-addressed cache of per-stage pipeline outputs with LRU eviction.
+
+    Entries live in cache/<key[:2]>/<key>/; an entry's mtime is its last
+    use, and the least recently used entries are dropped once the cache
+    grows past max_bytes.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / STATS_DB_NAME
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        # Re-measure on startup: files may have changed while nothing was running
+        with self._locked():
+            self._set("bytes", sum(_dir_size(d) for d in self._entries()))
+
+    def entry(self, key: str) -> CacheEntry:
+        return CacheEntry(self, key)
+
+    def entry_for_file(self, path) -> CacheEntry:
+        return self.entry(hash_file(path))
+
+    # === Bookkeeping ===
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _locked(self):
+        fd = os.open(str(self.root), os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _add(self, name: str, delta: int) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, delta),
+            )
+            value = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+            conn.execute("COMMIT")
+        return value
+
+    def _set(self, name: str, value: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, value),
+            )
+
+    def _entries(self):
+        for shard in self.root.iterdir():
+            if shard.is_dir():
+                for entry in shard.iterdir():
+                    if entry.is_dir():
+                        yield entry
+
+    def _count(self, stage: str, hit: bool) -> None:
+        self._add(f"{'hit' if hit else 'miss'}:{stage}", 1)
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+
+    def _grew(self, nbytes: int) -> None:
+        if nbytes and self._add("bytes", nbytes) > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used entries until under max_bytes."""
+        with self._locked():
+            entries = []
+            for d in self._entries():
+                try:
+                    entries.append((d.stat().st_mtime, _dir_size(d), d))
+                except FileNotFoundError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, d in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(d, ignore_errors=True)
+                total -= size
+                removed += 1
+            # The scan is the truth; it also corrects drift from racing writers
+            self._set("bytes", total)
+            if removed:
+                self._add("evictions", removed)
+        if removed:
+            print(f"🧹 Result cache: evicted {removed} entr{'y' if removed == 1 else 'ies'}, {total / 1e6:.1f} MB left.")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters shared by every server process."""
+        with self._connect() as conn:
+            counters = {r["name"]: r["value"] for r in conn.execute("SELECT name, value FROM counters")}
+        hits = {k.split(":", 1)[1]: v for k, v in counters.items() if k.startswith("hit:")}
+        misses = {k.split(":", 1)[1]: v for k, v in counters.items() if k.startswith("miss:")}
+        total_hits, total_misses = sum(hits.values()), sum(misses.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(total_hits / (total_hits + total_misses), 3) if total_hits + total_misses else 0.0,
+            "evictions": counters.get("evictions", 0),
+            "bytes": counters.get("bytes", 0),
+            "max_bytes": self.max_bytes,
+            "updated_at": int(time.time()),
+        }
@@ -0,0 +1,98 @@
+"""Local stand-in for the DuckDuckGo search pages, for offline runs.
+
+    python -m services.search_fixture_server --port 8765
+    LINKEDIN_SEARCH_URL=http://127.0.0.1:8765/ python app.py
+
+GET /        → a search form (input name "q"), like duckduckgo.com
+GET /?q=...  → a results page with one LinkedIn profile link per word of
+               the query (plus a post link and a non-LinkedIn link that the
+               extractor must skip), rendered after FIXTURE_DELAY_SEC so the
+               result-ready wait is exercised. A query containing
+               "noresults" renders the empty-results page.
+
+benchmarks/bench_linkedin_search.py checks both search backends against it.
+"""
+import html
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+FIXTURE_DELAY_SEC = float(os.getenv("FIXTURE_DELAY_SEC", "0.3"))
+
+_FORM_PAGE = """<!doctype html>
+<html><body>
+<form action="/" method="get"><input type="text" name="q"><input type="submit"></form>
+</body></html>"""
+
+_RESULTS_PAGE = """<!doctype html>
+<html><body>
+<div id="links">
+{results}
+</div>
+</body></html>"""
+
+_RESULT = """<article data-testid="result"><h2><a class="result__a" data-testid="result-title-a" href="{href}">{title}</a></h2></article>"""
+
+_NO_RESULTS = """<div class="no-results" data-testid="no-results">No results found for {query}.</div>"""
+
+
+def render_results(query: str) -> str:
+    """The fixture's results HTML for a query (also usable without the server)."""
+    if "noresults" in query.lower():
+        return _RESULTS_PAGE.format(results=_NO_RESULTS.format(query=html.escape(query)))
+    slugs = [w.lower() for w in re.findall(r"\w+", query) if w.lower() != "linkedin"] or ["someone"]
+    slug = "-".join(slugs)
+    results = [
+        # A DuckDuckGo-style redirect link, then direct ones
+        _RESULT.format(
+            href=f"//duckduckgo.com/l/?uddg={quote(f'https://www.linkedin.com/in/{slug}?trk=fixture', safe='')}&rut=x",
+            title=html.escape(f"{query} - LinkedIn"),
+        ),
+        _RESULT.format(href=f"https://www.linkedin.com/posts/{slug}_activity", title="A post"),
+        _RESULT.format(href=f"https://example.com/{slug}", title="Not LinkedIn"),
+    ]
+    results += [
+        _RESULT.format(href=f"https://www.linkedin.com/in/{word}-{i}", title=html.escape(word))
+        for i, word in enumerate(slugs, 1)
+    ]
+    return _RESULTS_PAGE.format(results="\n".join(results))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        query = (params.get("q") or [""])[0]
+        if query:
+            time.sleep(FIXTURE_DELAY_SEC)
+            body = render_results(query)
+        else:
+            body = _FORM_PAGE
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server(port: int = 0) -> ThreadingHTTPServer:
+    """Serve on 127.0.0.1 from a daemon thread; port 0 picks a free one."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else 8765
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    print(f"🧪 Search fixture on http://127.0.0.1:{port}/")
+    server.serve_forever()
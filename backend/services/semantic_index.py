@@ -0,0 +1,370 @@
+"""Optional semantic retrieval for the assistant.
+
+Conversation turns are embedded at save time with a small local CPU
+model and appended to an on-disk matrix under semantic_index/, next to
+conversations/. Lookups go through an IVF index (k-means lists, probe
+the nearest few), so a query scans a few percent of the turns; rows
+added since the last training are scanned directly until the next
+retrain. The top turns become extra per-turn scores that the
+conversation index merges with its lexical scores.
+
+    semantic_index/vectors.npy  float32, one L2-normalised row per turn
+    semantic_index/rows.jsonl   sidecar log: {"row", "person", "entry", "turn"}
+                                / {"rename", "to"} / {"drop"}
+    semantic_index/ivf.npz      centroids + rows grouped by list
+
+Enable with SEMANTIC_SEARCH=1. The default embedder needs
+sentence-transformers (in requirements.txt; the model is downloaded on
+first use); SEMANTIC_EMBEDDER=hash is a dependency-free stand-in
+(character n-gram hashing, not semantic) for offline runs only.
+
+Rebuild from the conversation store:  python -m services.semantic_index --rebuild
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analyzers.embedding_store import append_npy_rows, create_npy, read_npy_shape
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SEMANTIC_DIR = BASE_DIR / "semantic_index"
+
+SEMANTIC_SEARCH = os.getenv("SEMANTIC_SEARCH", "0") == "1"
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "minilm")   # minilm | hash
+SEMANTIC_MODEL = os.getenv("SEMANTIC_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_DIM = 384
+SEMANTIC_TOP_K = 50
+SEMANTIC_MIN_SCORE = 0.35     # cosine below this is not worth a boost
+SEMANTIC_WEIGHT = 3.0         # boost = weight × cosine, added to the turn's lexical score
+
+IVF_MIN_ROWS = 4096           # brute force below this many turns
+IVF_NPROBE = 8
+IVF_TRAIN_SAMPLE = 20_000
+IVF_KMEANS_ITERS = 8
+
+TurnKey = Tuple[str, int, int]  # (person, entry_idx, turn_idx)
+
+
+# ======================================================
+# EMBEDDERS — embed(texts) -> (n, dim) float32, L2-normalised
+# ======================================================
+class SentenceTransformerEmbedder:
+    name = "minilm"
+
+    def __init__(self, model_name: str = SEMANTIC_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+
+
+class HashingEmbedder:
+    """Character 3-gram + word feature hashing. Deterministic, no model."""
+    name = "hash"
+
+    def __init__(self, dim: int = SEMANTIC_DIM):
+        self.dim = dim
+
+    def _features(self, text: str):
+        text = f" {text.lower()} "
+        for word in re.findall(r"\w+", text):
+            yield "w:" + word
+        for i in range(len(text) - 2):
+            yield text[i:i + 3]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+def get_embedder(name: str = SEMANTIC_EMBEDDER):
+    name = (name or "minilm").lower()
+    if name == "minilm":
+        return SentenceTransformerEmbedder()
+    if name == "hash":
+        return HashingEmbedder()
+    raise ValueError(f"Unknown semantic embedder: {name}")
+
+
+# ======================================================
+# IVF
+# ======================================================
+def train_ivf(matrix: np.ndarray, live: np.ndarray, seed: int = 0) -> Dict[str, np.ndarray]:
+    """k-means (cosine) over a sample of live rows, then bucket every row."""
+    n = len(matrix)
+    nlist = max(8, int(np.sqrt(n)))
+    rng = np.random.default_rng(seed)
+    live_rows = np.flatnonzero(live[:n])
+    sample = np.sort(rng.choice(live_rows, size=min(len(live_rows), IVF_TRAIN_SAMPLE), replace=False))
+    data = np.asarray(matrix[sample], dtype=np.float32)
+    centroids = data[rng.choice(len(data), size=min(nlist, len(data)), replace=False)].copy()
+    for _ in range(IVF_KMEANS_ITERS):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(len(centroids)):
+            members = data[assign == c]
+            if len(members):
+                mean = members.mean(axis=0)
+                centroids[c] = mean / max(np.linalg.norm(mean), 1e-12)
+
+    assign = np.empty(n, dtype=np.int32)
+    for start in range(0, n, 8192):
+        block = np.asarray(matrix[start:start + 8192], dtype=np.float32)
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    order = np.argsort(assign, kind="stable").astype(np.int32)
+    offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1)).astype(np.int64)
+    return {"centroids": centroids, "order": order, "offsets": offsets, "trained_rows": np.array(n)}
+
+
+# ======================================================
+# INDEX
+# ======================================================
+class SemanticIndex:
+    """Turn embeddings on disk + an IVF index over them."""
+
+    def __init__(self, embedder, root: Path = SEMANTIC_DIR):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.matrix_path = self.root / "vectors.npy"
+        self.sidecar_path = self.root / "rows.jsonl"
+        self.ivf_path = self.root / "ivf.npz"
+        create_npy(self.matrix_path, self.dim)
+        self.sidecar_path.touch(exist_ok=True)
+        if read_npy_shape(self.matrix_path)[1] != self.dim:
+            raise ValueError(f"{self.matrix_path} was built with a different embedder; rebuild it.")
+
+        self._lock = threading.RLock()
+        self._sidecar_size = -1
+        self._ivf_mtime = None
+        self._names: List[str] = []
+        self._codes = np.zeros(0, dtype=np.int32)
+        self._entries = np.zeros(0, dtype=np.int32)
+        self._turns = np.zeros(0, dtype=np.int32)
+        self._live = np.zeros(0, dtype=bool)
+        self._ivf: Optional[Dict[str, np.ndarray]] = None
+
+    # === State (replayed from the sidecar; reloaded when it grows) ===
+    def _refresh(self) -> None:
+        size = self.sidecar_path.stat().st_size
+        if size != self._sidecar_size:
+            self._replay()
+            self._sidecar_size = size
+        try:
+            mtime = self.ivf_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._ivf_mtime:
+            self._ivf = dict(np.load(self.ivf_path)) if mtime else None
+            self._ivf_mtime = mtime
+
+    def _replay(self) -> None:
+        rows = read_npy_shape(self.matrix_path)[0]
+        names: List[str] = []
+        name_code: Dict[str, int] = {}
+        codes = np.full(rows, -1, dtype=np.int32)   # rows without a record are dead
+        entries = np.zeros(rows, dtype=np.int32)
+        turns = np.zeros(rows, dtype=np.int32)
+
+        def code_for(name):
+            if name not in name_code:
+                name_code[name] = len(names)
+                names.append(name)
+            return name_code[name]
+
+        with open(self.sidecar_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn trailing write
+                if "rename" in rec:
+                    old, new = rec["rename"], rec["to"]
+                    if old in name_code:
+                        # Merge: old rows are relabelled as the new person
+                        codes[codes == name_code[old]] = code_for(new)
+                elif "drop" in rec:
+                    if rec["drop"] in name_code:
+                        codes[codes == name_code[rec["drop"]]] = -1
+                elif rec.get("row", rows) < rows:
+                    r = rec["row"]
+                    codes[r] = code_for(rec["person"])
+                    entries[r], turns[r] = rec["entry"], rec["turn"]
+
+        self._names, self._codes, self._entries, self._turns = names, codes, entries, turns
+        self._live = codes >= 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._live.sum())
+
+    # === Writes ===
+    def _log(self, records: Sequence[Dict[str, Any]]) -> None:
+        with open(self.sidecar_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add_entry(self, person: str, entry_idx: int, entry: Dict[str, Any]) -> int:
+        """Embed and append every non-empty turn of one entry."""
+        conversation = entry.get("conversation") if isinstance(entry, dict) else None
+        turns = [
+            (idx, turn["text"])
+            for idx, turn in enumerate(conversation or [])
+            if isinstance(turn, dict) and isinstance(turn.get("text"), str) and turn["text"].strip()
+        ]
+        if not turns:
+            return 0
+        vectors = self.embedder.embed([text for _, text in turns])
+        return self.add_vectors([(person, entry_idx, idx) for idx, _ in turns], vectors)
+
+    def add_vectors(self, keys: Sequence[TurnKey], vectors: np.ndarray) -> int:
+        """Append pre-computed turn vectors (one row per key)."""
+        with self._lock:
+            first = append_npy_rows(self.matrix_path, vectors)
+            self._log([
+                {"row": first + i, "person": person, "entry": entry_idx, "turn": turn_idx}
+                for i, (person, entry_idx, turn_idx) in enumerate(keys)
+            ])
+            self._maybe_retrain()
+        return len(keys)
+
+    def index_person(self, person: str, entries: Sequence[Any]) -> int:
+        """Replace a person's rows with fresh embeddings of entries."""
+        with self._lock:
+            self._log([{"drop": person}])
+            return sum(self.add_entry(person, idx, entry) for idx, entry in enumerate(entries))
+
+    def rename_person(self, old_name: str, new_name: str) -> None:
+        if old_name != new_name:
+            with self._lock:
+                self._log([{"rename": old_name, "to": new_name}])
+
+    def remove_person(self, person: str) -> None:
+        with self._lock:
+            self._log([{"drop": person}])
+
+    def _maybe_retrain(self) -> None:
+        """Retrain once untrained rows outnumber trained ones (amortised)."""
+        self._refresh()
+        rows = len(self._live)
+        trained = int(self._ivf["trained_rows"]) if self._ivf else 0
+        if rows < IVF_MIN_ROWS or rows - trained <= max(trained, IVF_MIN_ROWS) // 2:
+            return
+        t0 = time.perf_counter()
+        matrix = np.load(self.matrix_path, mmap_mode="r")[:rows]
+        ivf = train_ivf(matrix, self._live)
+        tmp = self.root / "ivf.tmp.npz"
+        np.savez(tmp, **ivf)
+        os.replace(tmp, self.ivf_path)
+        print(f"🧭 Semantic IVF trained: {rows} turns, {len(ivf['centroids'])} lists "
+              f"in {time.perf_counter() - t0:.2f}s.")
+
+    # === Reads ===
+    def search_vector(self, query: np.ndarray, k: int = SEMANTIC_TOP_K, target_name: Optional[str] = None) -> List[Tuple[TurnKey, float]]:
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._refresh()
+            rows = len(self._live)
+            if rows == 0:
+                return []
+            matrix = np.load(self.matrix_path, mmap_mode="r")[:rows]
+            allowed = self._live
+            if target_name:
+                wanted = [i for i, n in enumerate(self._names) if n.lower() == target_name.lower()]
+                allowed = allowed & np.isin(self._codes, wanted)
+
+            ivf = self._ivf
+            trained = int(ivf["trained_rows"]) if ivf else 0
+            if trained and not target_name:
+                # Probe the closest lists, then scan everything added since training
+                lists = np.argsort(-(ivf["centroids"] @ query))[:IVF_NPROBE]
+                offsets, order = ivf["offsets"], ivf["order"]
+                probed = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in lists])
+                candidates = np.concatenate([np.sort(probed), np.arange(trained, rows, dtype=np.int32)])
+                scores = np.asarray(matrix[candidates], dtype=np.float32) @ query
+            else:
+                # Small index, or one person's turns: exact scan
+                candidates = np.flatnonzero(allowed)
+                scores = np.asarray(matrix[candidates], dtype=np.float32) @ query if len(candidates) else np.zeros(0)
+
+            keep = allowed[candidates]
+            candidates, scores = candidates[keep], scores[keep]
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            return [
+                ((self._names[self._codes[r]], int(self._entries[r]), int(self._turns[r])), float(scores[i]))
+                for i, r in ((i, candidates[i]) for i in top)
+            ]
+
+    def search(self, question: str, k: int = SEMANTIC_TOP_K, target_name: Optional[str] = None) -> List[Tuple[TurnKey, float]]:
+        return self.search_vector(self.embedder.embed([question])[0], k=k, target_name=target_name)
+
+    def turn_boosts(self, question: str, target_name: Optional[str] = None) -> Dict[TurnKey, float]:
+        """Extra per-turn scores for ConversationIndex.search."""
+        return {
+            key: SEMANTIC_WEIGHT * score
+            for key, score in self.search(question, target_name=target_name)
+            if score >= SEMANTIC_MIN_SCORE
+        }
+
+    def rebuild(self, store) -> int:
+        """Re-embed every conversation in a ConversationStore; returns turns indexed."""
+        total = 0
+        for name in store.people():
+            total += self.index_person(name, store.entries(name))
+        return total
+
+
+def load_semantic_index(enabled: bool = SEMANTIC_SEARCH, store=None) -> Optional[SemanticIndex]:
+    """The semantic index if enabled and its embedder can load, else None."""
+    if not enabled:
+        return None
+    try:
+        index = SemanticIndex(get_embedder())
+    except ImportError as exc:
+        print(f"⚠️ Semantic search disabled: {exc} — pip install sentence-transformers (see requirements.txt).")
+        return None
+    except Exception as exc:
+        print(f"⚠️ Semantic search disabled: {exc}")
+        return None
+    print(f"🧭 Semantic search ready ({index.embedder.name}, {len(index)} turns).")
+    if not len(index) and store is not None and store.people():
+        print("🧭 Semantic index is empty — run: python -m services.semantic_index --rebuild")
+    return index
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--rebuild"]:
+        sys.exit("usage: python -m services.semantic_index --rebuild")
+    index = load_semantic_index(enabled=True)
+    if index is None:
+        sys.exit(1)
+    for path in (index.matrix_path, index.sidecar_path, index.ivf_path):
+        path.unlink(missing_ok=True)
+    from services.conversation_store import ConversationStore
+    index = SemanticIndex(index.embedder)
+    print(f"✅ Indexed {index.rebuild(ConversationStore())} turn(s).")
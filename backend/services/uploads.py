@@ -0,0 +1,383 @@
+"""Resumable chunked uploads, hashed while they stream in.
+
+    upload = store.create(size=..., filename="clip.mp4")   # → uploads/<id>/upload.part
+    store.append(upload["id"], offset, request.stream)     # any number of chunks
+    store.complete(upload["id"])                           # → uploads/<id>/<sha256>.mp4
+
+Chunks must arrive in order: append() checks the client's offset against
+the bytes already on disk, so a client that lost a response asks
+get()["received"] and resumes from there. Each upload has an in-process
+SHA-256 that is fed as chunks are written. A chunk handled by another
+process, or after a restart, first catches the hash up from the part
+file, so every byte is hashed at most once per process and complete()
+never re-reads the file. Upload rows live in SQLite (uploads.sqlite3),
+so any server process can take any chunk; a directory flock serialises
+writers per upload.
+
+follow() returns a reader that blocks on the growing part file until the
+upload completes. Stages can therefore start demuxing the prefix that has
+already arrived (see container_streamable for when that works).
+"""
+import fcntl
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+UPLOADS_DIR = BASE_DIR / "uploads"
+UPLOADS_DB_PATH = BASE_DIR / "uploads.sqlite3"
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(2 * 1024 ** 3)))
+UPLOAD_STALL_TIMEOUT_SEC = float(os.getenv("UPLOAD_STALL_TIMEOUT_SEC", "600"))
+UPLOAD_BLOCK_BYTES = 1024 * 1024
+UPLOAD_PROBE_BYTES = 64 * 1024
+FOLLOW_POLL_SEC = 0.1
+PART_NAME = "upload.part"
+DEFAULT_EXT = ".mp4"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,      -- open | complete | aborted
+    ext         TEXT NOT NULL,
+    size        INTEGER,            -- declared total length, if the client sent one
+    received    INTEGER NOT NULL DEFAULT 0,
+    sha256      TEXT,
+    path        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+"""
+
+
+class UploadError(ValueError):
+    pass
+
+
+class UploadOffsetMismatch(UploadError):
+    """The chunk doesn't start where the data on disk ends."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}.")
+        self.offset = offset
+
+
+class UploadClosed(UploadError):
+    """The upload was completed or aborted; no more chunks are accepted."""
+
+
+class UploadAborted(RuntimeError):
+    pass
+
+
+def _safe_ext(filename: str) -> str:
+    ext = Path(filename or "").suffix.lower()
+    if not ext or len(ext) > 8 or not ext[1:].isalnum():
+        return DEFAULT_EXT
+    return ext
+
+
+# === Container probing ===
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"   # Matroska / WebM
+
+
+def container_streamable(path, available: int) -> Optional[bool]:
+    """Can a decoder read this container front to back as it arrives?
+
+    True for Matroska/WebM, fragmented MP4, and MP4/MOV with the `moov`
+    index before the media data (faststart). False for MP4/MOV with `mdat`
+    first: phones often write the index at the end, and then nothing is
+    decodable until the last bytes arrive. None means the first
+    `available` bytes aren't enough to tell yet.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(min(available, 4))
+            if len(head) < 4:
+                return None
+            if head == _EBML_MAGIC:
+                return True
+            offset = 0
+            while offset + 8 <= available:
+                f.seek(offset)
+                header = f.read(16)
+                size = int.from_bytes(header[:4], "big")
+                box = header[4:8]
+                if box in (b"moov", b"moof"):
+                    return True
+                if box == b"mdat":
+                    return False
+                if size == 1:
+                    if len(header) < 16:
+                        return None
+                    size = int.from_bytes(header[8:16], "big")
+                if size < 8:
+                    return False    # size 0 ("to end of file") or not ISO-BMFF at all
+                if offset == 0 and box != b"ftyp":
+                    return False
+                offset += size
+    except OSError:
+        return None
+    return None
+
+
+class UploadStore:
+    def __init__(self, root: Path = UPLOADS_DIR, db_path: Path = UPLOADS_DB_PATH):
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # upload id → (running SHA-256, bytes it has consumed)
+        self._hashers: Dict[str, Tuple[Any, int]] = {}
+        self._hashers_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _dir(self, upload_id: str) -> Path:
+        return self.root / upload_id
+
+    def _part(self, upload_id: str) -> Path:
+        return self._dir(upload_id) / PART_NAME
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """Exclusive per-upload lock, shared by every process."""
+        fd = os.open(self._dir(upload_id), os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _update(self, upload_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE uploads SET {cols} WHERE id = ?", (*fields.values(), upload_id))
+
+    # === Public API ===
+    def create(self, size: Optional[int] = None, filename: str = "", upload_id: Optional[str] = None) -> Dict[str, Any]:
+        if size is not None and not 0 <= size <= UPLOAD_MAX_BYTES:
+            raise UploadError(f"Upload size must be between 0 and {UPLOAD_MAX_BYTES} bytes.")
+        upload_id = upload_id or uuid.uuid4().hex
+        self._dir(upload_id).mkdir(parents=True, exist_ok=True)
+        part = self._part(upload_id)
+        part.touch()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO uploads (id, status, ext, size, received, path, created_at, updated_at) "
+                "VALUES (?, 'open', ?, ?, 0, ?, ?, ?)",
+                (upload_id, _safe_ext(filename), size, str(part), now, now),
+            )
+        return self.get(upload_id)
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _require(self, upload_id: str) -> Dict[str, Any]:
+        upload = self.get(upload_id)
+        if upload is None:
+            raise KeyError(upload_id)
+        return upload
+
+    def _hasher(self, upload_id: str, upto: int):
+        """The upload's running hash, caught up from disk to `upto` bytes."""
+        with self._hashers_lock:
+            digest, covered = self._hashers.pop(upload_id, (None, 0))
+        if digest is None or covered > upto:
+            digest, covered = hashlib.sha256(), 0
+        if covered < upto:
+            with open(self._part(upload_id), "rb") as f:
+                f.seek(covered)
+                remaining = upto - covered
+                while remaining > 0:
+                    block = f.read(min(UPLOAD_BLOCK_BYTES, remaining))
+                    if not block:
+                        break
+                    digest.update(block)
+                    remaining -= len(block)
+        return digest
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO, length: Optional[int] = None) -> Dict[str, Any]:
+        """Write one chunk at `offset`; completes the upload once a declared size is reached."""
+        self._require(upload_id)
+        with self._locked(upload_id):
+            upload = self._require(upload_id)
+            if upload["status"] != "open":
+                raise UploadClosed(f"Upload is {upload['status']}.")
+            part = self._part(upload_id)
+            current = part.stat().st_size
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+            limit = upload["size"] if upload["size"] is not None else UPLOAD_MAX_BYTES
+            if length is not None and current + length > limit:
+                raise UploadError("Chunk runs past the upload's size.")
+
+            digest = self._hasher(upload_id, current)
+            written = 0
+            try:
+                with open(part, "r+b") as f:
+                    f.seek(current)
+                    while length is None or written < length:
+                        want = UPLOAD_BLOCK_BYTES if length is None else min(UPLOAD_BLOCK_BYTES, length - written)
+                        block = stream.read(want)
+                        if not block:
+                            break
+                        if current + written + len(block) > limit:
+                            raise UploadError("Chunk runs past the upload's size.")
+                        f.write(block)
+                        digest.update(block)
+                        written += len(block)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception:
+                # Keep the bytes that made it (the client resumes from received); drop a torn tail
+                with open(part, "r+b") as f:
+                    f.truncate(current + written)
+                raise
+            finally:
+                with self._hashers_lock:
+                    self._hashers[upload_id] = (digest, current + written)
+
+            received = current + written
+            self._update(upload_id, received=received)
+            if upload["size"] is not None and received == upload["size"]:
+                return self._complete_locked(upload_id)
+        return self.get(upload_id)
+
+    def complete(self, upload_id: str) -> Dict[str, Any]:
+        """Seal the upload: move it to uploads/<id>/<sha256><ext>."""
+        self._require(upload_id)
+        with self._locked(upload_id):
+            return self._complete_locked(upload_id)
+
+    def _complete_locked(self, upload_id: str) -> Dict[str, Any]:
+        upload = self._require(upload_id)
+        if upload["status"] == "complete":
+            return upload
+        if upload["status"] == "aborted":
+            raise UploadClosed("Upload was aborted.")
+        part = self._part(upload_id)
+        received = part.stat().st_size
+        if upload["size"] is not None and received != upload["size"]:
+            raise UploadError(f"Upload has {received} of {upload['size']} bytes.")
+        sha256 = self._hasher(upload_id, received).hexdigest()
+        with self._hashers_lock:
+            self._hashers.pop(upload_id, None)
+        final = self._dir(upload_id) / f"{sha256}{upload['ext']}"
+        # Readers following the part file keep their open handle across the rename
+        os.replace(part, final)
+        self._update(upload_id, status="complete", received=received, sha256=sha256, path=str(final))
+        print(f"📦 Upload {upload_id} complete ({received / 1e6:.1f} MB, sha256 {sha256[:12]}…).")
+        return self.get(upload_id)
+
+    def save(self, stream: BinaryIO, filename: str = "", upload_id: Optional[str] = None) -> Dict[str, Any]:
+        """One-shot upload: stream, hash and seal in a single call."""
+        upload = self.create(filename=filename, upload_id=upload_id)
+        self.append(upload["id"], 0, stream)
+        return self.complete(upload["id"])
+
+    def abort(self, upload_id: str) -> bool:
+        upload = self.get(upload_id)
+        if upload is None or upload["status"] != "open":
+            return False
+        with self._locked(upload_id):
+            self._update(upload_id, status="aborted")
+            self._part(upload_id).unlink(missing_ok=True)
+        with self._hashers_lock:
+            self._hashers.pop(upload_id, None)
+        return True
+
+    # === Following a growing upload ===
+    def wait(self, upload_id: str, min_bytes: Optional[int] = None, timeout: float = UPLOAD_STALL_TIMEOUT_SEC) -> Dict[str, Any]:
+        """Block until the upload completes (or `min_bytes` have arrived)."""
+        last_received, last_progress = -1, time.monotonic()
+        while True:
+            upload = self._require(upload_id)
+            if upload["status"] == "aborted":
+                raise UploadAborted(f"Upload {upload_id} was aborted.")
+            if upload["status"] == "complete" or (min_bytes is not None and upload["received"] >= min_bytes):
+                return upload
+            if upload["received"] != last_received:
+                last_received, last_progress = upload["received"], time.monotonic()
+            elif time.monotonic() - last_progress > timeout:
+                raise TimeoutError(f"Upload {upload_id} stalled at {last_received} bytes.")
+            time.sleep(FOLLOW_POLL_SEC)
+
+    def probe(self, upload: Dict[str, Any]) -> Optional[bool]:
+        """Non-blocking container_streamable() on what has arrived so far."""
+        if upload["status"] != "open" or upload["received"] <= 0:
+            return None
+        return container_streamable(upload["path"], upload["received"])
+
+    def streamable(self, upload_id: str, probe_bytes: int = UPLOAD_PROBE_BYTES) -> bool:
+        """Wait until the container can be judged; True if its prefix is decodable."""
+        want = probe_bytes
+        while True:
+            upload = self.wait(upload_id, min_bytes=want)
+            if upload["status"] == "complete":
+                return False   # nothing left to overlap: read the sealed file
+            verdict = container_streamable(upload["path"], upload["received"])
+            if verdict is not None:
+                return verdict
+            want = upload["received"] + probe_bytes
+
+    def follow(self, upload_id: str) -> "GrowingUploadReader":
+        return GrowingUploadReader(self, upload_id)
+
+
+class GrowingUploadReader:
+    """Read-only file object over an upload that may still be arriving.
+
+    read() returns what is on disk, waits when it catches up with the
+    writer, and returns b"" only once the upload is complete.
+    """
+
+    def __init__(self, store: UploadStore, upload_id: str):
+        self.store = store
+        self.upload_id = upload_id
+        self._file = open(store._require(upload_id)["path"], "rb")
+        self._last_progress = time.monotonic()
+
+    def read(self, size: int = -1) -> bytes:
+        size = UPLOAD_BLOCK_BYTES if size is None or size < 0 else size
+        while True:
+            data = self._file.read(size)
+            if data:
+                self._last_progress = time.monotonic()
+                return data
+            upload = self.store._require(self.upload_id)
+            if upload["status"] == "aborted":
+                raise UploadAborted(f"Upload {self.upload_id} was aborted.")
+            if upload["status"] == "complete":
+                # Bytes written before the seal may have landed since the last read
+                return self._file.read(size)
+            if time.monotonic() - self._last_progress > UPLOAD_STALL_TIMEOUT_SEC:
+                raise TimeoutError(f"Upload {self.upload_id} stalled.")
+            time.sleep(FOLLOW_POLL_SEC)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,23 @@
+# wsgi.py — production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# gunicorn.conf.py sets preload_app, so this module is imported once in the
+# gunicorn master. Startup work (store migration, index sync) runs there
+# once. Every registered model and the face embedding matrix are loaded
+# here, before workers fork, so their pages are shared copy-on-write
+# instead of being loaded once per worker. Threads don't survive fork:
+# the master starts none, and each worker calls start_background_services()
+# from the post_fork hook.
+import os
+import time
+
+os.environ.setdefault("RECALL_DEFER_BACKGROUND", "1")
+
+from app import _BOOT_T0, app, start_background_services  # noqa: E402
+from services.model_registry import model_registry  # noqa: E402
+
+# Blocks until loaded; warm()'s loader threads have exited before any fork
+model_registry.start("eager")
+model_registry.record_timing("preload_ms", (time.perf_counter() - _BOOT_T0) * 1000)
+print(f"🚀 Preloaded in {(time.perf_counter() - _BOOT_T0) * 1000:.0f} ms — forking workers.")
+
+__all__ = ["app", "start_background_services"]
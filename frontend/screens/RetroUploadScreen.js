@@ -65,6 +65,20 @@ export default function RetroUploadScreen() {
       }
    };
 
+   const waitForJob = async (jobId) => {
+      while (true) {
+         const res = await fetch(`${BASE_URL}/api/jobs/${jobId}`);
+         const job = await res.json();
+         if (!res.ok || job.status === 'failed') {
+            return { ok: false, data: job };
+         }
+         if (job.status === 'done') {
+            return { ok: true, data: job.result };
+         }
+         await new Promise((resolve) => setTimeout(resolve, 1500));
+      }
+   };
+
    const processVideo = async () => {
       if (!file) return;
       setProcessing(true);
@@ -105,9 +119,13 @@ export default function RetroUploadScreen() {
          await simulateUploadWhile(fetchPromise);
 
          const res = await fetchPromise;
-         const data = await res.json();
-         setResult({ ok: res.ok, data });
-         if (!res.ok) {
+         const queued = await res.json();
+         // backend queues the upload; poll the job until it finishes
+         const { ok, data } = res.ok
+            ? await waitForJob(queued.job_id)
+            : { ok: false, data: queued };
+         setResult({ ok, data });
+         if (!ok) {
             Alert.alert('Server Error', JSON.stringify(data));
          }
       } catch (e) {